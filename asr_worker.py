@@ -0,0 +1,214 @@
+"""
+Пул отдельных процессов для распознавания речи (GigaAM)
+
+Инференс в процессе бота конкурирует за GIL и CPU с циклом событий. Здесь каждый
+воркер загружает модель один раз, PCM передается через общую память (без pickle
+тензоров), а по каналу Pipe идут только короткие сообщения с именем блока и результатом.
+Зависший или упавший воркер убивается и перезапускается, бот при этом продолжает работать.
+"""
+
+import functools
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Optional
+
+import numpy as np
+
+import deadline
+from logger import calendar_logger
+
+
+def _load_voice_service(device: str, threads: int):
+    """Загружает модель в процессе воркера (вызывается в дочернем процессе)"""
+    import torch
+    from voice_service import VoiceService
+
+    torch.set_num_threads(threads)
+    service = VoiceService(device=device, workers=0)
+    return service if service.is_model_loaded() else None
+
+
+def _worker_main(conn, factory: Callable):
+    """Цикл воркера: загрузка модели, затем задания (имя блока общей памяти, число сэмплов)"""
+    try:
+        service = factory()
+    except Exception as e:
+        calendar_logger.log_error(e, "asr_worker.load")
+        service = None
+    conn.send('ready' if service is not None else 'failed')
+    if service is None:
+        return
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        shm_name, n_samples = message
+        shm = SharedMemory(name=shm_name)
+        try:
+            samples = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf)
+            try:
+                conn.send(('ok', service.transcribe_pcm(samples)))
+            except Exception as e:
+                calendar_logger.log_error(e, "asr_worker.transcribe")
+                conn.send(('error', str(e)))
+            del samples
+        finally:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # на буфер еще ссылается тензор модели - блок закроется при выходе процесса
+
+
+class _Worker:
+    """Процесс-воркер с каналом и собственным блоком общей памяти под PCM"""
+
+    def __init__(self, context, factory: Callable, index: int):
+        self.index = index
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, factory), name=f'asr-worker-{index}', daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.shm: Optional[SharedMemory] = None
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready and self.conn.poll(timeout):
+            try:
+                self.ready = self.conn.recv() == 'ready'
+            except EOFError:
+                # Процесс завершился, не загрузив модель
+                self.ready = False
+        return self.ready
+
+    def buffer(self, n_bytes: int) -> SharedMemory:
+        """Блок общей памяти не меньше n_bytes; переиспользуется между заданиями"""
+        if self.shm is None or self.shm.size < n_bytes:
+            self.release_buffer()
+            self.shm = SharedMemory(create=True, size=max(n_bytes, 1))
+        return self.shm
+
+    def release_buffer(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def stop(self, kill: bool = False):
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.release_buffer()
+
+
+class ASRWorkerPool:
+    """Пул процессов распознавания; transcribe() блокирующий и вызывается из пула потоков бота"""
+
+    def __init__(self, size: Optional[int] = None, device: str = "cpu", timeout: Optional[float] = None,
+                 load_timeout: Optional[float] = None, factory: Optional[Callable] = None):
+        """
+        Args:
+            size: количество процессов (ASR_WORKERS)
+            device: устройство инференса в воркерах
+            timeout: дедлайн одного распознавания, после него воркер перезапускается (ASR_TIMEOUT)
+            load_timeout: сколько ждать загрузки модели воркером (ASR_WORKER_LOAD_TIMEOUT)
+            factory: загрузчик сервиса в дочернем процессе (по умолчанию VoiceService)
+        """
+        self.size = size or int(os.getenv('ASR_WORKERS', '1'))
+        self.timeout = timeout or float(os.getenv('ASR_TIMEOUT', '300'))
+        self.load_timeout = load_timeout or float(os.getenv('ASR_WORKER_LOAD_TIMEOUT', '300'))
+        threads = max(1, (os.cpu_count() or 1) // self.size)
+        self._factory = factory or functools.partial(_load_voice_service, device, threads)
+        # spawn: fork процесса с потоками и torch небезопасен
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = [_Worker(self._context, self._factory, index) for index in range(self.size)]
+        for worker in self._workers:
+            self._idle.put(worker)
+        self.restarts = 0
+        self._loaded = False
+
+    def wait_ready(self) -> bool:
+        """Ждет загрузки модели во всех воркерах; True, если хотя бы один готов"""
+        deadline = time.monotonic() + self.load_timeout
+        ready = [worker.wait_ready(max(0.0, deadline - time.monotonic())) for worker in self._workers]
+        self._loaded = any(ready)
+        calendar_logger.info(f"ASRWorkerPool: {sum(ready)}/{self.size} workers ready")
+        return self._loaded
+
+    def is_ready(self) -> bool:
+        return self._loaded
+
+    def _restart(self, worker: _Worker) -> _Worker:
+        worker.stop(kill=True)
+        self.restarts += 1
+        replacement = _Worker(self._context, self._factory, worker.index)
+        self._workers[worker.index] = replacement
+        return replacement
+
+    def transcribe(self, samples: np.ndarray) -> Optional[str]:
+        """
+        Распознает PCM (моно, 16 кГц) в свободном воркере
+
+        Returns:
+            текст, пустая строка, если речь не найдена, или None, если воркер упал или завис
+        """
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        worker = self._idle.get()
+        # Задание отправлено, а ответ не прочитан - воркер нельзя вернуть в пул: следующий
+        # вызов получил бы этот ответ вместо своего
+        pending = False
+        try:
+            if not worker.wait_ready(self.load_timeout):
+                calendar_logger.warning(f"ASRWorkerPool: worker {worker.index} is not ready, restarting")
+                worker = self._restart(worker)
+                return None
+
+            # Дедлайн обновления короче таймаута - зависший воркер перезапускается по нему.
+            # Считается до отправки: истекший дедлайн не оставляет задание без читателя
+            timeout = deadline.timeout(self.timeout)
+
+            shm = worker.buffer(samples.nbytes)
+            np.ndarray(samples.shape, dtype=np.float32, buffer=shm.buf)[:] = samples
+            worker.conn.send((shm.name, len(samples)))
+            pending = True
+
+            if not worker.conn.poll(timeout):
+                calendar_logger.warning(f"ASRWorkerPool: worker {worker.index} timed out after {timeout:g}s, restarting")
+                return None
+
+            status, payload = worker.conn.recv()
+            pending = False
+            if status != 'ok':
+                return None
+            return payload or ""
+
+        except (EOFError, BrokenPipeError, ConnectionResetError, OSError) as e:
+            calendar_logger.warning(f"ASRWorkerPool: worker {worker.index} crashed ({e}), restarting")
+            pending = True
+            return None
+        finally:
+            if pending:
+                worker = self._restart(worker)
+            self._idle.put(worker)
+
+    def close(self):
+        """Останавливает воркеры и освобождает общую память"""
+        for worker in self._workers:
+            worker.stop()
@@ -1,4 +1,7 @@
-from typing import Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from request_classifier import RequestClassifier
@@ -7,71 +10,291 @@ from models import CalendarEvent, Note, Task
 from logger import calendar_logger
 
 
+# Сколько подготовленных подтверждений держать (превью, которые еще не подтверждены)
+PREPARED_LIMIT = 64
+
+
 class AssistantService:
-    def __init__(self):
+    def __init__(self, lazy: bool = False):
+        """
+        Args:
+            lazy: не создавать классификатор и клиент Google сразу - их инициализирует
+                вызывающий (init_inference / init_calendar_client), например в фоне
+        """
+        self.inference: Optional[RequestClassifier] = None
+        self.calendar_client: Optional[GoogleCalendarClient] = None
+        # Запросы Google, собранные пока пользователь читает превью: ключ -> (тело, запрос)
+        self._prepared: "OrderedDict[str, Tuple[Dict[str, Any], Any]]" = OrderedDict()
+        self._prepared_lock = threading.Lock()
+        if not lazy:
+            self.init_inference()
+            self.init_calendar_client()
+
+    def init_inference(self) -> RequestClassifier:
+        """Создает классификатор запросов (роутер моделей, проверка доступности LLM)"""
         self.inference = RequestClassifier()
+        return self.inference
+
+    def init_calendar_client(self) -> GoogleCalendarClient:
+        """Создает клиент Google Calendar/Tasks (авторизация, discovery)"""
         self.calendar_client = GoogleCalendarClient()
+        return self.calendar_client
 
-    def process_user_request(self, user_message: str) -> Dict[str, Any]:
-        """Обрабатывает запрос пользователя и создает событие в календаре или возвращает заметку"""
+    def process_user_request(self, user_message: str,
+                             on_progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Обрабатывает запрос пользователя и создает событие в календаре или возвращает заметку
+
+        on_progress получает текст промежуточного превью, пока модель генерирует ответ. Сообщение
+        с несколькими намерениями ("в 10 планерка, в 15 звонок и запомни ...") обрабатывается
+        пакетом - ответ 'confirm_batch' с общим подтверждением
+        """
         try:
+            segments = self.inference.split_request(user_message)
+            if len(segments) > 1:
+                return self._build_batch_response(segments, self.process_user_requests(segments))
+
             # Получаем CalendarEvent или Note от модели
-            result = self.inference.process_request(user_message)
+            result = self.inference.process_request(user_message, on_progress=on_progress)
+            return self._build_response(result)
+
+        except Exception as e:
+            calendar_logger.log_error(e, "assistant_service.process_user_request")
+            return {
+                'success': False,
+                'message': f'Произошла ошибка: {str(e)}'
+            }
+
+    def process_user_requests(self, user_messages: List[str],
+                              max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Обрабатывает несколько запросов: общая классификация, затем извлечение группами по типу
 
-            if not result:
+        Args:
+            user_messages: запросы
+            max_workers: одновременных вызовов модели (LLM_PARALLEL_REQUESTS, по умолчанию 4) -
+                выигрыш почти линеен до числа параллельных слотов сервера
+
+        Returns:
+            ответы в порядке запросов, каждый в формате process_user_request; ошибка одного
+            запроса не влияет на остальные
+        """
+        if not user_messages:
+            return []
+        started = time.monotonic()
+        try:
+            results = self.inference.process_requests(user_messages, max_workers=max_workers)
+        except Exception as e:
+            calendar_logger.log_error(e, "assistant_service.process_user_requests")
+            return [{'success': False, 'message': f'Произошла ошибка: {str(e)}'} for _ in user_messages]
+
+        responses = []
+        for user_message, result in zip(user_messages, results):
+            try:
+                responses.append(self._build_response(result))
+            except Exception as e:
+                calendar_logger.log_error(e, f"assistant_service.process_user_requests - {user_message}")
+                responses.append({'success': False, 'message': f'Произошла ошибка: {str(e)}'})
+
+        elapsed = time.monotonic() - started
+        failed = sum(1 for response in responses if not response['success'])
+        calendar_logger.info(
+            f"Batch processed {len(user_messages)} requests in {elapsed:.2f}s "
+            f"({len(user_messages) / elapsed if elapsed > 0 else 0.0:.2f}/s), {failed} failed"
+        )
+        return responses
+
+    def _build_response(self, result: Optional[Any]) -> Dict[str, Any]:
+        """Ответ process_user_request по результату классификатора"""
+        if not result:
+            return {
+                'success': False,
+                'message': 'Не удалось понять запрос. Попробуйте переформулировать.'
+            }
+
+        # Обрабатываем результат в зависимости от типа
+        match result:
+            case Note():
+                # Заметка - возвращаем её сразу
+                return {
+                    'success': True,
+                    'action': 'note',
+                    'note': result,
+                    'message': self._format_note_response(result)
+                }
+            
+            case CalendarEvent():
+                # Календарное событие - возвращаем данные для подтверждения
+                return {
+                    'success': True,
+                    'action': 'confirm',
+                    'event': result,
+                    'message': self._format_event_confirmation(result)
+                }
+            case Task():
+                # Для задач используем отдельный подтверждающий поток
+                return {
+                    'success': True,
+                    'action': 'confirm_task',
+                    'task': result,
+                    'message': self._format_task_confirmation(result)
+                }
+            
+            case _:
+                # Неожиданный тип объекта
                 return {
                     'success': False,
-                    'message': 'Не удалось понять запрос. Попробуйте переформулировать.'
+                    'message': 'Получен неожиданный тип объекта. Попробуйте переформулировать запрос.'
                 }
 
-            # Обрабатываем результат в зависимости от типа
-            match result:
-                case Note():
-                    # Заметка - возвращаем её сразу
-                    return {
-                        'success': True,
-                        'action': 'note',
-                        'note': result,
-                        'message': self._format_note_response(result)
-                    }
-                
-                case CalendarEvent():
-                    # Календарное событие - возвращаем данные для подтверждения
-                    return {
-                        'success': True,
-                        'action': 'confirm',
-                        'event': result,
-                        'message': self._format_event_confirmation(result)
-                    }
-                case Task():
-                    # Для задач используем отдельный подтверждающий поток
-                    return {
-                        'success': True,
-                        'action': 'confirm_task',
-                        'task': result,
-                        'message': self._format_task_confirmation(result)
-                    }
-                
+    def _build_batch_response(self, segments: List[str], responses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Общий ответ по частям сообщения: события и задачи - на одно подтверждение, заметки - сразу"""
+        items, notes, failed = [], [], []
+        for segment, response in zip(segments, responses):
+            match response.get('action') if response.get('success') else None:
+                case 'confirm':
+                    items.append({'type': 'event', 'payload': response['event']})
+                case 'confirm_task':
+                    items.append({'type': 'task', 'payload': response['task']})
+                case 'note':
+                    notes.append(response['note'])
                 case _:
-                    # Неожиданный тип объекта
-                    return {
-                        'success': False,
-                        'message': 'Получен неожиданный тип объекта. Попробуйте переформулировать запрос.'
-                    }
+                    failed.append(segment)
 
-        except Exception as e:
-            calendar_logger.log_error(e, "assistant_service.process_user_request")
+        if not items and not notes:
             return {
                 'success': False,
-                'message': f'Произошла ошибка: {str(e)}'
+                'message': 'Не удалось понять запрос. Попробуйте переформулировать.'
+            }
+        return {
+            'success': True,
+            'action': 'confirm_batch',
+            'items': items,
+            'notes': notes,
+            'failed': failed,
+            'message': self._format_batch_confirmation(items, notes, failed)
+        }
+
+    def _format_batch_confirmation(self, items: List[Dict[str, Any]], notes: List[Note], failed: List[str]) -> str:
+        """Превью нескольких запросов из одного сообщения (простой текст: названия не экранируются)"""
+        lines = [f"🧩 Запросов в сообщении: {len(items) + len(notes) + len(failed)}", ""]
+        for number, item in enumerate(items, 1):
+            payload = item['payload']
+            if item['type'] == 'event':
+                lines.append(f"{number}. 📅 {payload.title} — {payload.start_time.strftime('%d.%m.%Y %H:%M')}")
+            else:
+                when = payload.due_time.strftime('%d.%m.%Y %H:%M') if payload.due_time else "без срока"
+                lines.append(f"{number}. 📝 {payload.title} — {when}")
+        if notes:
+            lines += ["", f"🗒 Заметки ({len(notes)}):"]
+            lines += [f"• {note.title}: {note.content}" for note in notes]
+        if failed:
+            lines += ["", f"⚠️ Не удалось разобрать ({len(failed)}):"]
+            lines += [f"• {segment}" for segment in failed]
+        if items:
+            lines += ["", f"✅ Создать {len(items)} в Google Calendar?"]
+        return "\n".join(lines)
+
+    def edit_pending_item(self, item: Dict[str, Any], correction: str) -> Dict[str, Any]:
+        """Применяет правку пользователя к ожидающему подтверждения событию или задаче
+
+        Returns:
+            результат в том же формате, что и process_user_request ('confirm' / 'confirm_task')
+        """
+        payload = item.get('payload')
+        if item.get('type') not in ('event', 'task') or payload is None:
+            return {
+                'success': False,
+                'message': 'Этот элемент нельзя изменить правкой.'
+            }
+
+        updated = self.inference.apply_edit(payload, correction)
+        if updated is None:
+            return {
+                'success': False,
+                'message': 'Не удалось понять правку. Попробуйте сформулировать иначе.'
             }
 
-    def create_confirmed_event(self, calendar_event: CalendarEvent) -> Dict[str, Any]:
-        """Создает подтвержденное событие в Google Calendar"""
+        if isinstance(updated, CalendarEvent):
+            return {
+                'success': True,
+                'action': 'confirm',
+                'event': updated,
+                'message': self._format_event_confirmation(updated)
+            }
+        return {
+            'success': True,
+            'action': 'confirm_task',
+            'task': updated,
+            'message': self._format_task_confirmation(updated)
+        }
+
+    def prepare_confirmation(self, key: str, item: Dict[str, Any]) -> bool:
+        """
+        Готовит создание, пока пользователь читает превью: тело запроса Google, свежий токен OAuth
+        и открытое соединение с API. create_confirmed_event / create_confirmed_task с тем же key
+        отправят готовый запрос.
+
+        Args:
+            key: ключ ожидающего элемента (event_id бота)
+            item: элемент {'type': 'event' | 'task' | 'batch', 'payload': ...}
+
+        Returns:
+            True, если запрос подготовлен (для пакета только прогревается соединение)
+        """
+        if self.calendar_client is None:
+            return False
+        try:
+            match item.get('type'):
+                case 'event':
+                    body = item['payload'].to_google_event()
+                    self.calendar_client.prewarm('calendar')
+                    request = self.calendar_client.prepare_event(body)
+                case 'task':
+                    body = item['payload'].to_google_task()
+                    self.calendar_client.prewarm('tasks')
+                    request = self.calendar_client.prepare_task(body)
+                case 'batch':
+                    types = {entry.get('type') for entry in item['payload']}
+                    if 'event' in types:
+                        self.calendar_client.prewarm('calendar')
+                    if 'task' in types:
+                        self.calendar_client.prewarm('tasks')
+                    return False
+                case _:
+                    return False
+        except Exception as e:
+            calendar_logger.log_error(e, "assistant_service.prepare_confirmation")
+            return False
+
+        with self._prepared_lock:
+            self._prepared[key] = (body, request)
+            self._prepared.move_to_end(key)
+            while len(self._prepared) > PREPARED_LIMIT:
+                self._prepared.popitem(last=False)
+        return True
+
+    def _take_prepared(self, key: Optional[str], body: Dict[str, Any]):
+        """Подготовленный запрос для key, если элемент с тех пор не менялся"""
+        entry = None
+        if key is not None:
+            with self._prepared_lock:
+                entry = self._prepared.pop(key, None)
+        # Превью могли отредактировать после подготовки - тогда запрос собирается заново
+        return entry[1] if entry is not None and entry[0] == body else None
+
+    def discard_prepared(self, key: str):
+        """Забывает подготовленный запрос (превью отменено)"""
+        with self._prepared_lock:
+            self._prepared.pop(key, None)
+
+    def create_confirmed_event(self, calendar_event: CalendarEvent, key: Optional[str] = None) -> Dict[str, Any]:
+        """Создает подтвержденное событие в Google Calendar (готовым запросом, если он подготовлен для key)"""
         try:
             # Создаем событие в Google Calendar
             google_event_data = calendar_event.to_google_event()
-            result = self.calendar_client.create_event(google_event_data)
+            prepared = self._take_prepared(key, google_event_data)
+            result = self.calendar_client.create_event(google_event_data, prepared=prepared)
+            if result is not None:
+                result['prepared'] = prepared is not None
 
             return result or {
                 'success': False,
@@ -85,6 +308,50 @@ class AssistantService:
                 'message': f'Произошла ошибка при создании события: {str(e)}'
             }
 
+    def create_confirmed_batch(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Создает подтвержденные события и задачи пакета batch-запросами Google API
+
+        Args:
+            items: элементы {'type': 'event' | 'task', 'payload': CalendarEvent | Task}
+        """
+        started = time.monotonic()
+        events = [item['payload'] for item in items if item.get('type') == 'event']
+        tasks = [item['payload'] for item in items if item.get('type') == 'task']
+        results = []
+        # Ошибка одного сервиса не скрывает уже созданное другим - повтор создал бы дубликаты
+        for payloads, create, convert, label in (
+            (events, self.calendar_client.create_events_batch, lambda event: event.to_google_event(), "события"),
+            (tasks, self.calendar_client.create_tasks_batch, lambda task: task.to_google_task(), "задачи"),
+        ):
+            if not payloads:
+                continue
+            try:
+                results += create([convert(payload) for payload in payloads])
+            except Exception as e:
+                calendar_logger.log_error(e, f"assistant_service.create_confirmed_batch - {label}")
+                results += [{
+                    'success': False,
+                    'error': str(e),
+                    'message': f"Ошибка при создании {label} '{payload.title}': {e}"
+                } for payload in payloads]
+
+        elapsed = time.monotonic() - started
+        created = sum(1 for result in results if result.get('success'))
+        rate = created / elapsed if elapsed > 0 else 0.0
+        calendar_logger.info(f"Batch created {created}/{len(results)} in {elapsed:.2f}s ({rate:.1f}/s)")
+
+        message = f"Создано {created} из {len(results)} за {elapsed:.1f} с ({rate:.1f} в секунду)"
+        errors = [result['message'] for result in results if not result.get('success')]
+        if errors:
+            message += "\n" + "\n".join(f"• {error}" for error in errors)
+        return {
+            'success': created > 0,
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+            'message': message
+        }
+
     def _format_event_confirmation(self, event: CalendarEvent) -> str:
         """Форматирует событие для подтверждения пользователем"""
         # Форматируем время начала
@@ -168,11 +435,14 @@ class AssistantService:
 
         return event
 
-    def create_confirmed_task(self, task: Task) -> Dict[str, Any]:
-        """Создает подтвержденную задачу через Google Tasks API"""
+    def create_confirmed_task(self, task: Task, key: Optional[str] = None) -> Dict[str, Any]:
+        """Создает подтвержденную задачу через Google Tasks API (готовым запросом, если он подготовлен для key)"""
         try:
             task_payload = task.to_google_task()
-            result = self.calendar_client.create_task(task_payload)
+            prepared = self._take_prepared(key, task_payload)
+            result = self.calendar_client.create_task(task_payload, prepared=prepared)
+            if result is not None:
+                result['prepared'] = prepared is not None
             return result or {
                 'success': False,
                 'message': 'Неожиданная ошибка при создании задачи'
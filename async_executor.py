@@ -0,0 +1,89 @@
+"""
+Асинхронный слой исполнения блокирующих вызовов (LLM, Google API, ASR)
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from logger import calendar_logger
+
+
+class CallTimeoutError(Exception):
+    """Вызов не уложился в отведенный дедлайн"""
+
+    def __init__(self, message: str, future: Optional[asyncio.Future] = None):
+        super().__init__(message)
+        # Вызов, который продолжает выполняться в потоке пула; завершится позже
+        self.future = future
+
+
+class AsyncExecutor:
+    """Ограниченный пул потоков для синхронных вызовов из asyncio-обработчиков
+
+    Обработчики Telegram вызывают блокирующий код (requests.post, execute() Google API,
+    инференс GigaAM) через run(), поэтому цикл событий продолжает принимать обновления,
+    отвечать на callback'и и редактировать сообщения, пока вызовы выполняются.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, default_timeout: Optional[float] = None):
+        """
+        Args:
+            max_workers: размер пула потоков (по умолчанию ASSISTANT_WORKERS или 4)
+            default_timeout: дедлайн вызова в секундах (по умолчанию ASSISTANT_CALL_TIMEOUT или 180)
+        """
+        self.max_workers = max_workers or int(os.getenv('ASSISTANT_WORKERS', '4'))
+        if default_timeout is None:
+            default_timeout = float(os.getenv('ASSISTANT_CALL_TIMEOUT', '180'))
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='assistant-worker')
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Количество выполняющихся вызовов, включая брошенные по таймауту"""
+        return self._in_flight
+
+    def _finished(self, future: asyncio.Future):
+        self._in_flight -= 1
+        if not future.cancelled():
+            # Исключение брошенного вызова никто не ждет - забираем, чтобы asyncio не ругался
+            future.exception()
+
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Выполняет синхронную функцию в пуле и ждет результат не дольше дедлайна
+
+        Args:
+            func: блокирующая функция
+            timeout: дедлайн в секундах (None - значение по умолчанию)
+
+        Returns:
+            Результат функции
+
+        Raises:
+            CallTimeoutError: если дедлайн истек. Поток продолжает работу в фоне, обработчик
+                освобождается сразу; future исключения завершится вместе с потоком.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        name = getattr(func, '__qualname__', repr(func))
+        loop = asyncio.get_running_loop()
+
+        # Копия контекста - span'ы из потока попадают в трассу обработчика
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self._pool, functools.partial(context.run, func, *args, **kwargs))
+        self._in_flight += 1
+        future.add_done_callback(self._finished)
+        try:
+            # shield: таймаут не отменяет future, по нему видно, когда поток действительно закончил
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            calendar_logger.warning(f"AsyncExecutor: {name} exceeded deadline {timeout:g}s")
+            raise CallTimeoutError(f"Превышено время ожидания ({timeout:g} с)", future)
+
+    def shutdown(self, wait: bool = False):
+        """Останавливает пул потоков"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
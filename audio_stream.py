@@ -0,0 +1,170 @@
+"""
+Потоковое декодирование аудио для распознавания речи
+
+ffmpeg декодирует любой контейнер (OGG/Opus голосовых, MP3/M4A аудиофайлов, MP4 видеосообщений)
+сразу в моно PCM 16 кГц и отдает его через pipe блоками фиксированного размера. Блоки собираются
+в окна не длиннее ASR_WINDOW_SECONDS, которые режутся в самом тихом месте и распознаются по одному -
+в памяти одновременно находится только одно окно, а не весь float32-сигнал записи.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+import tracing
+from logger import calendar_logger
+
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 320  # 20 мс - шаг поиска паузы для разреза окна
+# Форматы, которые ffmpeg декодирует из pipe без перемотки (MP4/M4A хранят индекс в конце файла)
+PIPE_FRIENDLY_EXTENSIONS = ('.ogg', '.oga', '.opus', '.mp3', '.wav', '.flac')
+
+
+class AudioDecodeError(Exception):
+    """ffmpeg не смог декодировать файл"""
+
+
+def ffmpeg_available() -> bool:
+    """Есть ли ffmpeg в PATH"""
+    return shutil.which('ffmpeg') is not None
+
+
+def iter_pcm_chunks(source: Union[str, bytes, bytearray], chunk_seconds: Optional[float] = None) -> Iterator[np.ndarray]:
+    """
+    Декодирует аудио через ffmpeg и отдает PCM float32 [-1, 1] блоками
+
+    Args:
+        source: путь к файлу (контейнеры с индексом в конце, например MP4, читаются только так)
+            или байты файла (подаются в stdin ffmpeg)
+        chunk_seconds: длина блока (ASR_CHUNK_SECONDS, по умолчанию 1 с)
+    """
+    chunk_seconds = chunk_seconds or float(os.getenv('ASR_CHUNK_SECONDS', '1'))
+    chunk_bytes = max(1, int(chunk_seconds * SAMPLE_RATE)) * 2
+    from_path = isinstance(source, str)
+
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-threads', '0',
+        '-i', source if from_path else 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), 'pipe:1',
+    ]
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL if from_path else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    feeder = None
+    if not from_path:
+        # Запись в stdin в отдельном потоке: иначе ffmpeg и мы заблокируемся на заполненных pipe
+        def feed():
+            try:
+                process.stdin.write(source)
+            except (BrokenPipeError, OSError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        feeder = threading.Thread(target=feed, name='ffmpeg-feeder', daemon=True)
+        feeder.start()
+
+    decoded = 0
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % 2
+            if not usable:
+                continue
+            decoded += usable // 2
+            yield np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+
+        stderr = process.stderr.read().decode('utf-8', errors='replace').strip()
+        if process.wait() != 0 and not decoded:
+            raise AudioDecodeError(stderr or f"ffmpeg exited with code {process.returncode}")
+        calendar_logger.info(f"Аудио декодировано потоком: {decoded / SAMPLE_RATE:.1f} с")
+    finally:
+        # Генератор могли закрыть раньше времени (ошибка распознавания, таймаут)
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+        if feeder is not None:
+            feeder.join()
+
+
+def _quietest_cut(buffer: np.ndarray, start: int, stop: int) -> int:
+    """Позиция самого тихого 20-мс кадра в buffer[start:stop]"""
+    frames = (stop - start) // FRAME_SAMPLES
+    if frames < 1:
+        return stop
+    region = buffer[start:start + frames * FRAME_SAMPLES].reshape(frames, FRAME_SAMPLES)
+    energy = np.einsum('ij,ij->i', region, region)
+    return start + int(np.argmin(energy)) * FRAME_SAMPLES + FRAME_SAMPLES // 2
+
+
+def iter_audio_windows(chunks: Iterable[np.ndarray], max_seconds: Optional[float] = None,
+                        min_seconds: Optional[float] = None,
+                        silence_level: Optional[float] = None) -> Iterator[np.ndarray]:
+    """
+    Собирает блоки PCM в окна для распознавания
+
+    Окно набирается до max_seconds и режется по энергии - в самом тихом 20-мс кадре после
+    min_seconds, чтобы не резать слово; остаток переходит в следующее окно. Это не VAD: окна
+    с тишиной отсеиваются только по пиковой амплитуде (ниже silence_level), а окна короче 25 с
+    распознаются целиком, без сегментации Silero VAD в transcribe_longform.
+
+    Args:
+        chunks: блоки PCM float32 16 кГц
+        max_seconds: максимальная длина окна (ASR_WINDOW_SECONDS, по умолчанию 22 с -
+            меньше порога longform GigaAM в 25 с)
+        min_seconds: минимальная длина окна перед разрезом (ASR_WINDOW_MIN_SECONDS, по умолчанию 15 с)
+        silence_level: пиковая амплитуда, ниже которой окно считается тишиной (ASR_SILENCE_LEVEL)
+    """
+    max_seconds = max_seconds or float(os.getenv('ASR_WINDOW_SECONDS', '22'))
+    min_seconds = min_seconds or float(os.getenv('ASR_WINDOW_MIN_SECONDS', '15'))
+    if silence_level is None:
+        silence_level = float(os.getenv('ASR_SILENCE_LEVEL', '0.01'))
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    min_samples = min(int(min_seconds * SAMPLE_RATE), max_samples)
+
+    buffer = np.empty(max_samples, dtype=np.float32)
+    filled = 0
+
+    def window(length: int) -> Optional[np.ndarray]:
+        samples = buffer[:length]
+        if not length or float(np.abs(samples).max()) < silence_level:
+            return None
+        return samples.copy()
+
+    for chunk in chunks:
+        offset = 0
+        while offset < len(chunk):
+            take = min(len(chunk) - offset, max_samples - filled)
+            buffer[filled:filled + take] = chunk[offset:offset + take]
+            filled += take
+            offset += take
+            if filled < max_samples:
+                continue
+
+            with tracing.span('audio.cut'):
+                cut = _quietest_cut(buffer, min_samples, max_samples)
+            ready = window(cut)
+            buffer[:filled - cut] = buffer[cut:filled]
+            filled -= cut
+            if ready is not None:
+                yield ready
+
+    ready = window(filled)
+    if ready is not None:
+        yield ready
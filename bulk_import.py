@@ -0,0 +1,139 @@
+"""
+Массовый импорт: документ TXT/CSV с одним запросом на строку
+"""
+
+import csv
+import io
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from logger import calendar_logger
+from models import Note
+
+
+# Названия столбца с запросом в CSV с заголовком
+CSV_REQUEST_COLUMNS = ('request', 'text', 'запрос', 'текст', 'событие')
+
+
+@dataclass
+class BulkImportReport:
+    """Результат обработки документа"""
+    items: List[Dict[str, Any]] = field(default_factory=list)  # {'type', 'payload', 'line'} для подтверждения
+    notes: List[Tuple[str, Note]] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    total: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Строк в секунду"""
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _decode(data: bytes) -> str:
+    for encoding in ('utf-8-sig', 'cp1251'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+
+def parse_import_document(data: bytes, file_name: Optional[str] = None, max_lines: Optional[int] = None) -> List[str]:
+    """
+    Достает запросы из документа
+
+    TXT - каждая непустая строка; CSV - столбец request/запрос из заголовка или первый столбец.
+
+    Args:
+        data: содержимое файла
+        file_name: имя файла (по расширению выбирается формат)
+        max_lines: ограничение количества запросов (BULK_IMPORT_MAX_LINES, по умолчанию 100)
+    """
+    max_lines = max_lines or int(os.getenv('BULK_IMPORT_MAX_LINES', '100'))
+    text = _decode(data)
+
+    if file_name and file_name.lower().endswith('.csv'):
+        rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+        column = 0
+        if rows:
+            header = [cell.strip().lower() for cell in rows[0]]
+            for name in CSV_REQUEST_COLUMNS:
+                if name in header:
+                    column = header.index(name)
+                    rows = rows[1:]
+                    break
+        lines = [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+    else:
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    if len(lines) > max_lines:
+        calendar_logger.warning(f"Bulk import truncated: {len(lines)} lines > {max_lines}")
+    return lines[:max_lines]
+
+
+def run_bulk_import(assistant_service, lines: List[str], max_workers: Optional[int] = None) -> BulkImportReport:
+    """
+    Обрабатывает строки через AssistantService.process_user_requests: одна классификация на
+    все строки и параллельное извлечение
+
+    Args:
+        assistant_service: AssistantService с инициализированным классификатором
+        lines: запросы
+        max_workers: одновременных вызовов извлечения (BULK_IMPORT_CONCURRENCY, по умолчанию LLM_PARALLEL_REQUESTS)
+    """
+    max_workers = max_workers or int(os.getenv('BULK_IMPORT_CONCURRENCY', '0')) or None
+    started = time.monotonic()
+    responses = assistant_service.process_user_requests(lines, max_workers=max_workers)
+
+    report = BulkImportReport(total=len(lines))
+    for line, response in zip(lines, responses):
+        match response.get('action') if response.get('success') else None:
+            case 'confirm':
+                report.items.append({'type': 'event', 'payload': response['event'], 'line': line})
+            case 'confirm_task':
+                report.items.append({'type': 'task', 'payload': response['task'], 'line': line})
+            case 'note':
+                report.notes.append((line, response['note']))
+            case _:
+                report.failed.append(line)
+    report.elapsed = time.monotonic() - started
+
+    calendar_logger.info(
+        f"Bulk import: {report.total} lines in {report.elapsed:.2f}s ({report.throughput:.2f} lines/s), "
+        f"{len(report.items)} to confirm, {len(report.notes)} notes, {len(report.failed)} failed"
+    )
+    return report
+
+
+def format_bulk_preview(report: BulkImportReport, max_length: int = 4000) -> str:
+    """Общее превью пакета для подтверждения (простой текст: заголовки строк не экранируются)"""
+    lines = [f"📦 Импорт: {report.total} строк", ""]
+    for number, item in enumerate(report.items, 1):
+        payload = item['payload']
+        if item['type'] == 'event':
+            when = payload.start_time.strftime("%d.%m.%Y %H:%M")
+            lines.append(f"{number}. 📅 {payload.title} — {when}")
+        else:
+            when = payload.due_time.strftime("%d.%m.%Y %H:%M") if payload.due_time else "без срока"
+            lines.append(f"{number}. 📝 {payload.title} — {when}")
+
+    if report.notes:
+        lines += ["", f"🗒 Заметки ({len(report.notes)}):"]
+        lines += [f"• {note.title}" for _, note in report.notes]
+    if report.failed:
+        lines += ["", f"⚠️ Не удалось разобрать ({len(report.failed)}):"]
+        lines += [f"• {line}" for line in report.failed]
+
+    footer = ["", f"⚡ {report.elapsed:.1f} с, {report.throughput:.1f} строк/с"]
+    if report.items:
+        footer.append(f"✅ Создать {len(report.items)} в Google Calendar?")
+    footer_text = "\n".join(footer)
+
+    body = "\n".join(lines)
+    limit = max_length - len(footer_text)
+    if len(body) > limit:
+        body = body[:limit - 2].rsplit("\n", 1)[0] + "\n…"
+    return body + "\n" + footer_text
@@ -0,0 +1,117 @@
+"""
+Дедлайн обработки обновления и бюджеты этапов
+
+Бот открывает scope() на каждый этап (LLM, ASR, Google) с его таймаутом; дедлайн хранится в
+contextvars и вместе с контекстом попадает в потоки AsyncExecutor и пулов классификатора. Внутри
+этапа stage() сужает дедлайн бюджетом части конвейера (DEADLINE_BUDGETS, например классификация
+не дольше 20 с), провайдеры LLM берут timeout() вместо фиксированных 120 с, а распознавание и
+Google API проверяют check() между шагами. Вложенный дедлайн не может быть позже внешнего.
+
+Ответы, собранные правилами вместо модели из-за дедлайна, отмечаются mark_degraded(); вызывающий
+код узнает о них через track_degraded() и, например, не кладет их в кэш результатов.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from logger import calendar_logger
+
+
+# Момент time.monotonic(), после которого работа по обновлению бесполезна
+_deadline: ContextVar[Optional[float]] = ContextVar('deadline', default=None)
+# Этапы, ответившие без модели; список общий для копий контекста в потоках пулов
+_degraded: ContextVar[Optional[List[str]]] = ContextVar('deadline_degraded', default=None)
+
+DEFAULT_BUDGETS = "classify=20,split=20"
+
+
+class DeadlineExceeded(Exception):
+    """Время обработки обновления истекло"""
+
+
+def _parse_budgets(spec: str) -> Dict[str, float]:
+    budgets = {}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            budgets[name.strip()] = float(value)
+    return budgets
+
+
+_budgets = _parse_budgets(os.getenv('DEADLINE_BUDGETS', DEFAULT_BUDGETS))
+
+
+def remaining() -> Optional[float]:
+    """Секунд до дедлайна (может быть отрицательным); None - дедлайна нет"""
+    deadline = _deadline.get()
+    return deadline - time.monotonic() if deadline is not None else None
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(stage: str):
+    """Прерывает этап, если дедлайн уже истек"""
+    if expired():
+        raise DeadlineExceeded(f"Дедлайн истек: {stage}")
+
+
+def timeout(default: float) -> float:
+    """Таймаут сетевого вызова: default, но не дольше остатка до дедлайна"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Дедлайн истек до вызова")
+    return min(default, left)
+
+
+@contextmanager
+def scope(seconds: Optional[float]):
+    """Дедлайн через seconds секунд (не позже внешнего); None или 0 - без ограничения"""
+    if not seconds:
+        yield remaining()
+        return
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline - time.monotonic()
+    finally:
+        _deadline.reset(token)
+
+
+def mark_degraded(stage: str):
+    """Отмечает, что этап ответил упрощенно из-за дедлайна"""
+    degraded = _degraded.get()
+    if degraded is not None:
+        degraded.append(stage)
+
+
+@contextmanager
+def track_degraded():
+    """Собирает отметки mark_degraded() внутри блока; пустой список - ответ получен полностью"""
+    degraded: List[str] = []
+    token = _degraded.set(degraded)
+    try:
+        yield degraded
+    finally:
+        _degraded.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """Бюджет этапа из DEADLINE_BUDGETS внутри текущего дедлайна; этапы без бюджета получают весь остаток"""
+    # Без внешнего дедлайна (скрипты, консольный режим) бюджеты не действуют
+    budget = _budgets.get(name) if _deadline.get() is not None else None
+    with scope(budget) as left:
+        if left is not None and left <= 0:
+            calendar_logger.warning(f"Deadline: no budget left for {name}")
+        yield left
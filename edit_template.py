@@ -0,0 +1,127 @@
+"""
+Структурированный шаблон редактирования события/задачи и его разбор без LLM
+
+    Название: Встреча с командой
+    Время: 18.10.2026 14:00
+    Длительность: 60 минут      (или Окончание: 15:00)
+    Повтор: Weekly on Monday
+    Описание: обсудить релиз
+    Тип: задача                 (только для задач)
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Union
+
+from models import CalendarEvent, Task
+from utils import parse_duration
+
+
+DATETIME_FORMAT = "%d.%m.%Y %H:%M"
+
+TEMPLATE_LINE_RE = re.compile(r'^\s*([А-Яа-яЁё]+)\s*:\s*(.*?)\s*$')
+TIME_ONLY_RE = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+# Ключ шаблона -> поле модели
+TEMPLATE_KEYS = {
+    'название': 'title',
+    'время': 'time',
+    'длительность': 'duration_minutes',
+    'окончание': 'end_time',
+    'повтор': 'recurrence',
+    'описание': 'description',
+    'тип': 'type',
+}
+TASK_TYPE_VALUES = {'задача', 'task'}
+
+
+def format_edit_template(item: Union[CalendarEvent, Task]) -> str:
+    """Текст шаблона с текущими значениями события/задачи"""
+    when = item.start_time if isinstance(item, CalendarEvent) else item.due_time
+    lines = [f"Название: {item.title}"]
+    if when:
+        lines.append(f"Время: {when.strftime(DATETIME_FORMAT)}")
+    if item.duration_minutes:
+        lines.append(f"Длительность: {item.duration_minutes} минут")
+    elif isinstance(item, CalendarEvent) and item.end_time:
+        lines.append(f"Окончание: {item.end_time.strftime('%H:%M')}")
+    if item.recurrence:
+        lines.append(f"Повтор: {item.recurrence}")
+    if item.description:
+        lines.append(f"Описание: {item.description}")
+    if isinstance(item, Task):
+        lines.append("Тип: задача")
+    return "\n".join(lines)
+
+
+def _parse_fields(text: str) -> Optional[Dict[str, str]]:
+    """Строки "Ключ: значение"; None, если хотя бы одна строка не из шаблона"""
+    fields: Dict[str, str] = {}
+    for line in text.strip().splitlines():
+        if not line.strip() or line.strip().startswith('```'):
+            continue
+        match = TEMPLATE_LINE_RE.match(line)
+        if not match:
+            return None
+        key = TEMPLATE_KEYS.get(match.group(1).lower())
+        if key is None or key in fields:
+            return None
+        fields[key] = match.group(2)
+    return fields
+
+
+def parse_edit_template(text: str) -> Optional[Union[CalendarEvent, Task]]:
+    """
+    Разбирает шаблон редактирования в CalendarEvent (или Task при "Тип: задача")
+
+    Returns:
+        модель или None, если текст не является шаблоном целиком
+    """
+    if ':' not in text:
+        return None
+    fields = _parse_fields(text)
+    if not fields or not fields.get('title') or len(fields) < 2:
+        return None
+
+    is_task = fields.get('type', '').lower() in TASK_TYPE_VALUES
+    if 'type' in fields and not is_task:
+        return None
+
+    when = None
+    if fields.get('time'):
+        try:
+            when = datetime.strptime(fields['time'], DATETIME_FORMAT)
+        except ValueError:
+            return None
+    elif not is_task:
+        return None
+
+    duration = None
+    if fields.get('duration_minutes'):
+        duration = parse_duration(fields['duration_minutes'])
+        if duration is None:
+            return None
+
+    data = {
+        'title': fields['title'],
+        'description': fields.get('description') or None,
+        'duration_minutes': duration,
+        'recurrence': fields.get('recurrence') or None,
+    }
+    if is_task:
+        return Task(due_time=when, **data)
+
+    end_time = None
+    if fields.get('end_time') and duration is None:
+        end_text = fields['end_time']
+        match = TIME_ONLY_RE.match(end_text)
+        try:
+            if match:
+                end_time = when.replace(hour=int(match.group(1)), minute=int(match.group(2)))
+                if end_time <= when:
+                    end_time += timedelta(days=1)
+            else:
+                end_time = datetime.strptime(end_text, DATETIME_FORMAT)
+        except ValueError:
+            return None
+    return CalendarEvent(start_time=when, end_time=end_time, **data)
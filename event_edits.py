@@ -0,0 +1,160 @@
+"""
+Правки ожидающего подтверждения события или задачи короткими репликами
+("перенеси на 18:00", "продли на полчаса", "назови Планерка")
+"""
+
+import re
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Optional, Union
+
+from models import CalendarEvent, Task
+from utils import parse_duration
+
+
+# Глаголы, с которых обычно начинается правка предыдущего запроса. "Поставь", "сделай" начинают и
+# новые запросы ("поставь встречу завтра в 10") - такие реплики считаются правкой только ответом на превью
+EDIT_VERBS_RE = re.compile(
+    r'^\s*(?:перенеси|перенести|сдвинь|передвинь|измени|поменяй|переименуй|назови|продли|'
+    r'укороти|добавь описание|описание|название|лучше|нет,?\s|не\s+в\s)',
+    re.IGNORECASE
+)
+
+TIME_RE = re.compile(r'\b(?:в|на|к)?\s*(\d{1,2})[:.](\d{2})\b')
+HOUR_RE = re.compile(r'\b(?:в|к)\s+(\d{1,2})(?:\s*час(?:а|ов)?)?(?:\s+(утра|дня|вечера|ночи))?\b')
+DAY_RE = re.compile(r'\b(?:на\s+)?(сегодня|завтра|послезавтра)\b')
+DURATION_WORD_RE = re.compile(r'\b(?:на|длительностью)\s+(полчаса|полтора\s+часа|час)\b')
+DURATION_RE = re.compile(r'\b(?:на|длительностью)\s+(\d+\s*(?:минут[уы]?|мин|час(?:а|ов)?|ч))(?=\s|$)')
+TITLE_RE = re.compile(r'^\s*(?:переименуй(?:\s+в)?|назови(?:\s+(?:его|её|ее))?|название)\s*[:\-]?\s*(.+)$',
+                      re.IGNORECASE | re.DOTALL)
+DESCRIPTION_RE = re.compile(r'^\s*(?:добавь описание|описание)\s*[:\-]?\s*(.+)$', re.IGNORECASE | re.DOTALL)
+
+DAY_OFFSETS = {'сегодня': 0, 'завтра': 1, 'послезавтра': 2}
+DURATION_WORDS = {'полчаса': 30, 'час': 60}
+# "Продли на полчаса" меняет длительность на величину, "на полчаса" без глагола - задает ее
+DURATION_SIGN_RE = re.compile(r'^\s*(продли|укороти)\b')
+
+# Слова, которые могут остаться после разбора и не несут изменений
+FILLER_WORDS = {
+    'перенеси', 'перенести', 'сдвинь', 'передвинь', 'измени', 'поменяй', 'продли', 'укороти',
+    'время', 'начало', 'длительность', 'продолжительность', 'давай', 'пожалуйста', 'и', 'а', 'лучше',
+    'его', 'её', 'ее', 'это', 'событие', 'задачу', 'нет', 'не',
+}
+
+
+def looks_like_edit(text: str) -> bool:
+    """Похоже ли сообщение на правку предыдущего запроса, а не на новый запрос"""
+    return bool(EDIT_VERBS_RE.match(text))
+
+
+def _time_field(payload: Union[CalendarEvent, Task]) -> str:
+    return 'start_time' if isinstance(payload, CalendarEvent) else 'due_time'
+
+
+def _current_duration(payload: Union[CalendarEvent, Task]) -> Optional[int]:
+    """Текущая длительность в минутах; у события без окончания и длительности - час по умолчанию"""
+    if payload.duration_minutes:
+        return payload.duration_minutes
+    if isinstance(payload, CalendarEvent):
+        if payload.end_time is not None and payload.start_time is not None:
+            return int((payload.end_time - payload.start_time).total_seconds() // 60)
+        return 60
+    return None
+
+
+def parse_edit_locally(correction: str, payload: Union[CalendarEvent, Task],
+                       now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """
+    Разбирает правку без LLM
+
+    Returns:
+        изменившиеся поля или None, если в реплике есть то, что правила не покрывают
+    """
+    now = now or datetime.now()
+    title = TITLE_RE.match(correction)
+    if title:
+        return {'title': title.group(1).strip()}
+    description = DESCRIPTION_RE.match(correction)
+    if description:
+        return {'description': description.group(1).strip()}
+
+    text = correction.lower().strip().rstrip('.!')
+    new_date = None
+    new_time = None
+    changes: Dict[str, Any] = {}
+
+    match = DAY_RE.search(text)
+    if match:
+        new_date = (now + timedelta(days=DAY_OFFSETS[match.group(1)])).date()
+        text = text[:match.start()] + ' ' + text[match.end():]
+
+    match = TIME_RE.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour > 23 or minute > 59:
+            # "25:70" - не время, пусть разбирается модель
+            return None
+        new_time = time(hour, minute)
+        text = text[:match.start()] + ' ' + text[match.end():]
+    else:
+        match = HOUR_RE.search(text)
+        if match:
+            hour = int(match.group(1))
+            if hour > 23:
+                return None
+            if match.group(2) in ('дня', 'вечера') and hour < 12:
+                hour += 12
+            new_time = time(hour, 0)
+            text = text[:match.start()] + ' ' + text[match.end():]
+
+    minutes = None
+    match = DURATION_WORD_RE.search(text)
+    if match:
+        word = ' '.join(match.group(1).split())
+        minutes = 90 if word.startswith('полтора') else DURATION_WORDS[word]
+        text = text[:match.start()] + ' ' + text[match.end():]
+    else:
+        match = DURATION_RE.search(text)
+        if match:
+            minutes = parse_duration(match.group(1))
+            text = text[:match.start()] + ' ' + text[match.end():]
+    if minutes is not None:
+        sign = DURATION_SIGN_RE.match(text)
+        if sign:
+            current = _current_duration(payload)
+            if current is None:
+                return None
+            minutes = current + minutes if sign.group(1) == 'продли' else current - minutes
+            if minutes <= 0:
+                return None
+        changes['duration_minutes'] = minutes
+
+    # Что-то кроме служебных слов осталось - пусть разбирается модель
+    leftover = [word for word in re.split(r'[\s,]+', text) if word and word not in FILLER_WORDS]
+    if leftover:
+        return None
+
+    if new_date or new_time:
+        field = _time_field(payload)
+        current = getattr(payload, field) or now.replace(second=0, microsecond=0)
+        changes[field] = datetime.combine(new_date or current.date(), new_time or current.time())
+
+    return changes or None
+
+
+def apply_changes(payload: Union[CalendarEvent, Task], changes: Dict[str, Any]) -> Union[CalendarEvent, Task]:
+    """Применяет изменения к копии события/задачи, сохраняя согласованность времени"""
+    data = payload.model_dump()
+    data.update({key: value for key, value in changes.items() if key in data})
+    if isinstance(payload, CalendarEvent):
+        if changes.get('duration_minutes') is not None:
+            data['end_time'] = None
+        if changes.get('end_time') is not None:
+            data['duration_minutes'] = None
+
+    updated = type(payload).model_validate(data)
+
+    # Перенос начала с известным окончанием сдвигает и окончание
+    if (isinstance(payload, CalendarEvent) and 'start_time' in changes and payload.end_time
+            and 'end_time' not in changes and 'duration_minutes' not in changes):
+        updated.end_time = payload.end_time + (updated.start_time - payload.start_time)
+    return updated
@@ -1,15 +1,23 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import os
 import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+import deadline
+import tracing
 from logger import calendar_logger
 
 
 SCOPES = ['https://www.googleapis.com/auth/calendar', 'https://www.googleapis.com/auth/tasks']
 
+# Максимум вложенных запросов в одном batch-запросе Calendar API
+BATCH_LIMIT = 50
+
 
 class GoogleCalendarClient:
     def __init__(self, credentials_path: str = "credentials.json"):
@@ -19,6 +27,16 @@ class GoogleCalendarClient:
         if not os.path.exists(self.credentials_path):
             raise Exception(f"Credentials file not found: {self.credentials_path}")
 
+        # httplib2 не потокобезопасен, а вызовы приходят из пула потоков бота
+        self._lock = threading.Lock()
+        # Обновление токена идет через requests, а не httplib2 - отдельная блокировка от двойного обновления
+        self._refresh_lock = threading.Lock()
+        self.credentials: Optional[Credentials] = None
+        # Последний запрос по каждому сервису (time.monotonic()) - соединение еще открыто
+        self._last_used: Dict[str, float] = {}
+        self.keepalive_seconds = float(os.getenv('GOOGLE_KEEPALIVE_SECONDS', '60'))
+        self.refresh_margin = timedelta(seconds=float(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', '300')))
+
         services = self._authenticate()
         self.calendar_service = services.get('calendar')
         self.tasks_service = services.get('tasks')
@@ -38,6 +56,7 @@ class GoogleCalendarClient:
                 
                 if creds and creds.valid:
                     calendar_logger.info("Using Google token from environment")
+                    self.credentials = creds
                     return {
                         'calendar': build('calendar', 'v3', credentials=creds),
                         'tasks': build('tasks', 'v1', credentials=creds)
@@ -70,6 +89,7 @@ class GoogleCalendarClient:
             
             print("✅ Авторизация завершена успешно!")
             print("⚠️ ВАЖНО: Скопируйте токен выше в main.env для постоянного использования")
+            self.credentials = creds
             return {
                 'calendar': build('calendar', 'v3', credentials=creds),
                 'tasks': build('tasks', 'v1', credentials=creds)
@@ -90,10 +110,92 @@ class GoogleCalendarClient:
         except Exception as e:
             calendar_logger.warning(f"Unable to serialize credentials for copy/paste: {e}")
 
-    def create_event(self, event_data: Dict[str, Any], calendar_id: str = 'primary') -> Optional[Dict[str, Any]]:
+    def prepare_event(self, event_data: Dict[str, Any], calendar_id: str = 'primary'):
+        """Готовый запрос вставки события (тело уже сериализовано) для create_event(prepared=...)"""
+        return self.calendar_service.events().insert(calendarId=calendar_id, body=event_data)
+
+    @staticmethod
+    def _tasklist_id(tasklist: Optional[str]) -> str:
+        """Список задач: GOOGLE_TASKLIST_ID, иначе переданный, иначе '@default'"""
+        return os.getenv('GOOGLE_TASKLIST_ID') or tasklist or '@default'
+
+    def prepare_task(self, task_data: Dict[str, Any], tasklist: str = '@default'):
+        """Готовый запрос вставки задачи для create_task(prepared=...)"""
+        return self.tasks_service.tasks().insert(tasklist=self._tasklist_id(tasklist), body=task_data)
+
+    def _token_expiring(self) -> bool:
+        creds = self.credentials
+        return creds is not None and bool(creds.refresh_token) and (
+            creds.expired or (creds.expiry is not None
+                              and creds.expiry - datetime.now(timezone.utc).replace(tzinfo=None) < self.refresh_margin))
+
+    def _idle(self, service: str) -> bool:
+        return time.monotonic() - self._last_used.get(service, float('-inf')) > self.keepalive_seconds
+
+    @tracing.traced('google.prewarm')
+    def prewarm(self, service: str = 'calendar') -> bool:
+        """
+        Готовит быструю вставку: обновляет токен, если он скоро истечет, и открывает соединение
+        с API легким запросом, если сервис простаивал дольше GOOGLE_KEEPALIVE_SECONDS
+
+        Args:
+            service: 'calendar' или 'tasks' - у API разные хосты и соединения
+
+        Returns:
+            True, если был сетевой запрос (обновление токена или прогрев соединения)
+
+        Вставки и пакеты других пользователей прогрев не ждут: токен обновляется вне общей
+        блокировки, а соединение прогревается, только если оно свободно - занятое и так открыто.
+        """
+        warmed = False
+        if self._token_expiring():
+            with self._refresh_lock:
+                if self._token_expiring():
+                    self.credentials.refresh(Request())
+                    calendar_logger.info("Google token refreshed ahead of confirmation")
+                    warmed = True
+
+        if self._idle(service) and self._lock.acquire(blocking=False):
+            try:
+                if self._idle(service):
+                    if service == 'tasks':
+                        self.tasks_service.tasklists().list(maxResults=1).execute()
+                    else:
+                        self.calendar_service.colors().get().execute()
+                    self._last_used[service] = time.monotonic()
+                    warmed = True
+            finally:
+                self._lock.release()
+        tracing.set_attribute('warmed', warmed)
+        return warmed
+
+    def close_connections(self):
+        """Закрывает открытые HTTP-соединения сервисов (следующий запрос откроет новое)"""
+        with self._lock:
+            for service in (self.calendar_service, self.tasks_service):
+                http = getattr(getattr(service, '_http', None), 'http', None)
+                for connection in getattr(http, 'connections', {}).values():
+                    connection.close()
+                if http is not None:
+                    http.connections.clear()
+            self._last_used.clear()
+
+    @tracing.traced('google.create_event')
+    def create_event(self, event_data: Dict[str, Any], calendar_id: str = 'primary',
+                     prepared=None) -> Optional[Dict[str, Any]]:
+        """
+        Args:
+            prepared: запрос из prepare_event с тем же телом - отправляется без повторной сборки
+        """
         try:
             calendar_logger.log_calendar_request(event_data)
-            event = self.calendar_service.events().insert(calendarId=calendar_id, body=event_data).execute()
+            tracing.set_attribute('prepared', prepared is not None)
+            request = prepared or self.calendar_service.events().insert(calendarId=calendar_id, body=event_data)
+            with self._lock:
+                # Ожидание блокировки могло съесть бюджет - вызов после дедлайна не отправляем
+                deadline.check('google.create_event')
+                event = request.execute()
+                self._last_used['calendar'] = time.monotonic()
             result = {
                 'success': True,
                 'event_id': event.get('id'),
@@ -112,19 +214,25 @@ class GoogleCalendarClient:
             calendar_logger.log_error(e, "google_calendar_client.create_event")
             return result
 
-    def create_task(self, task_data: Dict[str, Any], tasklist: str = '@default') -> Optional[Dict[str, Any]]:
-        """Create a task. Resolve tasklist id from env or by matching common titles, validate and fallback to '@default'."""
+    @tracing.traced('google.create_task')
+    def create_task(self, task_data: Dict[str, Any], tasklist: str = '@default',
+                    prepared=None) -> Optional[Dict[str, Any]]:
+        """Create a task in GOOGLE_TASKLIST_ID, the given tasklist or '@default'.
+
+        prepared: request from prepare_task with the same body, sent as is.
+        """
         try:
             calendar_logger.log_calendar_request(task_data)
+            tracing.set_attribute('prepared', prepared is not None)
 
-            tasklist_id = os.getenv('GOOGLE_TASKLIST_ID')
-
-            if not tasklist_id:
-                tasklist_id = tasklist or '@default'
-
+            tasklist_id = self._tasklist_id(tasklist)
             calendar_logger.info(f"Using tasklist id: {tasklist_id}")
 
-            task = self.tasks_service.tasks().insert(tasklist=tasklist_id, body=task_data).execute()
+            request = prepared or self.tasks_service.tasks().insert(tasklist=tasklist_id, body=task_data)
+            with self._lock:
+                deadline.check('google.create_task')
+                task = request.execute()
+                self._last_used['tasks'] = time.monotonic()
             result = {
                 'success': True,
                 'task_id': task.get('id'),
@@ -144,3 +252,84 @@ class GoogleCalendarClient:
             calendar_logger.log_calendar_response(False, result)
             calendar_logger.log_error(e, "google_calendar_client.create_task")
             return result
+
+    def _execute_batch(self, service, make_request, bodies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Выполняет вставки пачками по BATCH_LIMIT; возвращает ответ или исключение по каждому телу"""
+        responses: List[Any] = [None] * len(bodies)
+
+        for chunk_start in range(0, len(bodies), BATCH_LIMIT):
+            if deadline.expired():
+                # Оставшиеся пачки не отправляются; их элементы возвращаются как ошибки
+                error = deadline.DeadlineExceeded("Дедлайн истек до отправки пачки")
+                for index in range(chunk_start, len(bodies)):
+                    responses[index] = error
+                break
+
+            def callback(request_id, response, exception):
+                responses[int(request_id)] = exception if exception is not None else response
+
+            batch = service.new_batch_http_request(callback=callback)
+            for index in range(chunk_start, min(chunk_start + BATCH_LIMIT, len(bodies))):
+                batch.add(make_request(bodies[index]), request_id=str(index))
+            with self._lock:
+                batch.execute()
+                self._last_used['calendar' if service is self.calendar_service else 'tasks'] = time.monotonic()
+
+        return responses
+
+    @tracing.traced('google.create_events_batch')
+    def create_events_batch(self, events_data: List[Dict[str, Any]], calendar_id: str = 'primary') -> List[Dict[str, Any]]:
+        """Создает несколько событий batch-запросами (одно HTTP-соединение на пачку)"""
+        responses = self._execute_batch(
+            self.calendar_service,
+            lambda body: self.calendar_service.events().insert(calendarId=calendar_id, body=body),
+            events_data
+        )
+        results = []
+        for event_data, response in zip(events_data, responses):
+            if isinstance(response, Exception) or response is None:
+                results.append({
+                    'success': False,
+                    'error': str(response),
+                    'message': f"Ошибка при создании события '{event_data.get('summary')}': {response}"
+                })
+            else:
+                results.append({
+                    'success': True,
+                    'event_id': response.get('id'),
+                    'event_link': response.get('htmlLink'),
+                    'message': f"Событие '{event_data.get('summary')}' создано успешно"
+                })
+        calendar_logger.info(
+            f"Batch events created: {sum(r['success'] for r in results)}/{len(results)}"
+        )
+        return results
+
+    @tracing.traced('google.create_tasks_batch')
+    def create_tasks_batch(self, tasks_data: List[Dict[str, Any]], tasklist: str = '@default') -> List[Dict[str, Any]]:
+        """Создает несколько задач batch-запросами"""
+        tasklist_id = self._tasklist_id(tasklist)
+        responses = self._execute_batch(
+            self.tasks_service,
+            lambda body: self.tasks_service.tasks().insert(tasklist=tasklist_id, body=body),
+            tasks_data
+        )
+        results = []
+        for task_data, response in zip(tasks_data, responses):
+            if isinstance(response, Exception) or response is None:
+                results.append({
+                    'success': False,
+                    'error': str(response),
+                    'message': f"Ошибка при создании задачи '{task_data.get('title')}': {response}"
+                })
+            else:
+                results.append({
+                    'success': True,
+                    'task_id': response.get('id'),
+                    'task': response,
+                    'message': f"Задача '{task_data.get('title')}' создана успешно"
+                })
+        calendar_logger.info(
+            f"Batch tasks created: {sum(r['success'] for r in results)}/{len(results)}"
+        )
+        return results
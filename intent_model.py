@@ -0,0 +1,159 @@
+"""
+Легкий локальный классификатор запросов: символьные n-граммы (TF-IDF, hashing trick) и
+логистическая регрессия на NumPy
+
+Обучается по логам calendar_logger (строки "Request classified as: ..." с текстом запроса),
+загружается из .npz за миллисекунды и классифицирует быстрее 1 мс. ClassificationHandler
+вызывает модель только если отрыв лучшего класса от второго меньше INTENT_MODEL_MARGIN.
+"""
+
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logger import calendar_logger
+
+
+LABELS = ('calendar_event', 'task', 'note')
+DEFAULT_DIM = 1 << 16
+NGRAM_RANGE = (2, 4)
+
+# Строки лога с меткой классификатора; текст запроса - в той же строке или в предыдущей USER_REQUEST / INTENT_RULE
+CLASSIFIED_RE = re.compile(r'Request classified as: (\w+)(?: \(combined\))?(?: \| Message: (.*))?$')
+MESSAGE_RE = re.compile(r'(?:USER_REQUEST \| User: .*? \| Message: |INTENT_RULE \| .*? \| Message: )(.*) \| Time: ')
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace('ё', 'е')
+    text = re.sub(r'\d', '0', text)
+    return ' ' + ' '.join(text.split()) + ' '
+
+
+def featurize(text: str, dim: int = DEFAULT_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """Индексы и частоты хешированных символьных n-грамм (crc32 - стабилен между процессами)"""
+    text = _normalize(text)
+    counts: Dict[int, int] = {}
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(text) - n + 1):
+            index = zlib.crc32(text[i:i + n].encode('utf-8')) % dim
+            counts[index] = counts.get(index, 0) + 1
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    return indices, values
+
+
+def load_training_data(log_paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    Пары (текст, метка) из логов calendar_assistant.log
+
+    Метка unknown пропускается. Если в строке классификации нет текста (старые логи), берется
+    текст последней строки USER_REQUEST / INTENT_RULE до нее.
+    """
+    pairs = []
+    for path in log_paths:
+        last_message = None
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                match = CLASSIFIED_RE.search(line)
+                if match:
+                    label, message = match.group(1), match.group(2) or last_message
+                    if label in LABELS and message:
+                        pairs.append((message.removeprefix('[VOICE] ').strip(), label))
+                    last_message = None
+                    continue
+                match = MESSAGE_RE.search(line)
+                if match and not match.group(1).startswith('[IMPORT]'):
+                    last_message = match.group(1)
+    return pairs
+
+
+class IntentModel:
+    """Мультиклассовая логистическая регрессия по TF-IDF хешированных символьных n-грамм"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, idf: np.ndarray, labels: Sequence[str] = LABELS):
+        self.weights = weights
+        self.bias = bias
+        self.idf = idf
+        self.labels = tuple(labels)
+        self.dim = weights.shape[0]
+
+    def _vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        indices, values = featurize(text, self.dim)
+        values = values * self.idf[indices]
+        norm = float(np.sqrt(np.dot(values, values)))
+        return indices, values / norm if norm else values
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        indices, values = self._vector(text)
+        logits = values @ self.weights[indices] + self.bias
+        logits = np.exp(logits - logits.max())
+        return logits / logits.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Класс и отрыв его вероятности от второго по вероятности класса"""
+        proba = self.predict_proba(text)
+        order = np.argsort(proba)[::-1]
+        return self.labels[order[0]], float(proba[order[0]] - proba[order[1]])
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], dim: int = DEFAULT_DIM, epochs: int = 300,
+              learning_rate: float = 2.0, l2: float = 1e-4) -> 'IntentModel':
+        """Полный градиентный спуск по разреженной матрице признаков"""
+        label_index = {label: i for i, label in enumerate(LABELS)}
+        y = np.array([label_index[label] for label in labels])
+        n, k = len(texts), len(LABELS)
+
+        features = [featurize(text, dim) for text in texts]
+        rows = np.concatenate([np.full(len(indices), row) for row, (indices, _) in enumerate(features)])
+        cols = np.concatenate([indices for indices, _ in features])
+        tf = np.concatenate([values for _, values in features])
+
+        document_frequency = np.bincount(cols, minlength=dim)
+        idf = (np.log((1 + n) / (1 + document_frequency)) + 1).astype(np.float32)
+        vals = tf * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=vals * vals, minlength=n))
+        vals = (vals / norms[rows]).astype(np.float32)
+
+        weights = np.zeros((dim, k), dtype=np.float32)
+        bias = np.zeros(k, dtype=np.float32)
+        targets = np.eye(k, dtype=np.float32)[y]
+        for _ in range(epochs):
+            logits = np.stack([np.bincount(rows, weights=vals * weights[cols, j], minlength=n) for j in range(k)], axis=1)
+            logits += bias
+            logits -= logits.max(axis=1, keepdims=True)
+            proba = np.exp(logits)
+            proba /= proba.sum(axis=1, keepdims=True)
+            error = (proba - targets) / n
+            gradient = np.stack([np.bincount(cols, weights=vals * error[rows, j], minlength=dim) for j in range(k)], axis=1)
+            weights -= learning_rate * (gradient.astype(np.float32) + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0).astype(np.float32)
+
+        return cls(weights, bias, idf)
+
+    def save(self, path: str):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, idf=self.idf, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str) -> 'IntentModel':
+        with np.load(path) as data:
+            return cls(data['weights'], data['bias'], data['idf'], [str(label) for label in data['labels']])
+
+
+def load_intent_model(path: Optional[str] = None) -> Optional[IntentModel]:
+    """Модель из INTENT_MODEL_PATH (по умолчанию intent_model.npz рядом с модулем) или None, если не обучена"""
+    path = path or os.getenv('INTENT_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_model.npz'))
+    if not os.path.exists(path):
+        return None
+    try:
+        model = IntentModel.load(path)
+        calendar_logger.info(f"Intent model loaded from {path}")
+        return model
+    except Exception as e:
+        calendar_logger.log_error(e, "intent_model.load_intent_model")
+        return None
@@ -0,0 +1,111 @@
+"""
+Быстрая классификация запроса правилами, до вызова модели
+
+Скомпилированные регулярные выражения дают признаки с весами для классов calendar_event,
+task и note; уверенность - softmax сумм весов. Если она не ниже порога (INTENT_RULES_THRESHOLD),
+ClassificationHandler не вызывает модель. Каждое решение пишется в лог (INTENT_RULE) для
+подстройки правил.
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+LABELS = ('calendar_event', 'task', 'note')
+
+_TIME = r'(?:\d{1,2}[:.]\d{2}|\d{1,2}\s*(?:час(?:а|ов)?|ч\b)|(?:в|к|до|с)\s+\d{1,2}(?!\s*(?:числа|[а-я]{3,})))'
+_WEEKDAY = r'(?:понедельник|вторник|сред[уа]|четверг|пятниц[уа]|суббот[уа]|воскресенье)'
+_MONTH = r'(?:январ|феврал|март|апрел|ма[йя]|июн|июл|август|сентябр|октябр|ноябр|декабр)[а-я]*'
+
+# (имя признака, класс, вес, выражение)
+RULES: List[Tuple[str, str, float, re.Pattern]] = [
+    # Явные префиксы "Заметка: ...", "Запомни: ..."
+    ('note_prefix', 'note', 5.0,
+     re.compile(r'^\s*(?:заметка|запомни|запиши|идея|мысль|цитата|на заметку)\s*[:\-—]', re.IGNORECASE)),
+    ('note_verb', 'note', 2.5, re.compile(r'^\s*(?:запомни|запиши|сохрани)\b', re.IGNORECASE)),
+    ('note_content', 'note', 1.5,
+     re.compile(r'\b(?:рецепт|пароль|список|цитата|номер телефона|адрес|размер|ссылка)\b', re.IGNORECASE)),
+    ('phone_or_url', 'note', 1.5, re.compile(r'(?:\+?\d[\d\- ]{8,}\d|https?://\S+)')),
+    # Напоминания и дела
+    ('remind_verb', 'task', 4.0, re.compile(r'^\s*(?:напомни|напомнить|напоминание)\b', re.IGNORECASE)),
+    ('task_prefix', 'task', 5.0, re.compile(r'^\s*(?:задача|todo|to-do|дело)\s*[:\-—]', re.IGNORECASE)),
+    ('need_to', 'task', 2.0, re.compile(r'^\s*(?:нужно|надо|не забыть|не забудь)\b', re.IGNORECASE)),
+    ('task_infinitive', 'task', 2.0,
+     re.compile(r'^\s*(?:купить|позвонить|отправить|оплатить|забрать|написать|записаться|записать\s+\S+\s+к|'
+                r'подготовить|продлить|поменять|заказать|сдать|отнести|починить|проверить)\b', re.IGNORECASE)),
+    ('deadline', 'task', 1.5, re.compile(rf'\bдо\s+(?:{_WEEKDAY}|конца|завтра|вечера|\d{{1,2}}\s*(?:числа|{_MONTH}))',
+                                         re.IGNORECASE)),
+    # События: время, встречи, длительность, повтор
+    ('meeting_noun', 'calendar_event', 2.5,
+     re.compile(r'\b(?:встреча|встречу|созвон|планерк[аиу]|совещание|собеседование|вебинар|конференци[яю]|'
+                r'ужин|обед|завтрак|тренировк[аиу]|спортзал|йога|стоматолог|врач|при[её]м|концерт|кино|'
+                r'день рождения|свидание|митинг|стендап|лекци[яю]|занятие)\b', re.IGNORECASE)),
+    ('clock_time', 'calendar_event', 2.0, re.compile(_TIME, re.IGNORECASE)),
+    ('day_word', 'calendar_event', 1.0,
+     re.compile(rf'\b(?:сегодня|завтра|послезавтра|в\s+{_WEEKDAY}|\d{{1,2}}\s+(?:числа|{_MONTH}))\b', re.IGNORECASE)),
+    ('time_range', 'calendar_event', 2.0,
+     re.compile(r'(?:\b(?:с|от)\s+\d{1,2}(?:[:.]\d{2})?\s+до\s+\d{1,2}|\d{1,2}[:.]\d{2}\s*[-–]\s*\d{1,2}[:.]\d{2})',
+                re.IGNORECASE)),
+    ('duration', 'calendar_event', 1.5,
+     re.compile(r'\b(?:длительностью|на\s+(?:\d+\s*(?:час|мин)|полчаса|час))', re.IGNORECASE)),
+    ('recurrence', 'calendar_event', 1.5,
+     re.compile(rf'\b(?:кажд(?:ый|ую|ое)|по\s+будням|ежедневно|еженедельно)\b', re.IGNORECASE)),
+]
+
+# Длинный текст без времени - скорее заметка
+LONG_TEXT_WORDS = 25
+
+
+@dataclass
+class RuleDecision:
+    """Решение правил по одному запросу"""
+    label: Optional[str]  # самый вероятный класс или None, если ни одно правило не сработало
+    confidence: float
+    features: List[str] = field(default_factory=list)
+    scores: Dict[str, float] = field(default_factory=dict)
+    bypass: bool = False  # уверенность не ниже порога - модель не нужна
+
+
+def score_request(text: str) -> RuleDecision:
+    """Признаки и уверенность правил для текста запроса (без порога)"""
+    scores = {label: 0.0 for label in LABELS}
+    features = []
+    for name, label, weight, pattern in RULES:
+        if pattern.search(text):
+            scores[label] += weight
+            features.append(name)
+
+    has_time = 'clock_time' in features or 'day_word' in features
+    if len(text.split()) >= LONG_TEXT_WORDS and not has_time:
+        scores['note'] += 2.0
+        features.append('long_text')
+    # "Напомни ... в 17" - напоминание со сроком остается задачей, время не делает его событием
+    if 'remind_verb' in features and 'meeting_noun' not in features:
+        scores['calendar_event'] = min(scores['calendar_event'], 1.0)
+
+    if not features:
+        return RuleDecision(None, 0.0, features, scores)
+
+    # softmax по суммам весов
+    top = max(scores.values())
+    exps = {label: math.exp(score - top) for label, score in scores.items()}
+    total = sum(exps.values())
+    label = max(exps, key=exps.get)
+    return RuleDecision(label, exps[label] / total, features, scores)
+
+
+def classify_by_rules(text: str, threshold: Optional[float] = None) -> RuleDecision:
+    """
+    Классифицирует запрос правилами
+
+    Returns:
+        RuleDecision; bypass False, если уверенность ниже порога (INTENT_RULES_THRESHOLD, по умолчанию 0.9;
+        больше 1 - правила не используются) - тогда классифицирует модель
+    """
+    threshold = threshold if threshold is not None else float(os.getenv('INTENT_RULES_THRESHOLD', '0.9'))
+    decision = score_request(text)
+    decision.bypass = decision.label is not None and decision.confidence >= threshold
+    return decision
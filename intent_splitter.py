@@ -0,0 +1,112 @@
+"""
+Разделение сообщения с несколькими намерениями на отдельные запросы
+
+"завтра в 10 планерка, в 15 звонок клиенту и запомни купить молоко" - три запроса. Сначала
+локальные правила: сообщение делится по разделителям (перевод строки, ";", конец предложения,
+запятая, "и", "потом", "а также"), и часть отделяется, только если и она, и предыдущая часть
+похожи на самостоятельный запрос - есть время суток или глагол запроса и что-то кроме них.
+Дата первой части переносится на следующие, где есть только время. Если правила нашли один
+запрос, но в тексте несколько указаний времени или глаголов запроса, решение за моделью
+(SegmentationHandler).
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+from intent_rules import score_request
+from temporal_parser import count_clock_times, day_phrase, parse_temporal
+
+
+STRONG_SEPARATOR_RE = re.compile(r'(?:\s*\n+\s*|\s*;\s*|(?<=[.!?])\s+(?=[А-ЯЁA-Z]))')
+WEAK_SEPARATOR_RE = re.compile(
+    r'(?:\s*,\s*(?:(?:а|и)\s+(?:также\s+|еще\s+|ещё\s+)?|потом\s+|затем\s+|еще\s+|ещё\s+)?|'
+    r'\s+(?:а\s+также|а\s+потом|и\s+потом|потом|затем|и\s+еще|и\s+ещё|и)\s+)',
+    re.IGNORECASE
+)
+# Признаки intent_rules, с которых начинается самостоятельный запрос
+INTENT_FEATURES = {'note_prefix', 'note_verb', 'remind_verb', 'task_prefix', 'need_to', 'task_infinitive'}
+TIME_FEATURES = {'clock_time', 'time_range'}
+MAX_SEGMENTS = 10
+
+
+@dataclass
+class SplitDecision:
+    """Результат локального разделения"""
+    segments: List[str] = field(default_factory=list)
+    needs_model: bool = False  # правила нашли один запрос, но признаки говорят о нескольких
+
+
+def _is_intent(segment: str) -> bool:
+    """Часть - самостоятельный запрос: время суток или глагол запроса и непустое название"""
+    features = set(score_request(segment).features)
+    if features & INTENT_FEATURES:
+        return len(segment.split()) >= 2
+    if features & TIME_FEATURES:
+        return bool(parse_temporal(segment).title)
+    return False
+
+
+def _split_weak(text: str) -> List[str]:
+    # "Идея: позвонить и купить ..." - содержимое заметки не делится
+    if {'note_prefix', 'task_prefix'} & set(score_request(text).features):
+        return [text]
+    pieces = WEAK_SEPARATOR_RE.split(text)
+    segments: List[str] = []
+    current = pieces[0]
+    for separator, piece in zip(WEAK_SEPARATOR_RE.findall(text), pieces[1:]):
+        if _is_intent(current) and _is_intent(piece):
+            segments.append(current)
+            current = piece
+        else:
+            current = current + separator + piece
+    segments.append(current)
+    return segments
+
+
+def _carry_day(segments: List[str]) -> List[str]:
+    """Дата из предыдущей части для частей, где есть только время ("завтра в 10 ..., в 15 ...")"""
+    carried = None
+    result = []
+    for segment in segments:
+        phrase = day_phrase(segment)
+        if phrase:
+            carried = phrase
+        elif carried and count_clock_times(segment):
+            segment = f"{carried} {segment}"
+        result.append(segment)
+    return result
+
+
+def split_locally(text: str) -> SplitDecision:
+    """Делит сообщение правилами; segments из одного элемента - запрос один"""
+    segments = []
+    for block in STRONG_SEPARATOR_RE.split(text.strip()):
+        block = block.strip(' ,.')
+        if block:
+            segments.extend(part.strip(' ,.') for part in _split_weak(block))
+
+    # Части без самостоятельного смысла возвращаются к предыдущей
+    merged: List[str] = []
+    for segment in segments:
+        if merged and not _is_intent(segment) and not _is_intent(merged[-1]):
+            merged[-1] = f"{merged[-1]}, {segment}"
+        elif merged and not _is_intent(segment) and len(segment.split()) < 3:
+            merged[-1] = f"{merged[-1]}, {segment}"
+        else:
+            merged.append(segment)
+
+    if len(merged) > 1 and len(merged) <= MAX_SEGMENTS:
+        return SplitDecision(_carry_day(merged))
+
+    # Несколько указаний времени или глаголов запроса в одной части - пусть разделит модель
+    clauses = WEAK_SEPARATOR_RE.split(text)
+    verbs = sum(1 for clause in clauses if set(score_request(clause.strip()).features) & INTENT_FEATURES)
+    needs_model = count_clock_times(text) >= 2 or verbs >= 2
+    return SplitDecision([text.strip()], needs_model=needs_model)
+
+
+def multi_intent_enabled() -> bool:
+    """MULTI_INTENT_SPLIT: 1 - делить сообщения на запросы (по умолчанию), 0 - всегда один запрос"""
+    return os.getenv('MULTI_INTENT_SPLIT', '1').lower() not in ('0', 'false', 'no', 'off')
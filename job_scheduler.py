@@ -0,0 +1,269 @@
+"""
+Планировщик задач бота: очереди FIFO на пользователя, глобальный лимит и лимиты по этапам с приоритетами
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from logger import calendar_logger
+
+
+DEFAULT_STAGE_LIMITS = "asr=1,llm=1,google=2"
+
+
+class QueueFullError(Exception):
+    """Очередь пользователя заполнена, задача не принята"""
+
+    def __init__(self, depth: int):
+        super().__init__(f"Очередь заполнена ({depth} задач)")
+        self.depth = depth
+
+
+@dataclass
+class _Job:
+    run: Callable[[], Awaitable[None]]
+    name: str
+    priority: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class _StageSlot:
+    """Занятый слот этапа; hold() не отпускает его, пока брошенный по таймауту вызов еще выполняется"""
+
+    def __init__(self):
+        self.pending: Optional[asyncio.Future] = None
+
+    def hold(self, future: asyncio.Future):
+        self.pending = future
+
+
+class _PrioritySemaphore:
+    """Семафор, отдающий освободившийся слот ожидающему с наименьшим приоритетом (при равном - FIFO)"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = []  # куча (priority, seq, future)
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int = 0):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже передан этой задаче - отдаем следующему
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+def _parse_stage_limits(spec: str) -> Dict[str, int]:
+    """Разбирает строку вида "asr=1,llm=1,google=2" """
+    limits = {}
+    for part in spec.split(','):
+        if '=' not in part:
+            continue
+        name, value = part.split('=', 1)
+        name = name.strip()
+        if name and value.strip().isdigit():
+            limits[name] = max(1, int(value.strip()))
+    return limits
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class JobScheduler:
+    """Планировщик задач пользователей
+
+    - у каждого пользователя своя очередь FIFO, ответы приходят в порядке запросов;
+    - одновременно выполняется не больше max_concurrent задач во всем боте;
+    - этапы (asr, llm, google) дополнительно ограничены своими семафорами;
+    - свободный слот (глобальный или этапа) достается задаче с меньшим priority,
+      например короткому голосовому раньше получасовой записи;
+    - при переполнении очереди пользователя задача отклоняется (backpressure).
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_queue_per_user: Optional[int] = None,
+                 stage_limits: Optional[Dict[str, int]] = None):
+        self.max_concurrent = max_concurrent or int(os.getenv('SCHEDULER_MAX_CONCURRENT', '4'))
+        self.max_queue_per_user = max_queue_per_user or int(os.getenv('SCHEDULER_MAX_QUEUE_PER_USER', '5'))
+        if stage_limits is None:
+            stage_limits = _parse_stage_limits(os.getenv('SCHEDULER_STAGE_LIMITS', DEFAULT_STAGE_LIMITS))
+        self.stage_limits = stage_limits
+
+        self._global = _PrioritySemaphore(self.max_concurrent)
+        self._stages = {name: _PrioritySemaphore(limit) for name, limit in stage_limits.items()}
+        self._queues: Dict[str, Deque[_Job]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+
+        # Метрики
+        self._running = 0
+        self._stage_active: Dict[str, int] = {name: 0 for name in stage_limits}
+        self._stage_waiting: Dict[str, int] = {name: 0 for name in stage_limits}
+        self._queue_waits: Deque[float] = deque(maxlen=500)
+        self._stage_waits: Dict[str, Deque[float]] = {name: deque(maxlen=500) for name in stage_limits}
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def queue_depth(self, user_id: str) -> int:
+        """Количество задач пользователя, включая выполняющуюся"""
+        return len(self._queues.get(user_id, ()))
+
+    def submit(self, user_id: str, run: Callable[[], Awaitable[None]], name: str = "job", priority: int = 0) -> int:
+        """
+        Ставит задачу в очередь пользователя
+
+        Args:
+            user_id: идентификатор пользователя (ключ очереди)
+            run: фабрика корутины задачи
+            name: имя задачи для логов
+            priority: приоритет при ожидании глобального слота (меньше - раньше)
+
+        Returns:
+            Позиция в очереди: 0 - задача начнет выполняться без ожидания своей очереди
+
+        Raises:
+            QueueFullError: если в очереди пользователя уже max_queue_per_user задач
+        """
+        queue = self._queues.setdefault(user_id, deque())
+        if len(queue) >= self.max_queue_per_user:
+            self._rejected += 1
+            calendar_logger.warning(f"JobScheduler: queue full for user {user_id} ({len(queue)} jobs), rejecting {name}")
+            raise QueueFullError(len(queue))
+
+        position = len(queue)
+        queue.append(_Job(run=run, name=name, priority=priority))
+
+        if user_id not in self._workers:
+            self._workers[user_id] = asyncio.create_task(self._drain(user_id))
+        return position
+
+    async def _drain(self, user_id: str):
+        """Последовательно выполняет задачи одного пользователя"""
+        queue = self._queues[user_id]
+        try:
+            while queue:
+                job = queue[0]
+                await self._global.acquire(job.priority)
+                wait = time.monotonic() - job.submitted_at
+                self._queue_waits.append(wait)
+                self._running += 1
+                try:
+                    await job.run()
+                    self._completed += 1
+                except Exception as e:
+                    self._failed += 1
+                    calendar_logger.log_error(e, f"JobScheduler.{job.name}")
+                finally:
+                    self._running -= 1
+                    queue.popleft()
+                    self._global.release()
+        finally:
+            # Между проверкой очереди и удалением нет await - новая задача не потеряется
+            self._workers.pop(user_id, None)
+            if not queue:
+                self._queues.pop(user_id, None)
+
+    async def drain(self, timeout: float = 30.0) -> bool:
+        """
+        Дожидается завершения всех поставленных задач (graceful shutdown)
+
+        Returns:
+            True, если все очереди опустели до истечения timeout
+        """
+        workers = list(self._workers.values())
+        if not workers:
+            return True
+        calendar_logger.info(f"JobScheduler: draining {len(workers)} user queue(s)")
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        if pending:
+            calendar_logger.warning(f"JobScheduler: {len(pending)} user queue(s) not drained in {timeout:g}s")
+        return not pending
+
+    @asynccontextmanager
+    async def stage(self, name: str, priority: int = 0):
+        """Ограничивает число одновременных вызовов этапа (asr, llm, google); priority - как в submit"""
+        semaphore = self._stages.get(name)
+        slot = _StageSlot()
+        if semaphore is None:
+            yield slot
+            return
+
+        started = time.monotonic()
+        self._stage_waiting[name] += 1
+        try:
+            await semaphore.acquire(priority)
+        finally:
+            self._stage_waiting[name] -= 1
+        self._stage_waits[name].append(time.monotonic() - started)
+        self._stage_active[name] += 1
+
+        def release(_=None):
+            self._stage_active[name] -= 1
+            semaphore.release()
+
+        try:
+            yield slot
+        finally:
+            if slot.pending is not None and not slot.pending.done():
+                # Поток еще работает: слот освободится, когда он закончит, а не по таймауту
+                slot.pending.add_done_callback(release)
+            else:
+                release()
+
+    def get_metrics(self) -> Dict:
+        """Глубина очередей, время ожидания и загрузка этапов"""
+        waits = list(self._queue_waits)
+        return {
+            'queued': sum(len(q) for q in self._queues.values()) - self._running,
+            'running': self._running,
+            'users': len(self._queues),
+            'max_user_depth': max((len(q) for q in self._queues.values()), default=0),
+            'completed': self._completed,
+            'failed': self._failed,
+            'rejected': self._rejected,
+            'wait_p50': _percentile(waits, 0.5),
+            'wait_p95': _percentile(waits, 0.95),
+            'wait_max': max(waits, default=0.0),
+            'stages': {
+                name: {
+                    'limit': self.stage_limits[name],
+                    'active': self._stage_active[name],
+                    'waiting': self._stage_waiting[name],
+                    'wait_p95': _percentile(list(self._stage_waits[name]), 0.95),
+                }
+                for name in self.stage_limits
+            },
+        }
@@ -7,5 +7,6 @@ from llm_inference.model_router import ModelRouter
 from llm_inference.local_provider import LocalProvider  
 from llm_inference.openrouter_provider import OpenRouterProvider
 from llm_inference.privacy_detector import PrivacyDetector
+from llm_inference.streaming import GenerationCancelled
 
-__all__ = ['ModelRouter', 'LocalProvider', 'OpenRouterProvider', 'PrivacyDetector']
+__all__ = ['ModelRouter', 'LocalProvider', 'OpenRouterProvider', 'PrivacyDetector', 'GenerationCancelled']
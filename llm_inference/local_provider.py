@@ -3,8 +3,11 @@
 """
 
 import requests
-from typing import Optional
+from typing import Callable, Iterator, Optional
+import deadline
+import tracing
 from logger import calendar_logger
+from llm_inference.streaming import collect_stream, stream_chat
 
 
 class LocalProvider:
@@ -14,16 +17,29 @@ class LocalProvider:
         self.api_url = api_url
         self.chat_url = f"{api_url}/v1/chat/completions"
         
+    @tracing.traced('llm.local.health')
     def is_available(self) -> bool:
         """Проверка доступности локальной модели"""
         try:
-            response = requests.get(f"{self.api_url}/v1/models", timeout=5)
+            response = requests.get(f"{self.api_url}/v1/models", timeout=deadline.timeout(5))
             return response.status_code == 200
         except:
             return False
     
-    def generate(self, messages: list, model_id: str = "local-model") -> Optional[str]:
-        """Генерация ответа от локальной модели"""
+    @tracing.traced('llm.local')
+    def generate(self, messages: list, model_id: str = "local-model",
+                 on_delta: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Генерация ответа от локальной модели
+
+        Args:
+            messages: сообщения чата
+            model_id: идентификатор модели
+            on_delta: если задан, ответ запрашивается потоком и каждый фрагмент передается в callback
+        """
+        if on_delta is not None:
+            return self._generate_streaming(messages, model_id, on_delta)
+
         try:
             response = requests.post(
                 self.chat_url,
@@ -32,7 +48,7 @@ class LocalProvider:
                     "messages": messages,
                     "stream": False
                 },
-                timeout=120
+                timeout=deadline.timeout(120)
             )
             
             if response.status_code == 200:
@@ -48,3 +64,11 @@ class LocalProvider:
         except Exception as e:
             calendar_logger.log_error(e, "LocalProvider.generate")
             return None
+
+    def stream(self, messages: list, model_id: str = "local-model") -> Iterator[str]:
+        """Потоковая генерация: возвращает фрагменты ответа по мере их появления"""
+        return stream_chat(self.chat_url, {"model": model_id, "messages": messages}, "Local model")
+
+    def _generate_streaming(self, messages: list, model_id: str, on_delta: Callable[[str], None]) -> Optional[str]:
+        """Собирает потоковый ответ целиком, передавая фрагменты в on_delta"""
+        return collect_stream(self.stream(messages, model_id), on_delta, "Local model", "LocalProvider.stream")
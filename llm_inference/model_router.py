@@ -3,7 +3,10 @@
 """
 
 import json
-from typing import Optional, Dict
+import os
+import deadline
+import tracing
+from typing import Callable, Optional, Dict
 from logger import calendar_logger
 from llm_inference.local_provider import LocalProvider
 from llm_inference.openrouter_provider import OpenRouterProvider
@@ -20,6 +23,8 @@ class ModelRouter:
         self.local_provider = LocalProvider()
         self.openrouter_provider = OpenRouterProvider()
         self.privacy_detector = PrivacyDetector()
+        # Если до дедлайна осталось меньше, модель с "fast_model_id" отвечает меньшей моделью
+        self.fast_model_threshold = float(os.getenv('DEADLINE_FAST_MODEL_SECONDS', '15'))
         
         calendar_logger.info("ModelRouter initialized")
     
@@ -63,7 +68,17 @@ class ModelRouter:
         
         return None
     
-    def generate(self, text: str, system_prompt: str = None, is_private: Optional[bool] = None) -> Optional[str]:
+    def _model_id(self, model: Dict, default: Optional[str] = None) -> str:
+        """Идентификатор модели с учетом дедлайна: при нехватке времени - fast_model_id из конфигурации"""
+        left = deadline.remaining()
+        if model.get("fast_model_id") and left is not None and left < self.fast_model_threshold:
+            calendar_logger.info(f"Deadline in {left:.1f}s, using fast model {model['fast_model_id']}")
+            tracing.set_attribute('degraded', 'fast_model')
+            return model["fast_model_id"]
+        return model.get("model_id", default)
+
+    def generate(self, text: str, system_prompt: str = None, is_private: Optional[bool] = None,
+                 on_delta: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         Генерация ответа с автоматическим выбором модели
         
@@ -71,6 +86,7 @@ class ModelRouter:
             text: Текст запроса
             system_prompt: Системный промпт (опционально)
             is_private: Явное указание приватности (опционально)
+            on_delta: Callback для фрагментов потокового ответа (опционально)
             
         Returns:
             Ответ модели или None в случае ошибки
@@ -79,6 +95,10 @@ class ModelRouter:
         if is_private is None:
             is_private = self.privacy_detector.is_private(text)
         
+        if deadline.expired():
+            calendar_logger.warning("Deadline exceeded, skipping model call")
+            return None
+
         # Подготавливаем сообщения
         messages = []
         if system_prompt:
@@ -98,7 +118,10 @@ class ModelRouter:
                 calendar_logger.warning("No local model configured")
                 return None
             
-            return self.local_provider.generate(messages, model.get("model_id", "local-model"))
+            model_id = self._model_id(model, "local-model")
+            tracing.set_attribute('provider', 'local')
+            tracing.set_attribute('model', model_id)
+            return self.local_provider.generate(messages, model_id, on_delta=on_delta)
         
         else:
             # Используем публичную модель для публичных запросов
@@ -114,7 +137,10 @@ class ModelRouter:
                 return None
             
             calendar_logger.info(f"Selected public model: {model['name']}")
-            return self.openrouter_provider.generate(messages, model["model_id"])
+            model_id = self._model_id(model)
+            tracing.set_attribute('provider', 'openrouter')
+            tracing.set_attribute('model', model_id)
+            return self.openrouter_provider.generate(messages, model_id, on_delta=on_delta)
     
     def get_status(self) -> Dict:
         """Получение статуса провайдеров"""
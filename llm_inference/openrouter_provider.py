@@ -4,8 +4,11 @@
 
 import os
 import requests
-from typing import Optional
+from typing import Callable, Iterator, Optional
+import deadline
+import tracing
 from logger import calendar_logger
+from llm_inference.streaming import collect_stream, stream_chat
 
 
 class OpenRouterProvider:
@@ -19,11 +22,23 @@ class OpenRouterProvider:
         """Проверка доступности OpenRouter"""
         return bool(self.api_key)
     
-    def generate(self, messages: list, model_id: str) -> Optional[str]:
-        """Генерация ответа от OpenRouter модели"""
+    @tracing.traced('llm.openrouter')
+    def generate(self, messages: list, model_id: str,
+                 on_delta: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Генерация ответа от OpenRouter модели
+
+        Args:
+            messages: сообщения чата
+            model_id: идентификатор модели
+            on_delta: если задан, ответ запрашивается потоком и каждый фрагмент передается в callback
+        """
         if not self.api_key:
             calendar_logger.warning("OpenRouter API key not found")
             return None
+
+        if on_delta is not None:
+            return self._generate_streaming(messages, model_id, on_delta)
             
         try:
             response = requests.post(
@@ -36,7 +51,7 @@ class OpenRouterProvider:
                     "model": model_id,
                     "messages": messages
                 },
-                timeout=120
+                timeout=deadline.timeout(120)
             )
             
             if response.status_code == 200:
@@ -52,3 +67,20 @@ class OpenRouterProvider:
         except Exception as e:
             calendar_logger.log_error(e, f"OpenRouterProvider.generate - {model_id}")
             return None
+
+    def stream(self, messages: list, model_id: str) -> Iterator[str]:
+        """Потоковая генерация: возвращает фрагменты ответа по мере их появления"""
+        return stream_chat(
+            self.api_url,
+            {"model": model_id, "messages": messages},
+            f"OpenRouter {model_id}",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+        )
+
+    def _generate_streaming(self, messages: list, model_id: str, on_delta: Callable[[str], None]) -> Optional[str]:
+        """Собирает потоковый ответ целиком, передавая фрагменты в on_delta"""
+        return collect_stream(self.stream(messages, model_id), on_delta, f"OpenRouter {model_id}",
+                              f"OpenRouterProvider.stream - {model_id}")
@@ -0,0 +1,109 @@
+"""
+Разбор потокового ответа OpenAI-совместимого API (Server-Sent Events) и общая для провайдеров
+потоковая генерация
+"""
+
+import json
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+import requests
+
+import deadline
+import tracing
+from logger import calendar_logger
+
+
+class GenerationCancelled(Exception):
+    """Генерация прервана вызывающим (on_delta бросает исключение - соединение закрывается, сервер прекращает генерацию)"""
+
+
+def iter_sse_deltas(response: requests.Response) -> Iterator[str]:
+    """
+    Возвращает фрагменты текста из потока chat/completions со "stream": true
+
+    Args:
+        response: ответ requests, полученный с stream=True
+
+    Yields:
+        Непустые фрагменты choices[0].delta.content
+    """
+    for raw_line in response.iter_lines():
+        # iter_lines отдает байты: декодируем сами, т.к. text/event-stream часто без charset
+        line = raw_line.decode('utf-8', errors='replace').strip() if raw_line else ''
+        if not line.startswith('data:'):
+            continue
+
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            break
+
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+
+        choices = chunk.get('choices') or []
+        if not choices:
+            continue
+        delta = (choices[0].get('delta') or {}).get('content')
+        if delta:
+            yield delta
+
+
+def stream_chat(url: str, payload: Dict, label: str, headers: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Потоковый запрос chat/completions: фрагменты ответа по мере их появления
+
+    Args:
+        payload: тело запроса без "stream"
+        label: имя провайдера для лога
+    """
+    with requests.post(
+        url,
+        headers=headers,
+        json={**payload, "stream": True},
+        stream=True,
+        timeout=deadline.timeout(120)
+    ) as response:
+        if response.status_code != 200:
+            calendar_logger.warning(f"{label} stream failed: {response.status_code} - {response.text}")
+            return
+        yield from iter_sse_deltas(response)
+
+
+def collect_stream(deltas: Iterator[str], on_delta: Callable[[str], None], label: str,
+                   error_context: str) -> Optional[str]:
+    """
+    Собирает потоковый ответ целиком, передавая фрагменты в on_delta
+
+    Returns:
+        текст ответа или None (пустой ответ, отмена, дедлайн, ошибка)
+    """
+    try:
+        parts = []
+        started = time.perf_counter()
+        for delta in deltas:
+            if not parts:
+                # Время до первого фрагмента - задержка префилла на стороне модели
+                tracing.set_attribute('ttft_ms', round((time.perf_counter() - started) * 1000, 1))
+            parts.append(delta)
+            on_delta(delta)
+            # Таймаут requests ограничивает паузу между фрагментами, а не весь ответ
+            deadline.check('llm stream')
+
+        content = "".join(parts).strip()
+        if not content:
+            return None
+        calendar_logger.info(f"{label} streamed response received")
+        return content
+
+    except GenerationCancelled:
+        calendar_logger.info(f"{label} stream cancelled")
+        return None
+    except deadline.DeadlineExceeded:
+        calendar_logger.warning(f"{label} stream stopped: deadline exceeded")
+        return None
+    except Exception as e:
+        calendar_logger.log_error(e, error_context)
+        return None
@@ -1,9 +1,22 @@
 import logging
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Any, Dict, Optional
 from pathlib import Path
 
 
+# ID трассы текущего обновления (tracing.start_trace) - добавляется в начало строк лога
+trace_id_var: ContextVar[Optional[str]] = ContextVar('trace_id', default=None)
+
+
+class _TraceIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id = trace_id_var.get()
+        if trace_id:
+            record.msg = f"[{trace_id}] {record.msg}"
+        return True
+
+
 class CalendarLogger:
     def __init__(self, log_file: str = "calendar_assistant.log"):
         """Инициализация логгера для календарного ассистента"""
@@ -41,6 +54,11 @@ class CalendarLogger:
         
         self.logger.addHandler(file_handler)
         self.logger.addHandler(console_handler)
+        
+        # Строки одной трассы связываются ее ID
+        for log_filter in list(self.logger.filters):
+            self.logger.removeFilter(log_filter)
+        self.logger.addFilter(_TraceIdFilter())
     
     def log_user_request(self, user_id: Optional[str], username: Optional[str], message: str):
         """Логирование запроса от пользователя из Telegram"""
@@ -61,6 +79,19 @@ class CalendarLogger:
         log_msg = f"LLM_RESPONSE | Raw: {response} | Parsed: {parsed_str} | Time: {timestamp}"
         self.logger.info(log_msg)
     
+    def log_intent_rule(self, message: str, label: Optional[str], confidence: float, bypass: bool, features: list):
+        """Логирование решения правил классификации (для подстройки правил)"""
+        timestamp = datetime.now().isoformat()
+        log_msg = (f"INTENT_RULE | Label: {label} | Confidence: {confidence:.3f} | Bypass: {bypass} | "
+                   f"Features: {','.join(features)} | Message: {message} | Time: {timestamp}")
+        self.logger.info(log_msg)
+    
+    def log_intent_model(self, message: str, label: str, margin: float, bypass: bool):
+        """Логирование решения локального классификатора"""
+        timestamp = datetime.now().isoformat()
+        log_msg = f"INTENT_MODEL | Label: {label} | Margin: {margin:.3f} | Bypass: {bypass} | Message: {message} | Time: {timestamp}"
+        self.logger.info(log_msg)
+    
     def log_calendar_request(self, event_data: Dict[str, Any]):
         """Логирование запроса к Google Calendar"""
         timestamp = datetime.now().isoformat()
@@ -66,7 +66,14 @@ class CalendarEvent(BaseModel):
 
     def _parse_recurrence_to_rrule(self, recurrence: str) -> Optional[str]:
         """Преобразует текстовое описание повторения в RRULE"""
-        recurrence_lower = recurrence.lower()
+        recurrence_lower = recurrence.lower().strip()
+
+        # Готовое правило (например, от temporal_parser) передается как есть
+        if recurrence_lower.startswith("rrule:"):
+            return recurrence.strip()
+        if recurrence_lower.startswith("freq="):
+            return f"RRULE:{recurrence.strip()}"
+        
         
         if recurrence_lower == "daily":
             return "RRULE:FREQ=DAILY"
@@ -0,0 +1,215 @@
+"""
+Хранилище ожидающих подтверждения событий и задач
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from logger import calendar_logger
+from models import CalendarEvent, Task
+
+
+# Типы элементов и модели, в которые восстанавливается payload
+PAYLOAD_MODELS = {
+    'event': CalendarEvent,
+    'task': Task,
+}
+
+
+class PendingStore(ABC):
+    """Базовый класс хранилища ожидающих подтверждения элементов
+
+    Элемент - словарь вида {"type": "event" | "task", "payload": <pydantic-модель>}.
+    """
+
+    @abstractmethod
+    def put(self, key: str, item: Dict[str, Any]):
+        """Сохраняет элемент под ключом"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Возвращает элемент или None, если его нет или срок истек"""
+        pass
+
+    @abstractmethod
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        """Удаляет элемент и возвращает его"""
+        pass
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Удаляет просроченные элементы и возвращает их количество"""
+        pass
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def close(self):
+        """Освобождает ресурсы хранилища"""
+        pass
+
+
+def _dump_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Переводит pydantic-модели элемента в словари; у 'batch' payload - список элементов"""
+    encoded = dict(item)
+    payload = item.get('payload')
+    if item.get('type') == 'batch' and isinstance(payload, list):
+        encoded['payload'] = [_dump_item(entry) for entry in payload]
+    elif hasattr(payload, 'model_dump'):
+        encoded['payload'] = payload.model_dump(mode='json')
+    return encoded
+
+
+def _load_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Восстанавливает pydantic-модели элемента"""
+    payload = item.get('payload')
+    if item.get('type') == 'batch' and isinstance(payload, list):
+        item['payload'] = [_load_item(entry) for entry in payload]
+        return item
+    model = PAYLOAD_MODELS.get(item.get('type'))
+    if model is not None and isinstance(payload, dict):
+        item['payload'] = model.model_validate(payload)
+    return item
+
+
+def _encode_item(item: Dict[str, Any]) -> str:
+    """Сериализует элемент в JSON"""
+    return json.dumps(_dump_item(item), ensure_ascii=False)
+
+
+def _decode_item(raw: str) -> Dict[str, Any]:
+    """Восстанавливает элемент из JSON"""
+    return _load_item(json.loads(raw))
+
+
+class SQLitePendingStore(PendingStore):
+    """Хранилище на SQLite с LRU-кэшем в памяти и истечением по TTL
+
+    Все элементы пишутся в SQLite, поэтому переживают перезапуск бота и загружаются
+    лениво при первом обращении. В памяти держится только cache_size последних элементов,
+    поэтому потребление памяти не растет с числом брошенных превью.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 cache_size: Optional[int] = None, sweep_interval: Optional[float] = None):
+        """
+        Args:
+            db_path: путь к файлу базы (PENDING_DB_PATH, по умолчанию pending_events.sqlite3)
+            ttl_seconds: время жизни элемента (PENDING_TTL_SECONDS, по умолчанию сутки)
+            cache_size: размер LRU-кэша (PENDING_CACHE_SIZE, по умолчанию 256)
+            sweep_interval: период фоновой очистки (PENDING_SWEEP_INTERVAL, по умолчанию 10 минут)
+        """
+        self.db_path = db_path or os.getenv('PENDING_DB_PATH', 'pending_events.sqlite3')
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('PENDING_TTL_SECONDS', '86400'))
+        self.cache_size = cache_size or int(os.getenv('PENDING_CACHE_SIZE', '256'))
+        self.sweep_interval = sweep_interval or float(os.getenv('PENDING_SWEEP_INTERVAL', '600'))
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " key TEXT PRIMARY KEY,"
+            " item TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pending_expires ON pending (expires_at)")
+        self._conn.commit()
+
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name='pending-sweeper', daemon=True)
+        self._sweeper.start()
+
+        calendar_logger.info(f"SQLitePendingStore initialized: {self.db_path}, ttl={self.ttl_seconds:g}s")
+
+    def _remember(self, key: str, item: Dict[str, Any], expires_at: float):
+        """Кладет элемент в LRU-кэш, вытесняя самые старые"""
+        self._cache[key] = (item, expires_at)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def put(self, key: str, item: Dict[str, Any]):
+        expires_at = time.time() + self.ttl_seconds
+        raw = _encode_item(item)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pending (key, item, expires_at) VALUES (?, ?, ?)",
+                (key, raw, expires_at)
+            )
+            self._conn.commit()
+            self._remember(key, item, expires_at)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def pop(self, key: str) -> Optional[Dict[str, Any]]:
+        # Чтение и удаление под одной блокировкой: двойное нажатие "Подтвердить"
+        # не сможет забрать один элемент дважды
+        with self._lock:
+            item = self._get_locked(key)
+            self._cache.pop(key, None)
+            self._conn.execute("DELETE FROM pending WHERE key = ?", (key,))
+            self._conn.commit()
+        return item
+
+    def _get_locked(self, key: str) -> Optional[Dict[str, Any]]:
+        """Поиск элемента: сначала LRU-кэш, затем SQLite. Вызывать под self._lock"""
+        now = time.time()
+        cached = self._cache.get(key)
+        if cached is not None:
+            item, expires_at = cached
+            if expires_at > now:
+                self._cache.move_to_end(key)
+                return item
+            del self._cache[key]
+            return None
+
+        row = self._conn.execute(
+            "SELECT item, expires_at FROM pending WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+
+        try:
+            item = _decode_item(row[0])
+        except Exception as e:
+            calendar_logger.log_error(e, "SQLitePendingStore.get - decode")
+            return None
+        self._remember(key, item, row[1])
+        return item
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._cache.items() if expires_at <= now]
+            for key in expired:
+                del self._cache[key]
+            cursor = self._conn.execute("DELETE FROM pending WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _sweep_loop(self):
+        """Фоновая очистка просроченных элементов"""
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    calendar_logger.info(f"SQLitePendingStore: swept {removed} expired item(s)")
+            except Exception as e:
+                calendar_logger.log_error(e, "SQLitePendingStore._sweep_loop")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,7 @@
-from typing import Optional, Union
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
 from datetime import datetime
 from logger import calendar_logger
 from models import CalendarEvent, Note, Task
@@ -7,56 +10,399 @@ from request_handlers import (
     ClassificationHandler,
     CalendarEventHandler, 
     NoteHandler,
-    TaskHandler
+    TaskHandler,
+    EditHandler,
+    CombinedHandler,
+    SegmentationHandler
 )
+from event_edits import parse_edit_locally, apply_changes
+from edit_template import parse_edit_template
+from result_cache import ResultCache
+from intent_splitter import multi_intent_enabled, split_locally
+from temporal_parser import FAST_PATH_FULL, FAST_PATH_OFF, MAX_TITLE_WORDS, parse_temporal, temporal_fast_path_mode
+import deadline
+import tracing
+
+# Подписи типов запросов для промежуточного статуса
+CLASSIFICATION_LABELS = {
+    "calendar_event": "📅 Событие в календаре",
+    "task": "📝 Задача",
+    "note": "🗒 Заметка",
+}
+
+# Режимы обработки запроса (request_mode в model_config.json)
+REQUEST_MODE_TWO_STEP = "two_step"  # классификация, затем извлечение - два вызова модели
+REQUEST_MODE_COMBINED = "combined"  # тип и данные одним вызовом
+REQUEST_MODES = (REQUEST_MODE_TWO_STEP, REQUEST_MODE_COMBINED)
+
+# Спекулятивное извлечение (speculative_extraction в model_config.json) по умолчанию
+DEFAULT_SPECULATION = {
+    "enabled": False,
+    "priors": {"calendar_event": 0.5, "task": 0.3, "note": 0.2},
+    "min_prior": 0.3,  # ветки с частотой класса ниже не запускаются
+    "max_branches": 1,  # 1 - только самый вероятный экстрактор, 3 - все
+    "prior_weight": 20,  # вес начальных частот относительно наблюдаемых классификаций
+    "max_workers": 8,
+}
+
 
 class RequestClassifier:
-    def __init__(self):
+    def __init__(self, mode: Optional[str] = None):
+        """
+        Args:
+            mode: "two_step" или "combined"; по умолчанию request_mode из model_config.json
+        """
         self.router = ModelRouter()
         
         self.classification_handler = ClassificationHandler(self.router)
         self.calendar_handler = CalendarEventHandler(self.router)
         self.note_handler = NoteHandler(self.router)
         self.task_handler = TaskHandler(self.router)
+        self.edit_handler = EditHandler(self.router)
+        self.combined_handler = CombinedHandler(self.router)
+        self.segmentation_handler = SegmentationHandler(self.router)
+        self.split_enabled = multi_intent_enabled()
+
+        self.mode = mode or self.router.config.get("request_mode", REQUEST_MODE_TWO_STEP)
+        if self.mode not in REQUEST_MODES:
+            calendar_logger.warning(f"Unknown request_mode '{self.mode}', using {REQUEST_MODE_TWO_STEP}")
+            self.mode = REQUEST_MODE_TWO_STEP
+
+        # Экстракторы, запускаемые одновременно с классификацией; проигравшие ветки отменяются
+        self.speculation = {**DEFAULT_SPECULATION, **self.router.config.get("speculative_extraction", {})}
+        self._class_counts: Dict[str, float] = {
+            name: float(prior) * self.speculation["prior_weight"]
+            for name, prior in self.speculation["priors"].items() if name in CLASSIFICATION_LABELS
+        }
+        self._counts_lock = threading.Lock()
+        self._speculation_pool = None
+        if self.speculation["enabled"]:
+            self._speculation_pool = ThreadPoolExecutor(max_workers=self.speculation["max_workers"],
+                                                        thread_name_prefix='speculate')
+        self.speculation_stats = {'requests': 0, 'hits': 0, 'misses': 0, 'cancelled': 0}
+        # Повторяющиеся запросы не проходят классификацию и извлечение заново
+        self.result_cache = ResultCache()
+        # Время событий разбирается правилами; простые события собираются без модели
+        self.temporal_mode = temporal_fast_path_mode()
         
-        calendar_logger.info('RequestClassifier initialized with notes support')
+        calendar_logger.info(f'RequestClassifier initialized with notes support, mode: {self.mode}')
         
         status = self.router.get_status()
         calendar_logger.info(f"Local model available: {status['local_available']}")
         calendar_logger.info(f"OpenRouter available: {status['openrouter_available']}")
         calendar_logger.info(f"Configured models: {status['models_count']}")
 
-    def process_request(self, user_message: str) -> Optional[Union[CalendarEvent, Note]]:
+    def process_request(self, user_message: str,
+                        on_progress: Optional[Callable[[str], None]] = None) -> Optional[Union[CalendarEvent, Note, Task]]:
+        try:
+            # Заполненный шаблон редактирования разбирается напрямую, без вызовов модели
+            from_template = parse_edit_template(user_message)
+            if from_template is not None:
+                calendar_logger.info("Request parsed from edit template")
+                return from_template
+
+            now = datetime.now()
+            with tracing.span('result_cache.get'):
+                cached = self.result_cache.get(user_message, now)
+                tracing.set_attribute('hit', cached is not None)
+            if cached is not None:
+                return cached
+
+            with deadline.track_degraded() as degraded:
+                result = self._process_uncached(user_message, on_progress)
+            # Ответ правил вместо модели не должен переживать запрос, на который не хватило времени
+            if result is not None and not degraded:
+                self.result_cache.put(user_message, result, now)
+            return result
+
+        except Exception as e:
+            calendar_logger.log_error(e, "request_classifier.process_request - General exception")
+            return None
+
+    def split_request(self, user_message: str) -> List[str]:
+        """
+        Делит сообщение с несколькими намерениями на отдельные запросы
+
+        Сначала правила (intent_splitter); модель - только если правила нашли один запрос, а
+        признаки говорят о нескольких.
+
+        Returns:
+            запросы; один элемент - сообщение не делится
+        """
+        if not self.split_enabled or parse_edit_template(user_message) is not None:
+            return [user_message]
+        try:
+            with tracing.span('split.local'):
+                decision = split_locally(user_message)
+            if len(decision.segments) > 1:
+                calendar_logger.info(f"Message split locally into {len(decision.segments)} requests: {decision.segments}")
+                return decision.segments
+            if decision.needs_model:
+                with tracing.span('split.llm'), deadline.stage('split'):
+                    segments = self.segmentation_handler.split(user_message)
+                if segments:
+                    return segments
+        except Exception as e:
+            calendar_logger.log_error(e, "request_classifier.split_request")
+        return [user_message]
+
+    def _process_uncached(self, user_message: str,
+                          on_progress: Optional[Callable[[str], None]] = None) -> Optional[Union[CalendarEvent, Note, Task]]:
+        """Классификация и извлечение моделью (или локальными правилами) без кэша"""
+        # Тривиальные запросы классифицируются локально - остается один вызов модели, извлечение
+        classification = self.classification_handler.classify_locally(user_message)
+        if classification is not None:
+            return self.extract(classification, user_message, on_progress=on_progress)
+
+        if self.mode == REQUEST_MODE_COMBINED:
+            result = self.combined_handler.classify_and_extract(user_message, datetime.now(), on_partial=on_progress)
+            if result is not None:
+                return result
+            # Ответ не разобрался - повторяем обычным путем из двух вызовов
+            calendar_logger.warning("Combined mode failed, falling back to two-step processing")
+
+        if self._speculation_pool is not None:
+            return self._process_speculative(user_message, on_progress)
+
+        classification = self.classification_handler.classify_with_model(user_message)
+        return self.extract(classification, user_message, on_progress=on_progress)
+
+    def _speculative_branches(self) -> List[str]:
+        """Классы, экстракторы которых стоит запустить до классификации: самые частые, не реже min_prior"""
+        with self._counts_lock:
+            total = sum(self._class_counts.values()) or 1.0
+            frequencies = {name: count / total for name, count in self._class_counts.items()}
+        ranked = sorted(frequencies, key=frequencies.get, reverse=True)
+        return [name for name in ranked if frequencies[name] >= self.speculation["min_prior"]][
+            :self.speculation["max_branches"]]
+
+    def _process_speculative(self, user_message: str,
+                             on_progress: Optional[Callable[[str], None]] = None) -> Optional[Union[CalendarEvent, Note, Task]]:
+        """
+        Классификация параллельно с вероятными экстракторами
+
+        Задержка - max(классификация, извлечение) при угаданном классе вместо их суммы. Ветки
+        других классов отменяются сразу после классификации (поток ответа обрывается), превью
+        показывается только от выигравшей ветки.
+        """
+        branches = self._speculative_branches()
+        if not branches:
+            classification = self.classification_handler.classify_with_model(user_message)
+            return self.extract(classification, user_message, on_progress=on_progress)
+
+        winner = [None]
+        cancel_events = {name: threading.Event() for name in branches}
+
+        def branch_progress(name: str):
+            if on_progress is None:
+                return None
+            return lambda text: on_progress(text) if winner[0] == name else None
+
+        futures = {
+            name: tracing.submit(
+                self._speculation_pool, self.extract, name, user_message, branch_progress(name), cancel_events[name], False
+            )
+            for name in branches
+        }
+
+        classification = self.classification_handler.classify_with_model(user_message)
+        # extract() обрабатывает unknown как заметку
+        target = classification if classification in CLASSIFICATION_LABELS else "note"
+        winner[0] = target
+        for name, event in cancel_events.items():
+            if name != target:
+                event.set()
+
+        with self._counts_lock:
+            self._class_counts[target] = self._class_counts.get(target, 0.0) + 1
+            self.speculation_stats['requests'] += 1
+            self.speculation_stats['cancelled'] += len(branches) - (target in futures)
+            self.speculation_stats['hits' if target in futures else 'misses'] += 1
+
+        if target in futures:
+            calendar_logger.info(f"Speculative extraction hit: {target} (branches: {', '.join(branches)})")
+            if on_progress is not None and not futures[target].done():
+                on_progress(f"{CLASSIFICATION_LABELS[target]}\n\n⏳ Извлекаю детали...")
+            return futures[target].result()
+
+        calendar_logger.info(f"Speculative extraction miss: {target} (branches: {', '.join(branches)})")
+        return self.extract(classification, user_message, on_progress=on_progress)
+
+    def process_requests(self, user_messages: List[str],
+                         max_workers: Optional[int] = None) -> List[Optional[Union[CalendarEvent, Note, Task]]]:
+        """
+        Обрабатывает несколько запросов: одна классификация на всех и параллельное извлечение
+
+        Извлечения запускаются группами по типу (запросы с одинаковым промптом идут подряд и
+        используют кэш префикса на сервере), не больше max_workers одновременно.
+
+        Args:
+            user_messages: запросы в исходном порядке
+            max_workers: сколько вызовов модели выполнять одновременно (LLM_PARALLEL_REQUESTS, по умолчанию 4)
+
+        Returns:
+            результаты в том же порядке (None для строк, которые не удалось обработать)
+        """
+        if not user_messages:
+            return []
+        max_workers = max_workers or int(os.getenv('LLM_PARALLEL_REQUESTS', '4'))
+        if self.mode == REQUEST_MODE_COMBINED:
+            # Отдельной классификации нет - каждый запрос целиком одним вызовом
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(user_messages))),
+                                    thread_name_prefix='extract') as pool:
+                futures = [tracing.submit(pool, self.process_request, message) for message in user_messages]
+                return [future.result() for future in futures]
+        now = datetime.now()
+        results = [self.result_cache.get(message, now) for message in user_messages]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        with deadline.track_degraded() as classify_degraded:
+            classifications = self.classification_handler.classify_batch([user_messages[i] for i in pending])
+        groups: Dict[str, List[int]] = {}
+        for i, classification in zip(pending, classifications):
+            # extract() обрабатывает unknown как заметку
+            groups.setdefault(classification if classification in CLASSIFICATION_LABELS else "note", []).append(i)
+        calendar_logger.info(
+            "Batch extraction groups: " + ", ".join(f"{name} {len(indices)}" for name, indices in groups.items())
+        )
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))),
+                                thread_name_prefix='extract') as pool:
+            futures = {
+                i: tracing.submit(pool, self._extract_tracked, name, user_messages[i])
+                for name, indices in groups.items() for i in indices
+            }
+            for i, future in futures.items():
+                try:
+                    results[i], degraded = future.result()
+                except Exception as e:
+                    calendar_logger.log_error(e, "request_classifier.process_requests - extract")
+                    continue
+                # Метка правил из пакетной классификации не привязана к строке - такие пакеты не кэшируются
+                if results[i] is not None and not degraded and not classify_degraded:
+                    self.result_cache.put(user_messages[i], results[i], now)
+        return results
+
+    def apply_edit(self, payload: Union[CalendarEvent, Task], correction: str) -> Optional[Union[CalendarEvent, Task]]:
+        """
+        Применяет правку к ожидающему событию/задаче
+
+        Сначала пробует локальный разбор, затем короткий запрос к модели только за изменениями.
+        """
+        current_time = datetime.now()
+        try:
+            from_template = parse_edit_template(correction)
+            if from_template is not None:
+                calendar_logger.info("Edit parsed from edit template")
+                if not isinstance(from_template, type(payload)):
+                    return from_template
+                return apply_changes(payload, from_template.model_dump(exclude={'timezone'}))
+
+            changes = parse_edit_locally(correction, payload, current_time)
+            source = "local"
+            if changes is None:
+                changes = self.edit_handler.extract_changes(payload, correction, current_time)
+                source = "llm"
+            if not changes:
+                return None
+            calendar_logger.info(f"Edit applied ({source}): {changes}")
+            return apply_changes(payload, changes)
+
+        except Exception as e:
+            calendar_logger.log_error(e, "request_classifier.apply_edit")
+            return None
+
+    def _extract_tracked(self, classification: str, user_message: str):
+        """extract() и признак того, что результат собран без модели из-за дедлайна"""
+        with deadline.track_degraded() as degraded:
+            result = self.extract(classification, user_message)
+        return result, bool(degraded)
+
+    def _extract_degraded(self, classification: str, user_message: str,
+                          current_time: datetime) -> Union[CalendarEvent, Note, Task]:
+        """
+        Результат без модели, когда время обработки истекло: время - разбором правилами, название -
+        остаток текста. Событие без распознанного времени сохраняется заметкой, чтобы текст не потерялся.
+        """
+        slots = parse_temporal(user_message, current_time)
+        title = slots.title or user_message.strip()
+        tracing.set_attribute('degraded', 'rules')
+        deadline.mark_degraded('extract')
+        if classification == "calendar_event" and slots.resolved:
+            calendar_logger.warning(f"Extraction degraded to rules (deadline): event {title} at {slots.start}")
+            return slots.to_event().model_copy(update={'title': title})
+        if classification == "task":
+            calendar_logger.warning(f"Extraction degraded to rules (deadline): task {title}")
+            return Task(title=title, due_time=slots.start, duration_minutes=slots.duration_minutes,
+                        recurrence=slots.recurrence)
+        calendar_logger.warning(f"Extraction degraded to rules (deadline): note | Message: {user_message}")
+        return Note(
+            title=" ".join(user_message.split()[:MAX_TITLE_WORDS]),
+            content=user_message.strip(),
+            created_at=current_time.strftime('%Y-%m-%dT%H:%M:%S'),
+        )
+
+    def extract(self, classification: str, user_message: str,
+                on_progress: Optional[Callable[[str], None]] = None,
+                cancel_event: Optional[threading.Event] = None,
+                announce: bool = True) -> Optional[Union[CalendarEvent, Note, Task]]:
+        """
+        Извлекает событие, задачу или заметку из запроса уже известного типа
+
+        Args:
+            cancel_event: прерывает генерацию (спекулятивная ветка проиграла)
+            announce: показать тип запроса через on_progress перед извлечением
+        """
         current_time = datetime.now()
         current_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S (%A)")
         
         try:
-            classification = self.classification_handler.classify_request(user_message)
-            
             if classification == "unknown":
                 calendar_logger.warning(f"Unknown request type for: {user_message} request_classifier.classify - unknown type")
                 classification = "note"
             
+            if announce and on_progress and classification in CLASSIFICATION_LABELS:
+                on_progress(f"{CLASSIFICATION_LABELS[classification]}\n\n⏳ Извлекаю детали...")
+            
             enhanced_message = f"""
             ## Input Data
             - Current date: {current_time_str}
             - User query: {user_message}
             """
             
-            match classification:
-                case "calendar_event":
-                    return self.calendar_handler.create_calendar_event(enhanced_message)
-                case "task":
-                    return self.task_handler.create_task(enhanced_message)
-                case "note":
-                    return self.note_handler.create_note(enhanced_message, current_time)
-                case _:
-                    calendar_logger.log_error(
-                        Exception(f"Unexpected classification: {classification}"),
-                        "request_classifier.process_request - classification"
-                    )
-                    return None
+            with tracing.span('extract', type=classification), deadline.stage('extract'):
+                match classification:
+                    case "calendar_event":
+                        slots = None
+                        if self.temporal_mode != FAST_PATH_OFF:
+                            with tracing.span('extract.temporal'):
+                                slots = parse_temporal(user_message, current_time)
+                                tracing.set_attribute('simple', slots.is_simple)
+                            if self.temporal_mode == FAST_PATH_FULL and slots.is_simple:
+                                calendar_logger.info(f"Calendar event resolved locally: {slots.title} at {slots.start}")
+                                return slots.to_event()
+                        result = self.calendar_handler.create_calendar_event(
+                            enhanced_message, on_partial=on_progress, cancel_event=cancel_event, slots=slots
+                        )
+                    case "task":
+                        result = self.task_handler.create_task(enhanced_message, on_partial=on_progress, cancel_event=cancel_event)
+                    case "note":
+                        result = self.note_handler.create_note(
+                            enhanced_message, current_time, on_partial=on_progress, cancel_event=cancel_event
+                        )
+                    case _:
+                        calendar_logger.log_error(
+                            Exception(f"Unexpected classification: {classification}"),
+                            "request_classifier.extract - classification"
+                        )
+                        return None
+
+                if result is None and deadline.expired() and (cancel_event is None or not cancel_event.is_set()):
+                    return self._extract_degraded(classification, user_message, current_time)
+                return result
                     
         except Exception as e:
-            calendar_logger.log_error(e, "request_classifier.process_request - General exception")
+            calendar_logger.log_error(e, "request_classifier.extract - General exception")
             return None
@@ -3,10 +3,16 @@ from .classification_handler import ClassificationHandler
 from .calendar_event_handler import CalendarEventHandler
 from .task_handler import TaskHandler
 from .note_handler import NoteHandler
+from .edit_handler import EditHandler
+from .combined_handler import CombinedHandler
+from .segmentation_handler import SegmentationHandler
 
 __all__ = [
     'BaseRequestHandler',
     'ClassificationHandler', 
     'CalendarEventHandler',
-    'NoteHandler'
+    'NoteHandler',
+    'EditHandler',
+    'CombinedHandler',
+    'SegmentationHandler'
 ]
@@ -3,14 +3,27 @@
 """
 
 import json
+import re
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from datetime import datetime
+from typing import Callable, Dict, Optional, Any
+import tracing
 from logger import calendar_logger
-from llm_inference import ModelRouter
+from llm_inference import GenerationCancelled, ModelRouter
+
+
+# Строковое поле JSON, возможно еще не закрытое: "key": "value...
+PARTIAL_FIELD_RE = re.compile(r'"(\w+)"\s*:\s*"((?:[^"\\]|\\.)*)')
 
 
 class BaseRequestHandler(ABC):
     """Базовый класс для всех обработчиков запросов"""
+
+    # Заголовок и поля промежуточного превью при потоковой генерации.
+    # Пустой PARTIAL_FIELDS - обработчик не показывает промежуточный результат
+    PARTIAL_HEADER = ""
+    PARTIAL_FIELDS = ()
     
     def __init__(self, router: ModelRouter):
         """
@@ -45,31 +58,99 @@ class BaseRequestHandler(ABC):
         """
         pass
     
-    def process(self, enhanced_message: str, is_private: bool, **kwargs) -> Optional[Any]:
+    def render_partial(self, partial_content: str) -> Optional[str]:
+        """
+        Формирует текст промежуточного превью по частичному ответу модели
+        
+        Args:
+            partial_content: Уже полученная часть ответа
+            
+        Returns:
+            Текст превью или None, если показывать пока нечего
+        """
+        if not self.PARTIAL_FIELDS:
+            return None
+        
+        fields = self.extract_partial_fields(partial_content)
+        lines = []
+        for key, label in self.PARTIAL_FIELDS:
+            value = fields.get(key)
+            if not value:
+                continue
+            try:
+                value = datetime.fromisoformat(value).strftime("%d.%m.%Y %H:%M")
+            except ValueError:
+                pass
+            lines.append(f"{label}: {value}")
+        
+        if not lines:
+            return None
+        return "\n".join([self.PARTIAL_HEADER, *lines, "", "⏳ Генерирую..."])
+    
+    def extract_partial_fields(self, content: str) -> Dict[str, str]:
+        """Достает строковые поля из незавершенного JSON-ответа"""
+        fields = {}
+        for key, raw_value in PARTIAL_FIELD_RE.findall(content):
+            # Обрезанная escape-последовательность в конце фрагмента
+            raw_value = raw_value.rstrip('\\')
+            try:
+                fields[key] = json.loads(f'"{raw_value}"')
+            except json.JSONDecodeError:
+                fields[key] = raw_value
+        return fields
+    
+    def process(self, enhanced_message: str, is_private: bool,
+                on_partial: Optional[Callable[[str], None]] = None,
+                cancel_event: Optional[threading.Event] = None, **kwargs) -> Optional[Any]:
         """
         Обрабатывает сообщение с помощью LLM и парсит результат
         
         Args:
             enhanced_message: Улучшенное сообщение с контекстом
+            on_partial: Callback для промежуточного превью; если задан, ответ генерируется потоком
+            cancel_event: если задан, ответ генерируется потоком и обрывается, как только событие установлено
             **kwargs: Дополнительные параметры для обработки
             
         Returns:
-            Обработанный объект или None при ошибке
+            Обработанный объект или None при ошибке (или отмене)
         """
         try:
+            on_delta = None
+            if on_partial is not None or cancel_event is not None:
+                parts = []
+                last_preview = [None]
+
+                def on_delta(delta: str):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise GenerationCancelled()
+                    if on_partial is None:
+                        return
+                    parts.append(delta)
+                    preview = self.render_partial("".join(parts))
+                    if preview and preview != last_preview[0]:
+                        last_preview[0] = preview
+                        on_partial(preview)
+
             # Генерируем ответ от модели
-            content = self.router.generate(
-                enhanced_message, 
-                self.get_prompt(), 
-                is_private=is_private
-            )
+            with tracing.span('llm.generate', handler=self.get_handler_name(), stream=on_delta is not None):
+                content = self.router.generate(
+                    enhanced_message, 
+                    self.get_prompt(), 
+                    is_private=is_private,
+                    on_delta=on_delta
+                )
             
+            if cancel_event is not None and cancel_event.is_set():
+                calendar_logger.info(f"{self.get_handler_name()}: generation cancelled")
+                return None
+
             if not content:
                 calendar_logger.warning(f"{self.get_handler_name()}: Empty response from model")
                 return None
             
             # Парсим ответ
-            result = self.parse_response(content, **kwargs)
+            with tracing.span('llm.parse', handler=self.get_handler_name()):
+                result = self.parse_response(content, **kwargs)
             
             if result is None:
                 calendar_logger.warning(f"{self.get_handler_name()}: Failed to parse response")
@@ -1,10 +1,20 @@
-from typing import Optional
+import threading
+from typing import Callable, Optional
 from models import CalendarEvent
+from temporal_parser import TemporalSlots
 from .base_handler import BaseRequestHandler
 
 
 class CalendarEventHandler(BaseRequestHandler):
     
+    PARTIAL_HEADER = "📅 Событие (черновик)"
+    PARTIAL_FIELDS = (
+        ('title', '📝 Название'),
+        ('start_time', '⏰ Начало'),
+        ('end_time', '🏁 Окончание'),
+        ('description', '📋 Описание'),
+    )
+    
     PROMPT = """
 You are a calendar event extractor. The user wants to create a calendar event. Extract event details and return ONLY a JSON response.
 
@@ -34,8 +44,10 @@ Return exactly this JSON structure:
 - `"Monthly on the first [day of week]"` - monthly
 - `"Annually on [month day]"` - yearly
 - `"Every weekday (Monday to Friday)"` - workdays
+- an `RRULE:...` string, if one is given in "Resolved time"
 
 For dates without year, assume current year or next occurrence if date has passed.
+If the input has a "Resolved time" section, copy those values as is and only extract the title and description.
 """
     
     def get_prompt(self) -> str:
@@ -49,7 +61,18 @@ For dates without year, assume current year or next occurrence if date has passe
         
         if parsed_data and parsed_data.get('type') == 'calendar_event':
             try:
-                return CalendarEvent(**parsed_data['data'])
+                data = parsed_data['data']
+                slots = kwargs.get('slots')
+                if slots is not None and slots.complete:
+                    # Время разобрано правилами целиком - модель его не переопределяет
+                    data = {**data, 'start_time': slots.start}
+                    if slots.end is not None:
+                        data.update(end_time=slots.end, duration_minutes=None)
+                    elif slots.duration_minutes:
+                        data.update(end_time=None, duration_minutes=slots.duration_minutes)
+                    if slots.recurrence:
+                        data['recurrence'] = slots.recurrence
+                return CalendarEvent(**data)
             except Exception as e:
                 from logger import calendar_logger
                 calendar_logger.log_error(e, f"{self.get_handler_name()}.parse_response - CalendarEvent creation")
@@ -57,5 +80,15 @@ For dates without year, assume current year or next occurrence if date has passe
         
         return None
     
-    def create_calendar_event(self, enhanced_message: str) -> Optional[CalendarEvent]:
-        return self.process(enhanced_message, False)
+    def create_calendar_event(self, enhanced_message: str,
+                              on_partial: Optional[Callable[[str], None]] = None,
+                              cancel_event: Optional[threading.Event] = None,
+                              slots: Optional[TemporalSlots] = None) -> Optional[CalendarEvent]:
+        """
+        Args:
+            slots: время, уже разобранное temporal_parser; передается модели и, если разобрано целиком, имеет приоритет над ее ответом
+        """
+        hint = slots.prompt_lines() if slots is not None else ""
+        if hint:
+            enhanced_message = f"{enhanced_message}\n{hint}\n"
+        return self.process(enhanced_message, False, on_partial=on_partial, cancel_event=cancel_event, slots=slots)
@@ -1,5 +1,11 @@
-from typing import Optional
+import os
+import re
+from typing import List, Optional
+import deadline
+import tracing
 from logger import calendar_logger
+from intent_rules import classify_by_rules
+from intent_model import load_intent_model
 from .base_handler import BaseRequestHandler
 
 
@@ -15,6 +21,26 @@ class ClassificationHandler(BaseRequestHandler):
 
 Respond with ONLY one word: calendar_event, task, note, or unknown
 """
+
+    BATCH_PROMPT = """
+Сlassify each numbered text into one of these categories:
+
+- **calendar_event**: mentions specific time, date, meetings, appointments, reminders with time constraints
+- **note**: general information to remember, ideas, thoughts, lists, anything without specific time
+- **task**: short task/reminder that the user wants to schedule or be reminded about (could have due date/time)
+- **unknown**: unclear or ambiguous requests
+
+Respond with one line per text in the same order, formatted as "<number>: <category>", nothing else.
+"""
+
+    VALID_TYPES = {"calendar_event", "note", "task", "unknown"}
+    BATCH_LINE_RE = re.compile(r'^\s*(\d+)\s*[:.)-]\s*([a-z_]+)', re.MULTILINE)
+
+    def __init__(self, router):
+        super().__init__(router)
+        # Локальный классификатор (scripts/train_intent_model.py); без файла модели - только правила и LLM
+        self.intent_model = load_intent_model()
+        self.model_margin = float(os.getenv('INTENT_MODEL_MARGIN', '0.5'))
     
     def get_prompt(self) -> str:
         return self.PROMPT
@@ -27,19 +53,88 @@ Respond with ONLY one word: calendar_event, task, note, or unknown
             return None
         
         classification = response_content.strip().lower()
-        valid_types = {"calendar_event", "note", "task", "unknown"}
-        if classification in valid_types:
-            calendar_logger.info(f"Request classified as: {classification}")
+        if classification in self.VALID_TYPES:
+            # Текст запроса в той же строке - по этим строкам обучается локальный классификатор
+            calendar_logger.info(f"Request classified as: {classification} | Message: {kwargs.get('message', '')}")
             return classification
         else:
             calendar_logger.warning(f"Invalid classification received: {classification}")
             return "unknown"
     
+    @tracing.traced('classify.local')
+    def classify_locally(self, user_message: str) -> Optional[str]:
+        """Класс по правилам или локальному классификатору без вызова LLM; None, если оба не уверены"""
+        decision = classify_by_rules(user_message)
+        calendar_logger.log_intent_rule(user_message, decision.label, decision.confidence, decision.bypass,
+                                        decision.features)
+        if decision.bypass:
+            return decision.label
+
+        if self.intent_model is not None:
+            label, margin = self.intent_model.predict(user_message)
+            bypass = margin >= self.model_margin
+            calendar_logger.log_intent_model(user_message, label, margin, bypass)
+            if bypass:
+                return label
+        return None
+
     def classify_request(self, user_message: str) -> str:
+        classification = self.classify_locally(user_message)
+        if classification is not None:
+            return classification
+        return self.classify_with_model(user_message)
+
+    @tracing.traced('classify.llm')
+    def classify_with_model(self, user_message: str) -> str:
         try:
-            classification = self.process(user_message, True)
+            with deadline.stage('classify'):
+                classification = self.process(user_message, True, message=user_message)
+                if not classification and deadline.expired():
+                    return self.classify_degraded(user_message)
             return classification if classification else "unknown"
             
         except Exception as e:
             calendar_logger.log_error(e, f"{self.get_handler_name()}.classify_request")
             return "unknown"
+
+    def classify_degraded(self, user_message: str) -> str:
+        """Лучшая метка правил без порога уверенности - когда на модель не осталось времени"""
+        label = classify_by_rules(user_message).label or "unknown"
+        calendar_logger.warning(f"Classification degraded to rules (deadline): {label} | Message: {user_message}")
+        tracing.set_attribute('degraded', 'rules')
+        deadline.mark_degraded('classify')
+        return label
+
+    def classify_batch(self, user_messages: List[str]) -> List[str]:
+        """
+        Классифицирует несколько запросов одним вызовом модели
+
+        Строки, уверенно классифицированные локально, в запрос к модели не попадают; строки,
+        для которых модель не вернула корректную метку, классифицируются по одной.
+        """
+        if not user_messages:
+            return []
+
+        classifications: List[Optional[str]] = [self.classify_locally(message) for message in user_messages]
+        pending = [i for i, label in enumerate(classifications) if label is None]
+        if len(pending) == 1:
+            classifications[pending[0]] = self.classify_with_model(user_messages[pending[0]])
+        elif pending:
+            numbered = "\n".join(f"{n}. {user_messages[i]}" for n, i in enumerate(pending, 1))
+            try:
+                with tracing.span('classify.llm_batch', size=len(pending)), deadline.stage('classify'):
+                    content = self.router.generate(numbered, self.BATCH_PROMPT, is_private=True)
+                for number, label in self.BATCH_LINE_RE.findall((content or "").lower()):
+                    index = int(number) - 1
+                    if 0 <= index < len(pending) and label in self.VALID_TYPES:
+                        classifications[pending[index]] = label
+                        calendar_logger.info(f"Request classified as: {label} | Message: {user_messages[pending[index]]}")
+            except Exception as e:
+                calendar_logger.log_error(e, f"{self.get_handler_name()}.classify_batch")
+
+        missing = [i for i, label in enumerate(classifications) if label is None]
+        if missing:
+            calendar_logger.warning(f"Batch classification missed {len(missing)}/{len(user_messages)} items, retrying one by one")
+        for i in missing:
+            classifications[i] = self.classify_with_model(user_messages[i])
+        return classifications
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Callable, Optional, Union
+from logger import calendar_logger
+from models import CalendarEvent, Note, Task
+from .base_handler import BaseRequestHandler
+from .calendar_event_handler import CalendarEventHandler
+from .note_handler import NoteHandler
+from .task_handler import TaskHandler
+
+
+class CombinedHandler(BaseRequestHandler):
+    """Классификация и извлечение одним вызовом модели (request_mode: "combined" в model_config.json)"""
+
+    # Промежуточное превью берется у обработчика того типа, который модель уже назвала
+    PARTIAL_HANDLERS = {
+        'calendar_event': CalendarEventHandler,
+        'task': TaskHandler,
+        'note': NoteHandler,
+    }
+
+    PROMPT = """
+You turn a user's message into a calendar event, a task or a note. First decide the type, then extract the details.
+Return ONLY JSON, with "type" as the first key.
+
+## Types:
+- **calendar_event**: mentions specific time, date, meetings, appointments, reminders with time constraints
+- **task**: short task/reminder that the user wants to schedule or be reminded about (could have due date/time)
+- **note**: general information to remember, ideas, thoughts, lists, anything without specific time; use it for unclear requests too
+
+## calendar_event:
+{"type": "calendar_event", "data": {"title": "string", "description": "string or null", "start_time": "YYYY-MM-DDTHH:MM:SS", "end_time": "YYYY-MM-DDTHH:MM:SS or null", "duration_minutes": "number or null", "recurrence": "string or null"}}
+1. Assume all times are in the user's local time zone
+2. If **end time** is specified → fill `end_time`, set `duration_minutes` = null
+3. If **duration** is specified → fill `duration_minutes`, set `end_time` = null
+4. If **neither** is specified → set `duration_minutes` = 60, `end_time` = null
+5. Recurrence: null, "Daily", "Weekly on [day of week]", "Monthly on the first [day of week]", "Annually on [month day]", "Every weekday (Monday to Friday)"
+6. For dates without year, assume current year or next occurrence if date has passed
+
+## task:
+{"type": "task", "data": {"title": "string", "description": "string or null", "due_time": "YYYY-MM-DDTHH:MM:SS or null", "duration_minutes": "number or null", "recurrence": "string or null"}}
+1. If neither due time nor duration is given, set `due_time` = null
+
+## note:
+{"type": "note", "data": {"title": "string", "content": "string", "created_at": "YYYY-MM-DDTHH:MM:SS", "tags": ["string"] or null}}
+1. "content" is the user's text with only capitalization, punctuation and spelling fixed; do not rephrase, shorten or translate
+2. "title" is 3-7 words without new facts; up to 3 lowercase "tags" or null; "created_at" is the current date
+"""
+
+    def __init__(self, router):
+        super().__init__(router)
+        self._partial_handlers = {name: handler_class(router) for name, handler_class in self.PARTIAL_HANDLERS.items()}
+
+    def get_prompt(self) -> str:
+        return self.PROMPT
+
+    def get_handler_name(self) -> str:
+        return "CombinedHandler"
+
+    def render_partial(self, partial_content: str) -> Optional[str]:
+        request_type = self.extract_partial_fields(partial_content).get('type')
+        handler = self._partial_handlers.get(request_type)
+        return handler.render_partial(partial_content) if handler else None
+
+    def parse_response(self, response_content: str, **kwargs) -> Optional[Union[CalendarEvent, Note, Task]]:
+        parsed_data = self.extract_json_from_response(response_content)
+        if not parsed_data or not isinstance(parsed_data.get('data'), dict):
+            return None
+
+        request_type = parsed_data.get('type')
+        calendar_logger.info(f"Request classified as: {request_type} (combined) | Message: {kwargs.get('message', '')}")
+        try:
+            match request_type:
+                case 'calendar_event':
+                    return CalendarEvent(**parsed_data['data'])
+                case 'task':
+                    return Task(**parsed_data['data'])
+                case 'note':
+                    return Note(**parsed_data['data'])
+                case _:
+                    calendar_logger.warning(f"Invalid combined type received: {request_type}")
+                    return None
+        except Exception as e:
+            calendar_logger.log_error(e, f"{self.get_handler_name()}.parse_response - {request_type} creation")
+            return None
+
+    def classify_and_extract(self, user_message: str, current_time: datetime,
+                             on_partial: Optional[Callable[[str], None]] = None) -> Optional[Union[CalendarEvent, Note, Task]]:
+        enhanced_message = f"""
+            ## Input Data
+            - Current date: {current_time.strftime("%Y-%m-%d %H:%M:%S (%A)")}
+            - User query: {user_message}
+            """
+        return self.process(enhanced_message, False, on_partial=on_partial, message=user_message)
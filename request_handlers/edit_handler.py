@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+from logger import calendar_logger
+from models import CalendarEvent, Task
+from .base_handler import BaseRequestHandler
+
+
+class EditHandler(BaseRequestHandler):
+
+    EVENT_FIELDS = ('title', 'description', 'start_time', 'end_time', 'duration_minutes', 'recurrence')
+    TASK_FIELDS = ('title', 'description', 'due_time', 'duration_minutes', 'recurrence')
+
+    PROMPT = """
+You edit an existing calendar item. You get the current item as JSON and the user's correction.
+Return ONLY the fields that change, as JSON:
+{
+  "changes": {
+    "field": "new value"
+  }
+}
+
+## Rules:
+1. Dates and times are "YYYY-MM-DDTHH:MM:SS", relative to the current date and the item's current time
+2. If a new **end time** is given → set `end_time`; if a new **duration** is given → set `duration_minutes`
+3. Never repeat unchanged fields. If nothing changes, return {"changes": {}}
+"""
+
+    def get_prompt(self) -> str:
+        return self.PROMPT
+
+    def get_handler_name(self) -> str:
+        return "EditHandler"
+
+    def parse_response(self, response_content: str, **kwargs) -> Optional[Dict[str, Any]]:
+        parsed_data = self.extract_json_from_response(response_content)
+        if not parsed_data or not isinstance(parsed_data.get('changes'), dict):
+            return None
+
+        allowed_fields = kwargs.get('allowed_fields', self.EVENT_FIELDS)
+        changes = {key: value for key, value in parsed_data['changes'].items() if key in allowed_fields}
+        calendar_logger.info(f"Edit changes: {changes}")
+        return changes
+
+    def extract_changes(self, payload: Union[CalendarEvent, Task], correction: str,
+                        current_time: datetime) -> Optional[Dict[str, Any]]:
+        """Запрашивает у модели только изменившиеся поля"""
+        allowed_fields = self.EVENT_FIELDS if isinstance(payload, CalendarEvent) else self.TASK_FIELDS
+        current_item = payload.model_dump_json(include=set(allowed_fields), exclude_none=True)
+        enhanced_message = f"""
+            ## Input Data
+            - Current date: {current_time.strftime("%Y-%m-%d %H:%M:%S (%A)")}
+            - Allowed fields: {", ".join(allowed_fields)}
+            - Current item: {current_item}
+            - Correction: {correction}
+            """
+        return self.process(enhanced_message, False, allowed_fields=allowed_fields)
@@ -1,4 +1,5 @@
-from typing import Optional
+import threading
+from typing import Callable, Optional
 from datetime import datetime
 from models import Note
 from .base_handler import BaseRequestHandler
@@ -6,6 +7,12 @@ from .base_handler import BaseRequestHandler
 
 class NoteHandler(BaseRequestHandler):
     
+    PARTIAL_HEADER = "📝 Заметка (черновик)"
+    PARTIAL_FIELDS = (
+        ('title', '📌 Название'),
+        ('content', '🗒 Текст'),
+    )
+    
     PROMPT = """
 Ты — форматтер заметок. Пользователь хочет сохранить заметку. Сформируй ответ строго в виде JSON и ничего больше.
 
@@ -66,5 +73,8 @@ class NoteHandler(BaseRequestHandler):
         
         return None
     
-    def create_note(self, enhanced_message: str, current_time: datetime) -> Optional[Note]:
-        return self.process(enhanced_message, False, current_time=current_time)
+    def create_note(self, enhanced_message: str, current_time: datetime,
+                    on_partial: Optional[Callable[[str], None]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Optional[Note]:
+        return self.process(enhanced_message, False, on_partial=on_partial, cancel_event=cancel_event,
+                            current_time=current_time)
@@ -0,0 +1,41 @@
+from typing import List, Optional
+from logger import calendar_logger
+from .base_handler import BaseRequestHandler
+
+
+class SegmentationHandler(BaseRequestHandler):
+
+    PROMPT = """
+Split the user's message into separate requests (calendar events, tasks, notes). Return ONLY JSON:
+{
+  "requests": ["string", ...]
+}
+
+## Rules:
+1. One item per event, task or note, in the original order and wording
+2. Copy shared context into every item that needs it: "завтра в 10 планерка, в 15 звонок" → ["завтра в 10 планерка", "завтра в 15 звонок"]
+3. Do not split one request: participants, places, list items and details stay together
+4. If the message is a single request, return it as the only item
+"""
+
+    MAX_REQUESTS = 10
+
+    def get_prompt(self) -> str:
+        return self.PROMPT
+
+    def get_handler_name(self) -> str:
+        return "SegmentationHandler"
+
+    def parse_response(self, response_content: str, **kwargs) -> Optional[List[str]]:
+        parsed_data = self.extract_json_from_response(response_content)
+        if not parsed_data or not isinstance(parsed_data.get('requests'), list):
+            return None
+        requests = [item.strip() for item in parsed_data['requests'] if isinstance(item, str) and item.strip()]
+        if not requests or len(requests) > self.MAX_REQUESTS:
+            return None
+        calendar_logger.info(f"Message split by model into {len(requests)} requests: {requests}")
+        return requests
+
+    def split(self, user_message: str) -> Optional[List[str]]:
+        """Запросы из сообщения или None, если ответ модели не разобрался"""
+        return self.process(user_message, True)
@@ -1,10 +1,18 @@
-from typing import Optional
+import threading
+from typing import Callable, Optional
 from models import Task
 from .base_handler import BaseRequestHandler
 
 
 class TaskHandler(BaseRequestHandler):
 
+    PARTIAL_HEADER = "📝 Задача (черновик)"
+    PARTIAL_FIELDS = (
+        ('title', '📝 Название'),
+        ('due_time', '⏰ Срок'),
+        ('description', '📋 Описание'),
+    )
+
     PROMPT = """
 You are a task extractor. The user wants to create a task/reminder that should be added to calendar as a task or event.
 
@@ -44,5 +52,7 @@ Rules:
 
         return None
 
-    def create_task(self, enhanced_message: str) -> Optional[Task]:
-        return self.process(enhanced_message, False)
+    def create_task(self, enhanced_message: str,
+                    on_partial: Optional[Callable[[str], None]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Optional[Task]:
+        return self.process(enhanced_message, False, on_partial=on_partial, cancel_event=cancel_event)
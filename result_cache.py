@@ -0,0 +1,221 @@
+"""
+Кэш результатов обработки повторяющихся запросов ("обед в 13:00 на 30 минут", "спортзал в понедельник")
+
+Ключ - нормализованный текст и контекст относительных дат: для "завтра" или "в 13:00" результат
+хранится как шаблон (смещение в днях от даты запроса и время суток) и при попадании
+привязывается к сегодняшней дате. День недели ("в понедельник") дает смещение, зависящее от
+текущего дня недели, поэтому он входит в ключ. Время суток без дня ("обед в 13:00") после
+13:00 означает завтра, а утром - сегодня, поэтому в ключ входит и то, прошло ли это время.
+Явные даты ("25 числа", "3 марта") хранятся как есть. Вытеснение - LRU с TTL (RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS).
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple, Union
+
+from logger import calendar_logger
+from models import CalendarEvent, Note, Task
+from temporal_parser import DAY_WORD_RE, count_clock_times, parse_temporal
+
+
+# Поля с датой, которые привязываются к дате запроса
+DATETIME_FIELDS = {
+    CalendarEvent: ('start_time', 'end_time'),
+    Task: ('due_time',),
+    Note: (),
+}
+
+_WEEKDAY_RE = re.compile(r'\b(?:понедельник|вторник|сред[уаы]|четверг|пятниц[уаы]|суббот[уаы]|воскресенье|'
+                         r'выходн[а-я]*|будн[а-я]*)')
+_ABSOLUTE_DATE_RE = re.compile(r'(?:\b\d{1,2}[./]\d{1,2}(?:[./]\d{2,4})?\b|\b\d{1,2}\s*(?:числа|-?го)\b|'
+                               r'\b(?:январ|феврал|март|апрел|ма[йя]|июн|июл|август|сентябр|октябр|ноябр|декабр)[а-я]*\b|'
+                               r'\b20\d{2}\b)')
+# "через 2 часа", "сейчас" - результат зависит от текущего времени, такие запросы не кэшируются
+_NOW_RELATIVE_RE = re.compile(r'(?:\bчерез\s+(?:\d+\s*|пару\s+|несколько\s+)?(?:мин|час|полчаса|полтора)|\bсейчас\b|\bсразу\b)')
+_TIME_RE = re.compile(r'\b(\d{1,2})[.:](\d{2})\b')
+
+CONTEXT_RELATIVE = 'rel'
+CONTEXT_ABSOLUTE = 'abs'
+# Суффикс контекста: время суток из текста сегодня уже прошло
+CLOCK_PASSED = '+passed'
+
+
+def normalize_text(text: str) -> str:
+    """Регистр, ё, пунктуация и пробелы не влияют на ключ; время "13.00" равно "13:00" """
+    text = text.lower().replace('ё', 'е').strip()
+    text = _TIME_RE.sub(lambda m: f'{int(m.group(1))}:{m.group(2)}', text)
+    text = re.sub(r'[^\w\s:.,/-]', ' ', text)
+    text = re.sub(r'[.,!?]+(\s|$)', r'\1', text)
+    return ' '.join(text.split())
+
+
+def date_context(text: str, now: datetime) -> Optional[str]:
+    """
+    Контекст, при котором результат для текста не меняется
+
+    Returns:
+        'abs' - в тексте явная дата; 'wd<N>' - день недели, смещение зависит от текущего дня;
+        'rel' - только относительные слова или время, смещение от сегодняшней даты постоянно;
+        с суффиксом '+passed' - время суток без "сегодня/завтра" уже прошло, и модель перенесла его
+        на следующий день; None - результат зависит от текущего времени ("через час"), кэшировать нельзя
+    """
+    if _NOW_RELATIVE_RE.search(text):
+        return None
+    if _ABSOLUTE_DATE_RE.search(text):
+        return CONTEXT_ABSOLUTE
+    context = f'wd{now.weekday()}' if _WEEKDAY_RE.search(text) else CONTEXT_RELATIVE
+    if DAY_WORD_RE.search(text) or not count_clock_times(text):
+        return context
+    clock = parse_temporal(text, now).start_clock
+    if clock is None:
+        # Время суток есть, но правила его не поняли - неизвестно, прошло ли оно
+        return None
+    return context + CLOCK_PASSED if clock <= now.time() else context
+
+
+def _to_template(result: Union[CalendarEvent, Note, Task], context: str, now: datetime) -> Dict[str, Any]:
+    data = result.model_dump()
+    if context == CONTEXT_ABSOLUTE:
+        return data
+    for name in DATETIME_FIELDS[type(result)]:
+        value = data.get(name)
+        if isinstance(value, datetime):
+            data[name] = {'days': (value.date() - now.date()).days, 'time': value.timetz()}
+    return data
+
+
+def _from_template(model: type, data: Dict[str, Any], context: str, now: datetime):
+    data = dict(data)
+    if context != CONTEXT_ABSOLUTE:
+        for name in DATETIME_FIELDS[model]:
+            value = data.get(name)
+            if isinstance(value, dict):
+                day = now.date() + timedelta(days=value['days'])
+                data[name] = datetime.combine(day, value['time'])
+    if model is Note:
+        data['created_at'] = now.strftime('%Y-%m-%dT%H:%M:%S')
+    return model(**data)
+
+
+def _first_datetime(result) -> Optional[datetime]:
+    for name in DATETIME_FIELDS[type(result)]:
+        value = getattr(result, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def _is_past(value: datetime, now: datetime) -> bool:
+    if value.tzinfo is not None:
+        now = now.astimezone(value.tzinfo)
+    return value < now
+
+
+class ResultCache:
+    """LRU-кэш результатов RequestClassifier.process_request с TTL и метриками попаданий"""
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_size: максимум записей (RESULT_CACHE_SIZE, по умолчанию 512; 0 - кэш выключен)
+            ttl_seconds: время жизни записи (RESULT_CACHE_TTL_SECONDS, по умолчанию неделя)
+        """
+        self.max_size = max_size if max_size is not None else int(os.getenv('RESULT_CACHE_SIZE', '512'))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('RESULT_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        # ключ -> (тип результата, шаблон, был ли результат в будущем, время записи)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[type, Dict[str, Any], bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.uncacheable = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _key(self, text: str, now: datetime) -> Optional[Tuple[str, str]]:
+        normalized = normalize_text(text)
+        context = date_context(normalized, now)
+        return (normalized, context) if context is not None else None
+
+    def get(self, text: str, now: Optional[datetime] = None) -> Optional[Union[CalendarEvent, Note, Task]]:
+        """Результат для текста, привязанный к текущей дате, или None"""
+        if not self.enabled:
+            return None
+        now = now or datetime.now()
+        key = self._key(text, now)
+        if key is None:
+            with self._lock:
+                self.uncacheable += 1
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[3] > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        model, template, was_future, _ = entry
+        try:
+            result = _from_template(model, template, key[1], now)
+        except Exception as e:
+            calendar_logger.log_error(e, "result_cache.get")
+            result = None
+        moment = _first_datetime(result) if result is not None else None
+        if result is None or (was_future and moment is not None and _is_past(moment, now)):
+            # Время уже прошло (например, "обед в 13:00" после обеда) - модель решит заново
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        calendar_logger.info(f"Result cache hit ({key[1]}): {key[0]}")
+        return result
+
+    def put(self, text: str, result: Union[CalendarEvent, Note, Task], now: Optional[datetime] = None):
+        """Сохраняет результат как шаблон относительно даты запроса"""
+        if not self.enabled or type(result) not in DATETIME_FIELDS:
+            return
+        now = now or datetime.now()
+        key = self._key(text, now)
+        if key is None:
+            return
+        moment = _first_datetime(result)
+        entry = (type(result), _to_template(result, key[1], now),
+                 moment is not None and not _is_past(moment, now), time.monotonic())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expired': self.expired,
+                'uncacheable': self.uncacheable,
+            }
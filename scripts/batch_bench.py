@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Throughput of AssistantService.process_user_requests vs parallelism.
+
+The batch API classifies all messages in one call and extracts them grouped
+by type, at most --workers model calls at a time. For every value in
+--workers the samples (--samples JSONL: text, type) are processed as one
+batch (repeated --repeat times to get a larger batch) and reported:
+
+- wall time, requests per second and speed-up over workers=1 (near-linear up
+  to the LLM server's parallel slot count, flat after it);
+- type accuracy and per-item failures;
+- the sequential baseline (process_user_request one by one) with --sequential.
+
+The result cache is disabled so every run pays for the model calls. Needs the
+configured models (LM Studio / OpenRouter) to be reachable.
+
+Usage:
+  python scripts/batch_bench.py [--samples scripts/request_mode_samples.jsonl] [--workers 1,2,4,8] [--repeat 1] [--sequential]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from assistant_service import AssistantService
+
+ACTION_TYPES = {"confirm": "calendar_event", "confirm_task": "task", "note": "note"}
+
+
+def load_samples(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def score(samples, responses):
+    correct = sum(1 for sample, response in zip(samples, responses)
+                  if ACTION_TYPES.get(response.get("action")) == sample["type"])
+    failed = sum(1 for response in responses if not response["success"])
+    return correct, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=Path, default=PROJECT_ROOT / "scripts" / "request_mode_samples.jsonl")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--repeat", type=int, default=1, help="repeat the samples to build a larger batch")
+    parser.add_argument("--sequential", action="store_true", help="also run process_user_request one by one")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples) * args.repeat
+    texts = [sample["text"] for sample in samples]
+    service = AssistantService(lazy=True)
+    service.init_inference()
+    service.inference.result_cache.max_size = 0
+
+    n = len(samples)
+    if args.sequential:
+        started = time.perf_counter()
+        responses = [service.process_user_request(text) for text in texts]
+        elapsed = time.perf_counter() - started
+        correct, failed = score(samples, responses)
+        print(f"sequential: {elapsed:.2f} s, {n / elapsed:.2f} req/s, accuracy {correct / n:.1%}, failed {failed}")
+
+    baseline = None
+    for workers in [int(value) for value in args.workers.split(",")]:
+        started = time.perf_counter()
+        responses = service.process_user_requests(texts, max_workers=workers)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        correct, failed = score(samples, responses)
+        print(f"workers {workers}: {elapsed:.2f} s, {n / elapsed:.2f} req/s, speed-up x{baseline / elapsed:.2f}, "
+              f"accuracy {correct / n:.1%}, failed {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Click-to-created latency of a confirmation with and without preparation.
+
+Emulates the preview -> "✅ Подтвердить" flow against the real Google API:
+
+- cold: the idle connection has been dropped (as after a few minutes
+  without requests) and the insert is built at click time;
+- prepared: AssistantService.prepare_confirmation runs when the preview is
+  shown (token refresh, warm connection, pre-built request), then the user
+  "reads" the preview for --think seconds before the click.
+
+Only the time after the click is measured. Every created event is deleted
+right away. Needs credentials (GOOGLE_OAUTH_TOKEN / credentials.json).
+
+Usage:
+  python scripts/confirm_latency_bench.py [--runs 10] [--think 3] [--calendar-id primary]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from assistant_service import AssistantService
+from models import CalendarEvent
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def make_event(index):
+    start = (datetime.now() + timedelta(days=30)).replace(hour=9, minute=0, second=0, microsecond=0)
+    return CalendarEvent(title=f"confirm latency bench #{index}", start_time=start + timedelta(minutes=index))
+
+
+def confirm(service, event, key, calendar_id):
+    started = time.perf_counter()
+    result = service.create_confirmed_event(event, key)
+    elapsed = time.perf_counter() - started
+    if result.get("success"):
+        service.calendar_client.calendar_service.events().delete(
+            calendarId=calendar_id, eventId=result["event_id"]
+        ).execute()
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--think", type=float, default=3.0, help="seconds between the preview and the click")
+    parser.add_argument("--calendar-id", default="primary")
+    args = parser.parse_args()
+
+    service = AssistantService()
+    client = service.calendar_client
+    timings = {"cold": [], "prepared": []}
+
+    for index in range(args.runs):
+        event = make_event(index)
+        client.close_connections()
+        elapsed, result = confirm(service, event, None, args.calendar_id)
+        timings["cold"].append(elapsed)
+
+        key = f"bench_{index}"
+        client.close_connections()
+        service.prepare_confirmation(key, {"type": "event", "payload": event})
+        time.sleep(args.think)
+        elapsed, result = confirm(service, event, key, args.calendar_id)
+        if not result.get("prepared"):
+            print(f"  run {index}: prepared request was not used")
+        timings["prepared"].append(elapsed)
+
+    for name, values in timings.items():
+        print(f"{name:>9}: p50 {percentile(values, 0.5) * 1000:.0f} ms, p95 {percentile(values, 0.95) * 1000:.0f} ms, "
+              f"max {max(values) * 1000:.0f} ms ({len(values)} runs)")
+    gap = percentile(timings["cold"], 0.5) - percentile(timings["prepared"], 0.5)
+    print(f"Gap (p50): {gap * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
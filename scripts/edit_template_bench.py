@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Latency of the edit-template fast path vs the LLM pipeline it replaces.
+
+A filled edit template ("Название: ... / Время: dd.mm.YYYY HH:MM / ...") is
+parsed by edit_template.parse_edit_template with zero model calls. Before it,
+the same text went through ClassificationHandler and CalendarEventHandler, i.e.
+two sequential LLM requests.
+
+The local parser is always measured on -n generated templates (events and
+tasks, with duration / end time / description variations). With --llm the
+old path (classify + extract through the configured ModelRouter) is timed on
+--llm-samples of the same templates, and the saved latency is reported.
+
+Usage:
+  python scripts/edit_template_bench.py [-n 2000] [--llm] [--llm-samples 5]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from edit_template import format_edit_template, parse_edit_template
+from models import CalendarEvent, Task
+
+TITLES = ["Встреча с командой", "Созвон с клиентом", "Спортзал", "Купить продукты", "Планерка", "Обед с Анной"]
+DESCRIPTIONS = [None, "обсудить релиз", "взять документы", "зал 3, второй этаж"]
+
+
+def make_templates(n: int, seed: int = 1):
+    rng = random.Random(seed)
+    base = datetime.now().replace(second=0, microsecond=0)
+    templates = []
+    for _ in range(n):
+        start = base + timedelta(days=rng.randint(0, 30), minutes=rng.randrange(0, 24 * 60, 15))
+        title = rng.choice(TITLES)
+        description = rng.choice(DESCRIPTIONS)
+        if rng.random() < 0.2:
+            item = Task(title=title, due_time=start, description=description)
+        elif rng.random() < 0.5:
+            item = CalendarEvent(title=title, start_time=start, duration_minutes=rng.choice([30, 60, 90]),
+                                 description=description)
+        else:
+            item = CalendarEvent(title=title, start_time=start, end_time=start + timedelta(minutes=45),
+                                 description=description)
+        templates.append((item, format_edit_template(item)))
+    return templates
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def bench_local(templates):
+    timings = []
+    mismatches = 0
+    for item, text in templates:
+        started = time.perf_counter()
+        parsed = parse_edit_template(text)
+        timings.append(time.perf_counter() - started)
+        if parsed is None or parsed.title != item.title:
+            mismatches += 1
+    return timings, mismatches
+
+
+def bench_llm(templates):
+    from request_classifier import RequestClassifier
+
+    classifier = RequestClassifier()
+    timings = []
+    for _, text in templates:
+        started = time.perf_counter()
+        classification = classifier.classification_handler.classify_request(text)
+        classifier.extract(classification, text)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=2000, help="templates for the local parser")
+    parser.add_argument("--llm", action="store_true", help="also time the classify + extract LLM path")
+    parser.add_argument("--llm-samples", type=int, default=5, help="templates sent through the LLM path")
+    args = parser.parse_args()
+
+    templates = make_templates(args.n)
+    local, mismatches = bench_local(templates)
+    print(f"Local template parser: {len(local)} templates, {mismatches} not recognized")
+    print(f"  p50 {percentile(local, 0.5) * 1e6:.1f} µs, p95 {percentile(local, 0.95) * 1e6:.1f} µs, "
+          f"max {max(local) * 1e6:.1f} µs, model calls: 0")
+
+    if not args.llm:
+        print("LLM path: not measured (use --llm; it makes 2 model calls per template)")
+        return
+
+    llm = bench_llm(templates[:args.llm_samples])
+    llm_mean = statistics.mean(llm)
+    local_mean = statistics.mean(local)
+    print(f"LLM path (classify + extract): {len(llm)} templates, model calls: {2 * len(llm)}")
+    print(f"  mean {llm_mean:.3f} s, p50 {percentile(llm, 0.5):.3f} s, max {max(llm):.3f} s")
+    print(f"Saved per template edit: {llm_mean - local_mean:.3f} s ({llm_mean / max(local_mean, 1e-9):,.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
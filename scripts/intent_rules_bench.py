@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Share of requests the rule-based intent classifier takes off the LLM.
+
+intent_rules.classify_by_rules scores a request with compiled regex features
+and skips ClassificationHandler's model call when the softmax confidence
+reaches INTENT_RULES_THRESHOLD. For every threshold in --thresholds this
+reports:
+
+- bypass share on the labelled samples (--samples JSONL: text, type) and the
+  accuracy of the bypassed decisions (a wrong bypass is a misclassification
+  the LLM might have avoided);
+- bypass share on real traffic, when --log points at calendar_assistant.log
+  (USER_REQUEST lines, [VOICE] prefix stripped, [IMPORT] summaries skipped);
+- rule latency per request and how often each feature fires.
+
+Usage:
+  python scripts/intent_rules_bench.py [--samples scripts/request_mode_samples.jsonl] [--log calendar_assistant.log] [--thresholds 0.8,0.9,0.95]
+"""
+import argparse
+import collections
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from intent_rules import score_request
+
+USER_REQUEST_RE = re.compile(r'USER_REQUEST \| User: .*? \| Message: (.*) \| Time: ')
+
+
+def load_samples(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_log_requests(path: Path):
+    requests = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = USER_REQUEST_RE.search(line)
+            if not match:
+                continue
+            message = match.group(1)
+            if message.startswith("[IMPORT]"):
+                continue
+            requests.append(message.removeprefix("[VOICE] ").strip())
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=Path, default=PROJECT_ROOT / "scripts" / "request_mode_samples.jsonl")
+    parser.add_argument("--log", type=Path, help="calendar_assistant.log with USER_REQUEST lines")
+    parser.add_argument("--thresholds", default="0.8,0.9,0.95")
+    args = parser.parse_args()
+
+    thresholds = [float(value) for value in args.thresholds.split(",")]
+    samples = load_samples(args.samples)
+    traffic = load_log_requests(args.log) if args.log else []
+
+    timings = []
+    features = collections.Counter()
+    scored_samples = []
+    for sample in samples:
+        started = time.perf_counter()
+        decision = score_request(sample["text"])
+        timings.append(time.perf_counter() - started)
+        features.update(decision.features)
+        scored_samples.append((sample, decision))
+    scored_traffic = [score_request(text) for text in traffic]
+
+    print(f"{len(samples)} labelled samples, {len(traffic)} logged requests")
+    print(f"Rule latency: mean {sum(timings) / len(timings) * 1e6:.1f} µs, max {max(timings) * 1e6:.1f} µs, model calls: 0")
+
+    for threshold in thresholds:
+        bypassed = [(sample, decision) for sample, decision in scored_samples
+                    if decision.label is not None and decision.confidence >= threshold]
+        correct = sum(1 for sample, decision in bypassed if decision.label == sample["type"])
+        line = (f"\nthreshold {threshold:.2f}: samples bypass {len(bypassed)}/{len(samples)} "
+                f"({len(bypassed) / max(len(samples), 1):.0%})")
+        if bypassed:
+            line += f", bypass accuracy {correct / len(bypassed):.0%}"
+        if traffic:
+            traffic_bypass = sum(1 for decision in scored_traffic
+                                 if decision.label is not None and decision.confidence >= threshold)
+            line += f"; traffic bypass {traffic_bypass}/{len(traffic)} ({traffic_bypass / len(traffic):.0%})"
+        print(line)
+        for sample, decision in bypassed:
+            if decision.label != sample["type"]:
+                print(f"  ✗ {sample['text']!r}: rules {decision.label} ({decision.confidence:.2f}), expected {sample['type']}")
+
+    print("\nFeature hits on samples:")
+    for name, count in features.most_common():
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Accuracy and latency of the two-step vs combined request modes.
+
+two_step: ClassificationHandler, then the calendar / task / note handler,
+i.e. two sequential LLM round trips. combined: CombinedHandler returns the
+type and the typed payload in one generation (request_mode in
+model_config.json).
+
+Each labelled sample from --samples (JSONL: text, type, optional hour of the
+expected start) is sent through RequestClassifier.process_request in every
+mode. Reported per mode: type accuracy, start-hour accuracy on the samples
+that have one, model calls per request (combined falls back to two-step when
+its answer does not parse) and latency percentiles. Needs the configured
+models (LM Studio / OpenRouter) to be reachable.
+
+Usage:
+  python scripts/request_mode_bench.py [--samples scripts/request_mode_samples.jsonl] [--modes two_step,combined] [--limit 30]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from models import CalendarEvent, Note, Task
+from request_classifier import REQUEST_MODES, RequestClassifier
+
+RESULT_TYPES = {CalendarEvent: "calendar_event", Task: "task", Note: "note"}
+
+
+def load_samples(path: Path, limit: int):
+    with open(path, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+    return samples[:limit] if limit else samples
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def count_calls(classifier: RequestClassifier):
+    """Wraps router.generate to count model calls"""
+    calls = [0]
+    generate = classifier.router.generate
+
+    def counting_generate(*args, **kwargs):
+        calls[0] += 1
+        return generate(*args, **kwargs)
+
+    classifier.router.generate = counting_generate
+    return calls
+
+
+def bench_mode(mode: str, samples):
+    classifier = RequestClassifier(mode=mode)
+    calls = count_calls(classifier)
+    timings, type_hits, hour_hits, hour_total = [], 0, 0, 0
+    errors = []
+    for sample in samples:
+        started = time.perf_counter()
+        result = classifier.process_request(sample["text"])
+        timings.append(time.perf_counter() - started)
+
+        result_type = RESULT_TYPES.get(type(result))
+        if result_type == sample["type"]:
+            type_hits += 1
+        else:
+            errors.append(f"{sample['text']!r}: expected {sample['type']}, got {result_type}")
+        if sample.get("hour") is not None:
+            hour_total += 1
+            if isinstance(result, CalendarEvent) and result.start_time.hour == sample["hour"]:
+                hour_hits += 1
+
+    return {
+        "mode": mode,
+        "type_accuracy": type_hits / len(samples),
+        "hour_accuracy": hour_hits / hour_total if hour_total else None,
+        "calls_per_request": calls[0] / len(samples),
+        "mean": statistics.mean(timings),
+        "p50": percentile(timings, 0.5),
+        "p95": percentile(timings, 0.95),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=Path, default=PROJECT_ROOT / "scripts" / "request_mode_samples.jsonl")
+    parser.add_argument("--modes", default=",".join(REQUEST_MODES), help="comma-separated modes to compare")
+    parser.add_argument("--limit", type=int, default=0, help="use only the first N samples")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples, args.limit)
+    print(f"{len(samples)} samples from {args.samples}")
+    reports = [bench_mode(mode.strip(), samples) for mode in args.modes.split(",") if mode.strip()]
+
+    for report in reports:
+        hour = f"{report['hour_accuracy']:.0%}" if report["hour_accuracy"] is not None else "n/a"
+        print(f"\n{report['mode']}: type accuracy {report['type_accuracy']:.0%}, start hour {hour}, "
+              f"{report['calls_per_request']:.2f} model calls/request")
+        print(f"  mean {report['mean']:.2f} s, p50 {report['p50']:.2f} s, p95 {report['p95']:.2f} s")
+        for error in report["errors"]:
+            print(f"  ✗ {error}")
+
+    if len(reports) == 2:
+        base, other = reports
+        print(f"\n{other['mode']} vs {base['mode']}: mean latency {other['mean'] - base['mean']:+.2f} s "
+              f"({other['mean'] / max(base['mean'], 1e-9):.2f}x), "
+              f"type accuracy {(other['type_accuracy'] - base['type_accuracy']) * 100:+.0f} pp")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Accuracy and latency of the rule-based temporal parser vs CalendarEventHandler.
+
+temporal_parser.parse_temporal resolves Russian date/time/duration phrases
+("завтра в 17", "с 13 до 14", "через два часа") without a model. Simple
+events are built entirely by the rules; for the rest the resolved values are
+passed to CalendarEventHandler so the model only writes the title.
+
+Each sample in --samples (JSONL: text, expected start / end as ISO minutes or
+null when the rules should abstain, optional RRULE recurrence) is resolved
+against the fixed --now. Reported:
+
+- parser: share of resolved samples, accuracy of start / end / recurrence on
+  them, abstentions, share of events built without a model, latency;
+- with --llm: the same samples through CalendarEventHandler alone (full ISO
+  timestamps from the model) and through the fast path (rules first, model
+  with resolved slots otherwise) - accuracy, model calls and latency.
+
+Usage:
+  python scripts/temporal_bench.py [--samples scripts/temporal_samples.jsonl] [--now 2026-10-17T11:00] [--llm]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from temporal_parser import parse_temporal
+from utils import get_default_end_time
+
+
+def load_samples(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def minutes(value):
+    return value.replace(tzinfo=None).isoformat(timespec="minutes") if value else None
+
+
+def event_matches(event, sample):
+    if event is None:
+        return False
+    end = event.end_time or get_default_end_time(event.start_time, event.duration_minutes)
+    return (minutes(event.start_time) == sample["start"] and minutes(end) == sample["end"]
+            and (event.recurrence or None) == sample.get("recurrence"))
+
+
+def enhanced_message(text: str, now: datetime) -> str:
+    # Same input data block as RequestClassifier.extract
+    return f"""
+            ## Input Data
+            - Current date: {now.strftime("%Y-%m-%d %H:%M:%S (%A)")}
+            - User query: {text}
+            """
+
+
+def bench_parser(samples, now):
+    timings, resolved, correct, simple, abstain_ok, errors = [], 0, 0, 0, 0, []
+    for sample in samples:
+        started = time.perf_counter()
+        slots = parse_temporal(sample["text"], now)
+        timings.append(time.perf_counter() - started)
+        if not slots.resolved:
+            if sample["start"] is None:
+                abstain_ok += 1
+            else:
+                errors.append(f"{sample['text']!r}: not resolved, expected {sample['start']}")
+            continue
+        resolved += 1
+        simple += slots.is_simple
+        got = (minutes(slots.start), minutes(slots.end_or_default()), slots.recurrence)
+        if got == (sample["start"], sample["end"], sample.get("recurrence")):
+            correct += 1
+        else:
+            errors.append(f"{sample['text']!r}: got {got}")
+
+    n = len(samples)
+    expected_none = sum(1 for sample in samples if sample["start"] is None)
+    print(f"Parser on {n} samples (now {now:%Y-%m-%d %H:%M %A}):")
+    print(f"  resolved {resolved}/{n}, correct {correct}/{resolved} ({correct / max(resolved, 1):.1%}), "
+          f"abstained correctly {abstain_ok}/{expected_none}")
+    print(f"  built without a model: {simple}/{n} ({simple / n:.0%})")
+    print(f"  latency p50 {percentile(timings, 0.5) * 1e6:.0f} µs, p95 {percentile(timings, 0.95) * 1e6:.0f} µs, "
+          f"max {max(timings) * 1e6:.0f} µs")
+    for error in errors:
+        print(f"  ✗ {error}")
+
+
+def bench_llm(samples, now):
+    from llm_inference import ModelRouter
+    from request_handlers import CalendarEventHandler
+
+    handler = CalendarEventHandler(ModelRouter())
+    calls = [0]
+    generate = handler.router.generate
+
+    def counting_generate(*args, **kwargs):
+        calls[0] += 1
+        return generate(*args, **kwargs)
+
+    handler.router.generate = counting_generate
+    labelled = [sample for sample in samples if sample["start"] is not None]
+
+    for name in ("model only", "fast path"):
+        calls[0] = 0
+        timings, correct = [], 0
+        for sample in labelled:
+            started = time.perf_counter()
+            if name == "model only":
+                event = handler.create_calendar_event(enhanced_message(sample["text"], now))
+            else:
+                slots = parse_temporal(sample["text"], now)
+                event = slots.to_event() if slots.is_simple else handler.create_calendar_event(
+                    enhanced_message(sample["text"], now), slots=slots)
+            timings.append(time.perf_counter() - started)
+            correct += event_matches(event, sample)
+        n = len(labelled)
+        print(f"\n{name}: accuracy {correct}/{n} ({correct / n:.1%}), model calls {calls[0]}, "
+              f"mean {statistics.mean(timings):.3f} s, p50 {percentile(timings, 0.5):.3f} s, "
+              f"p95 {percentile(timings, 0.95):.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=Path, default=PROJECT_ROOT / "scripts" / "temporal_samples.jsonl")
+    parser.add_argument("--now", default="2026-10-17T11:00", help="reference time the samples were labelled against")
+    parser.add_argument("--llm", action="store_true", help="also run CalendarEventHandler (needs the configured models)")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples)
+    now = datetime.fromisoformat(args.now)
+    bench_parser(samples, now)
+    if args.llm:
+        bench_llm(samples, now)
+
+
+if __name__ == "__main__":
+    main()
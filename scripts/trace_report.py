@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Per-stage latency report from the traces exported by tracing.py.
+
+Every Telegram update is one trace (one JSON line in TRACE_FILE, default
+traces.jsonl) with nested spans: queue.wait, download, audio.decode,
+audio.cut, asr.window / asr.encoder / asr.decoding, classify.*, extract,
+llm.generate (provider and model attrs) with llm.local / llm.openrouter
+inside (ttft_ms for streamed answers), llm.parse, google.*, telegram.reply /
+telegram.edit and stage.wait / stage.<name> for the scheduler limits.
+
+For every span name the report prints count, p50/p95/p99/max in ms and the
+share of the total trace time it accounts for (sum of span durations / sum
+of trace durations; nested spans overlap their parents, so the shares do not
+add up to 100%). --slowest N lists the slowest traces with their spans as a
+tree.
+
+Usage:
+  python scripts/trace_report.py [--file traces.jsonl] [--trace-name update.voice] [--since 2026-10-01T00:00] [--slowest 5]
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def load_traces(path: Path, trace_name=None, since=None):
+    traces = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                trace = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # line cut off when the bot stopped
+            if trace_name and not trace["name"].startswith(trace_name):
+                continue
+            if since and trace["start"] < since:
+                continue
+            traces.append(trace)
+    return traces
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def stage_table(traces):
+    durations = defaultdict(list)
+    for trace in traces:
+        for span in trace["spans"]:
+            if span["duration_ms"] is not None:
+                durations[span["name"]].append(span["duration_ms"])
+    total = sum(trace["duration_ms"] for trace in traces) or 1.0
+    rows = []
+    for name, values in durations.items():
+        rows.append({
+            "name": name,
+            "count": len(values),
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": max(values),
+            "share": sum(values) / total,
+        })
+    return sorted(rows, key=lambda row: row["p95"], reverse=True)
+
+
+def print_tree(trace):
+    children = defaultdict(list)
+    for span in trace["spans"]:
+        children[span["parent"]].append(span)
+
+    def walk(parent, depth):
+        for span in sorted(children[parent], key=lambda item: item["start_ms"]):
+            duration = f"{span['duration_ms']:.1f}" if span["duration_ms"] is not None else "?"
+            attrs = " ".join(f"{key}={value}" for key, value in span.get("attrs", {}).items())
+            error = f" ERROR {span['error']}" if span.get("error") else ""
+            print(f"    {'  ' * depth}{span['name']:<{32 - 2 * depth}} +{span['start_ms']:>9.1f} {duration:>9} ms  {attrs}{error}")
+            walk(span["id"], depth + 1)
+
+    walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", type=Path, default=PROJECT_ROOT / "traces.jsonl")
+    parser.add_argument("--trace-name", help="only traces whose name starts with this (update.voice, update.text, ...)")
+    parser.add_argument("--since", help="only traces started at or after this ISO timestamp")
+    parser.add_argument("--slowest", type=int, default=0, help="print the N slowest traces as span trees")
+    args = parser.parse_args()
+
+    traces = load_traces(args.file, args.trace_name, args.since)
+    if not traces:
+        print(f"No traces in {args.file}")
+        return
+
+    totals = [trace["duration_ms"] for trace in traces]
+    print(f"Traces: {len(traces)}  end-to-end p50 {percentile(totals, 0.5):.1f} ms, "
+          f"p95 {percentile(totals, 0.95):.1f} ms, p99 {percentile(totals, 0.99):.1f} ms")
+    print()
+    print(f"  {'span':<28} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'share':>6}")
+    for row in stage_table(traces):
+        print(f"  {row['name']:<28} {row['count']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} "
+              f"{row['p99']:>9.1f} {row['max']:>9.1f} {row['share']:>6.0%}")
+
+    if args.slowest:
+        print()
+        print(f"Slowest {args.slowest} traces:")
+        for trace in sorted(traces, key=lambda item: item["duration_ms"], reverse=True)[:args.slowest]:
+            print(f"  {trace['trace_id']} {trace['name']} {trace['start']} {trace['duration_ms']:.1f} ms")
+            print_tree(trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Train the local intent classifier from bot logs and compare it with the LLM.
+
+Training pairs come from calendar_assistant.log: "Request classified as:
+<label> | Message: <text>" lines written by ClassificationHandler (older
+lines without the text are paired with the preceding USER_REQUEST /
+INTENT_RULE message). --train-samples adds labelled JSONL (text, type).
+Evaluation samples are excluded from training.
+
+The model (hashed char 2-4-gram TF-IDF + logistic regression, NumPy only) is
+saved to --out, which ClassificationHandler loads from INTENT_MODEL_PATH.
+The report on --eval (the 30-sample set by default) covers:
+
+- load time, per-request latency, overall accuracy;
+- coverage at --margin (share of requests answered without the LLM) and
+  accuracy on that share;
+- LLM calls left after rules + model.
+
+With --llm the same samples go through ClassificationHandler's model call for
+the baseline. Without it, the reference run noted in main.py is printed
+(86.7%, 0.643 s mean).
+
+Usage:
+  python scripts/train_intent_model.py [--log calendar_assistant.log ...] [--train-samples extra.jsonl] [--out intent_model.npz] [--margin 0.5] [--llm]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from intent_model import LABELS, IntentModel, load_training_data
+from intent_rules import classify_by_rules
+
+# Reference LLM classification run recorded in main.py
+LLM_REFERENCE = {"accuracy": 0.867, "mean": 0.643}
+
+
+def load_samples(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", type=Path, nargs="+", default=[PROJECT_ROOT / "calendar_assistant.log"])
+    parser.add_argument("--train-samples", type=Path, help="extra labelled JSONL for training")
+    parser.add_argument("--eval", type=Path, default=PROJECT_ROOT / "scripts" / "request_mode_samples.jsonl")
+    parser.add_argument("--out", type=Path, default=PROJECT_ROOT / "intent_model.npz")
+    parser.add_argument("--margin", type=float, default=float(os.getenv("INTENT_MODEL_MARGIN", "0.5")))
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--llm", action="store_true", help="measure the LLM classifier on the eval samples")
+    args = parser.parse_args()
+
+    eval_samples = load_samples(args.eval)
+    eval_texts = {sample["text"] for sample in eval_samples}
+
+    pairs = load_training_data(str(path) for path in args.log if path.exists())
+    if args.train_samples:
+        pairs += [(sample["text"], sample["type"]) for sample in load_samples(args.train_samples)]
+    pairs = list(dict.fromkeys(pair for pair in pairs if pair[1] in LABELS))
+    overlap = sum(1 for text, _ in pairs if text in eval_texts)
+    pairs = [(text, label) for text, label in pairs if text not in eval_texts]
+    if len({label for _, label in pairs}) < 2:
+        print(f"Not enough training data: {len(pairs)} labelled requests (need at least two classes)")
+        return
+
+    counts = {label: sum(1 for _, item in pairs if item == label) for label in LABELS}
+    print(f"Training on {len(pairs)} requests {counts} ({overlap} eval samples excluded)")
+    started = time.perf_counter()
+    model = IntentModel.train([text for text, _ in pairs], [label for _, label in pairs], epochs=args.epochs)
+    print(f"Trained in {time.perf_counter() - started:.2f} s")
+    model.save(str(args.out))
+
+    started = time.perf_counter()
+    model = IntentModel.load(str(args.out))
+    print(f"Saved to {args.out} ({args.out.stat().st_size / 1024:.0f} KB), load {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    timings, correct, covered, covered_correct, llm_left = [], 0, 0, 0, 0
+    for sample in eval_samples:
+        started = time.perf_counter()
+        label, margin = model.predict(sample["text"])
+        timings.append(time.perf_counter() - started)
+        correct += label == sample["type"]
+        if margin >= args.margin:
+            covered += 1
+            covered_correct += label == sample["type"]
+        elif not classify_by_rules(sample["text"]).bypass:
+            llm_left += 1
+
+    n = len(eval_samples)
+    print(f"\nLocal model on {n} samples: accuracy {correct / n:.1%}, "
+          f"latency p50 {percentile(timings, 0.5) * 1e6:.0f} µs, p95 {percentile(timings, 0.95) * 1e6:.0f} µs, "
+          f"max {max(timings) * 1e6:.0f} µs")
+    covered_accuracy = f"{covered_correct / covered:.1%}" if covered else "n/a"
+    print(f"  margin >= {args.margin:g}: coverage {covered / n:.0%}, accuracy on covered {covered_accuracy}")
+    print(f"  LLM calls left after rules + model: {llm_left}/{n} ({llm_left / n:.0%})")
+
+    if args.llm:
+        from request_handlers import ClassificationHandler
+        from llm_inference import ModelRouter
+
+        handler = ClassificationHandler(ModelRouter())
+        llm_timings, llm_correct = [], 0
+        for sample in eval_samples:
+            started = time.perf_counter()
+            llm_correct += handler.classify_with_model(sample["text"]) == sample["type"]
+            llm_timings.append(time.perf_counter() - started)
+        print(f"\nLLM classifier: accuracy {llm_correct / n:.1%}, mean {statistics.mean(llm_timings):.3f} s, "
+              f"p50 {percentile(llm_timings, 0.5):.3f} s")
+    else:
+        print(f"\nLLM classifier (reference run from main.py): accuracy {LLM_REFERENCE['accuracy']:.1%}, "
+              f"mean {LLM_REFERENCE['mean']:.3f} s (use --llm to measure)")
+
+
+if __name__ == "__main__":
+    main()
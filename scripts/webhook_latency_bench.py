@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Local stand-in test for webhook mode: end-to-end latency vs long polling.
+
+Starts a fake Telegram Bot API server on localhost and points a
+python-telegram-bot Application at it via base_url. The same recorded (or
+synthetic) updates are delivered twice:
+
+- polling: updates are returned from the fake getUpdates long poll;
+- webhook: updates are POSTed to WebhookServer with the secret token header.
+
+The handler replies with sendMessage("ack <update_id>"), and latency is the
+time between delivering an update and the fake API receiving that reply.
+The handler is a trivial echo so the numbers reflect transport and dispatch
+overhead, not LLM time. --rtt-ms adds a simulated network round trip to every
+Bot API call and half of it to webhook delivery.
+
+Usage:
+  python scripts/webhook_latency_bench.py [--updates recorded.jsonl] [-n 50] [--rtt-ms 0]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+# Ensure project root is importable
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from telegram.ext import Application, MessageHandler, filters
+
+from webhook_server import WebhookServer, read_http_request, write_http_response
+
+TOKEN = "123456:BENCH"
+SECRET = "bench-secret"
+CHAT_ID = 1000
+# Telegram opens up to 40 parallel webhook connections by default (max_connections)
+WEBHOOK_CONNECTIONS = 40
+
+
+def synthetic_updates(count):
+    now = int(time.time())
+    for i in range(count):
+        yield {
+            "update_id": i + 1,
+            "message": {
+                "message_id": i + 1,
+                "date": now,
+                "chat": {"id": CHAT_ID, "type": "private"},
+                "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Bench"},
+                "text": f"Встреча завтра в {10 + i % 8}:00",
+            },
+        }
+
+
+def load_updates(path, count):
+    updates = []
+    for raw in Path(path).read_text(encoding="utf-8").splitlines():
+        if raw.strip():
+            updates.append(json.loads(raw))
+    # Renumber so both runs see fresh, ordered update_ids
+    for i, update in enumerate(updates[:count]):
+        update["update_id"] = i + 1
+    return updates[:count]
+
+
+class FakeBotApi:
+    """Minimal Bot API: getMe, getUpdates (long poll), sendMessage, everything else -> true."""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.pending_updates = []
+        self.new_update = asyncio.Event()
+        self.acks = {}
+        self.ack_events = {}
+        self.message_id = 10_000
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        # Release long polls that the stopped updater left behind
+        self.new_update.set()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def push_update(self, update):
+        self.pending_updates.append(update)
+        self.new_update.set()
+
+    def expect_ack(self, update_id):
+        event = asyncio.Event()
+        self.ack_events[update_id] = event
+        return event
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await read_http_request(reader)
+                if request is None:
+                    break
+                _, path, headers, body = request
+                method = path.rsplit("/", 1)[-1]
+                if headers.get("content-type", "").startswith("application/json"):
+                    params = json.loads(body or b"{}")
+                else:
+                    params = dict(parse_qsl(body.decode()))
+                result = await self._call(method, params)
+                if self.rtt:
+                    await asyncio.sleep(self.rtt)
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                write_http_response(writer, 200, payload, content_type="application/json")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _call(self, method, params):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                    "can_join_groups": True, "can_read_all_group_messages": False,
+                    "supports_inline_queries": False}
+        if method == "getUpdates":
+            offset = int(params.get("offset") or 0)
+            timeout = float(params.get("timeout") or 0)
+            self.pending_updates = [u for u in self.pending_updates if u["update_id"] >= offset]
+            if not self.pending_updates and timeout:
+                self.new_update.clear()
+                try:
+                    await asyncio.wait_for(self.new_update.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return [u for u in self.pending_updates if u["update_id"] >= offset]
+        if method == "sendMessage":
+            received = time.perf_counter()
+            text = params.get("text", "")
+            if text.startswith("ack "):
+                update_id = int(text.split()[1])
+                self.acks[update_id] = received
+                if update_id in self.ack_events:
+                    self.ack_events[update_id].set()
+            self.message_id += 1
+            return {"message_id": self.message_id, "date": int(time.time()),
+                    "chat": {"id": int(params.get("chat_id", CHAT_ID)), "type": "private"}, "text": text}
+        return True
+
+
+def build_application(api):
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(f"http://127.0.0.1:{api.port}/bot")
+        .concurrent_updates(True)
+        .build()
+    )
+
+    async def echo(update, context):
+        await context.bot.send_message(update.effective_chat.id, f"ack {update.update_id}")
+
+    application.add_handler(MessageHandler(filters.ALL, echo))
+    return application
+
+
+async def deliver_polling(api, update):
+    api.push_update(update)
+
+
+async def deliver_webhook(client_session, update):
+    reader, writer = client_session
+    body = json.dumps(update).encode()
+    writer.write(
+        b"POST /telegram HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        + f"X-Telegram-Bot-Api-Secret-Token: {SECRET}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    if b" 200 " not in status_line:
+        raise RuntimeError(f"Webhook rejected update: {status_line!r}")
+
+
+async def run_mode(mode, updates, rtt, burst):
+    api = FakeBotApi(rtt)
+    await api.start()
+    application = build_application(api)
+    await application.initialize()
+    await application.start()
+
+    server = None
+    sessions = []
+    if mode == "polling":
+        await application.updater.start_polling(poll_interval=0.0, timeout=10)
+        deliver = lambda update: deliver_polling(api, update)  # noqa: E731
+    else:
+        server = WebhookServer(application, path="/telegram", secret_token=SECRET, host="127.0.0.1", port=0)
+        await server.start()
+        idle = asyncio.Queue()
+        for _ in range(min(WEBHOOK_CONNECTIONS, len(updates))):
+            sessions.append(await asyncio.open_connection("127.0.0.1", server.port))
+            idle.put_nowait(sessions[-1])
+
+        async def deliver(update):
+            # Keep-alive connection pool, like Telegram's webhook client
+            if rtt:
+                await asyncio.sleep(rtt / 2)
+            session = await idle.get()
+            try:
+                await deliver_webhook(session, update)
+            finally:
+                idle.put_nowait(session)
+
+    latencies = []
+    started = time.perf_counter()
+
+    async def one(update):
+        ack = api.expect_ack(update["update_id"])
+        sent = time.perf_counter()
+        await deliver(update)
+        await asyncio.wait_for(ack.wait(), 30)
+        latencies.append(api.acks[update["update_id"]] - sent)
+
+    if burst:
+        await asyncio.gather(*(one(u) for u in updates))
+    else:
+        for update in updates:
+            await one(update)
+    total = time.perf_counter() - started
+
+    for _, writer in sessions:
+        writer.close()
+    if server:
+        await server.stop()
+    if application.updater.running:
+        await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    await api.stop()
+    return latencies, total
+
+
+def summarize(label, latencies, total):
+    ordered = sorted(latencies)
+    p = lambda q: ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000  # noqa: E731
+    print(f"{label:<18} n={len(latencies):<4} mean={statistics.mean(latencies) * 1000:7.2f}ms "
+          f"p50={p(0.5):7.2f}ms p95={p(0.95):7.2f}ms max={ordered[-1] * 1000:7.2f}ms "
+          f"throughput={len(latencies) / total:7.1f} upd/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", help="JSONL file with recorded Telegram updates")
+    parser.add_argument("-n", type=int, default=50, help="number of updates per run")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated Bot API round trip")
+    args = parser.parse_args()
+
+    updates = load_updates(args.updates, args.n) if args.updates else list(synthetic_updates(args.n))
+    rtt = args.rtt_ms / 1000
+
+    for burst in (False, True):
+        for mode in ("polling", "webhook"):
+            copies = [json.loads(json.dumps(u)) for u in updates]
+            latencies, total = await run_mode(mode, copies, rtt, burst)
+            summarize(f"{mode}{' burst' if burst else ''}", latencies, total)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
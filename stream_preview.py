@@ -0,0 +1,97 @@
+"""
+Промежуточное превью потокового ответа LLM в сообщении Telegram
+"""
+
+import asyncio
+import os
+import time
+from typing import Optional
+
+from telegram import Message
+from telegram.error import TelegramError
+
+from logger import calendar_logger
+from telegram_sender import TelegramSender
+
+
+# Лимит длины текста сообщения Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+
+class StreamingPreview:
+    """Редактирует сообщение статуса не чаще одного раза в interval секунд
+
+    Текст приходит из потока пула (push_threadsafe) по мере генерации; промежуточные
+    версии, которые не успели показать, просто заменяются последней.
+    """
+
+    def __init__(self, message: Message, header: str = "", interval: Optional[float] = None,
+                 sender: Optional[TelegramSender] = None):
+        """
+        Args:
+            message: сообщение статуса, которое редактируется
+            header: неизменная первая часть текста (например, распознанная речь)
+            interval: минимальный интервал между редактированиями, с (STREAM_EDIT_INTERVAL_MS)
+            sender: общий слой отправки; без него сообщение редактируется напрямую
+        """
+        self.message = message
+        self.sender = sender
+        self.header = header
+        if interval is None:
+            interval = float(os.getenv('STREAM_EDIT_INTERVAL_MS', '1000')) / 1000
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._latest: Optional[str] = None
+        self._shown: Optional[str] = None
+        self._last_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._editing = False
+        self._closed = False
+
+    def push_threadsafe(self, text: str):
+        """Передает новый текст превью из любого потока"""
+        self._loop.call_soon_threadsafe(self.push, text)
+
+    def push(self, text: str):
+        """Передает новый текст превью (из цикла событий)"""
+        if self._closed:
+            return
+        self._latest = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        while not self._closed and self._latest != self._shown:
+            delay = self._last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            text = self._latest
+            self._editing = True
+            try:
+                preview_text = (self.header + text)[:MAX_MESSAGE_LENGTH]
+                if self.sender:
+                    await self.sender.edit(self.message, preview_text)
+                else:
+                    await self.message.edit_text(preview_text)
+            except TelegramError as e:
+                # Например, "message is not modified" или flood control - пропускаем кадр
+                calendar_logger.warning(f"StreamingPreview: edit skipped: {e}")
+            finally:
+                self._editing = False
+            self._shown = text
+            self._last_edit = time.monotonic()
+
+    async def close(self):
+        """Останавливает превью перед финальным редактированием сообщения"""
+        self._closed = True
+        if self._task is None or self._task.done():
+            return
+        if self._editing and self.sender is None:
+            # Дожидаемся текущего редактирования, чтобы оно не легло поверх финального текста
+            await asyncio.gather(self._task, return_exceptions=True)
+        else:
+            # Через sender финальное редактирование встанет после черновика или заменит его
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
@@ -1,6 +1,16 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
+from telegram.ext import (
+    Application, ApplicationHandlerStop, CommandHandler, MessageHandler, CallbackQueryHandler, TypeHandler,
+    filters, ContextTypes
+)
+import asyncio
 import os
+import signal
+import ssl
+import tempfile
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
 
 try:
     from dotenv import load_dotenv
@@ -10,17 +20,82 @@ except ImportError:
 
 from assistant_service import AssistantService
 from voice_service import VoiceService
+from async_executor import AsyncExecutor, CallTimeoutError
+from job_scheduler import JobScheduler, QueueFullError
+from pending_store import SQLitePendingStore
+from webhook_server import WebhookServer
+from stream_preview import StreamingPreview
+from telegram_sender import TelegramSender
+from update_dedup import DedupCache
+from voice_admission import VoiceAdmission, AdmissionDecision, PIPELINE_SHORT
+from audio_stream import PIPE_FRIENDLY_EXTENSIONS
+from warmup import Warmup, ComponentUnavailableError
+from bulk_import import parse_import_document, run_bulk_import, format_bulk_preview
+from event_edits import looks_like_edit
+from edit_template import format_edit_template
 from logger import calendar_logger
+import tracing
+import deadline
+
+
+# Названия компонентов для сообщений о фоновом запуске
+COMPONENT_LABELS = {
+    'llm': "Языковая модель",
+    'google': "Интеграция с Google Calendar",
+    'asr': "Модель распознавания речи",
+}
 
 
 class TelegramBot:
     def __init__(self, token: str):
         self.token = token
-        self.assistant_service = AssistantService()
-        self.voice_service = VoiceService(device="cpu")  # Используем CPU для инференса
-        self.application = Application.builder().token(token).build()
-        # Хранилище для ожидающих подтверждения событий
-        self.pending_events = {}
+        # Модели и клиенты API загружаются в фоне, пока бот уже принимает обновления
+        self.warmup = Warmup()
+        self.warmup_timeout = float(os.getenv('WARMUP_TIMEOUT', '300'))
+        self.assistant_service = AssistantService(lazy=True)
+        self.voice_service = VoiceService(device="cpu", lazy=True)  # Используем CPU для инференса
+        self.warmup.start('llm', self.assistant_service.init_inference)
+        self.warmup.start('google', self.assistant_service.init_calendar_client)
+        self.warmup.start('asr', self.voice_service.load_model)
+        # Блокирующие вызовы (LLM, Google, ASR) выполняются в пуле потоков с дедлайнами
+        self.executor = AsyncExecutor()
+        self.llm_timeout = float(os.getenv('LLM_REQUEST_TIMEOUT', '60'))
+        self.google_timeout = float(os.getenv('GOOGLE_CALL_TIMEOUT', '30'))
+        self.asr_timeout = float(os.getenv('ASR_TIMEOUT', '300'))
+        # Длинные записи получают дедлайн пропорционально ожидаемому времени распознавания
+        self.asr_timeout_factor = float(os.getenv('VOICE_TIMEOUT_FACTOR', '3'))
+        # Сколько пул ждет сверх дедлайна этапа: этап успевает вернуть упрощенный результат
+        self.deadline_grace = float(os.getenv('DEADLINE_GRACE_SECONDS', '3'))
+        self.voice_admission = VoiceAdmission()
+        self.bulk_import_timeout = float(os.getenv('BULK_IMPORT_TIMEOUT', '600'))
+        # Очереди пользователей и лимиты одновременных задач по этапам
+        self.scheduler = JobScheduler()
+        # Потоковый вывод черновика ответа LLM в сообщение статуса
+        self.streaming_enabled = os.getenv('LLM_STREAMING', '1') != '0'
+        # concurrent_updates: обработчики разных обновлений не ждут друг друга
+        self.application = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(True)
+            .post_stop(self._drain_jobs)
+            .build()
+        )
+        # Исходящие сообщения идут через общий лимитер со схлопыванием редактирований
+        self.sender = TelegramSender(self.application.bot)
+        # Фоновые подготовки подтверждений (ссылки, чтобы задачи не собрал сборщик мусора)
+        self._prepare_tasks = set()
+        # Задержка от нажатия "Подтвердить" до ответа: с подготовленным запросом и без
+        self.confirm_latencies = {'prepared': deque(maxlen=200), 'cold': deque(maxlen=200)}
+        # Хранилище для ожидающих подтверждения событий (SQLite + LRU-кэш, TTL)
+        self.pending_events = SQLitePendingStore()
+        # Повторные доставки: уже виденные update_id и результаты по file_unique_id голосовых
+        self.dedup = DedupCache()
+        # Последнее превью в чате (event_id, сообщение, время показа) - к нему применяются правки репликами
+        self.active_previews: Dict[int, Tuple[str, Any, float]] = {}
+        # Сколько секунд после показа превью реплика без ответа на него еще считается правкой
+        self.preview_edit_ttl = float(os.getenv('PREVIEW_EDIT_TTL_SECONDS', '600'))
+        # Чаты, где нажали "Редактировать": следующее сообщение - правка
+        self.edit_requests = set()
         
         # Настройка разрешенных пользователей
         allowed_users_str = os.getenv('TELEGRAM_ALLOWED_USERS', '').strip()
@@ -72,19 +147,46 @@ class TelegramBot:
 
     async def _send_access_denied_message(self, update: Update):
         """Отправка сообщения о запрете доступа"""
-        await update.message.reply_text(
+        await self.sender.reply(
+            update.message,
             "❌ У вас нет доступа к этому боту.\n"
             "Обратитесь к администратору для получения разрешения."
         )
 
     def _setup_handlers(self):
         """Настройка обработчиков команд и сообщений"""
+        # Группа -1 выполняется раньше остальных и отсекает повторно доставленные обновления
+        self.application.add_handler(TypeHandler(Update, self._drop_duplicate_update), group=-1)
         self.application.add_handler(
-            CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
-        self.application.add_handler(MessageHandler(filters.VOICE, self.handle_voice_message))  # Обработчик голосовых сообщений
-        self.application.add_handler(CallbackQueryHandler(self.handle_callback))
+            CommandHandler("start", self._traced("start", self.start_command)))
+        self.application.add_handler(CommandHandler("help", self._traced("help", self.help_command)))
+        self.application.add_handler(CommandHandler("queue", self._traced("queue", self.queue_command)))
+        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND,
+                                                    self._traced("text", self.handle_message)))
+        self.application.add_handler(MessageHandler(
+            filters.VOICE | filters.AUDIO | filters.VIDEO_NOTE | filters.Document.AUDIO,
+            self._traced("voice", self.handle_voice_message)
+        ))  # Голосовые, аудиофайлы и видеосообщения - один путь распознавания
+        self.application.add_handler(MessageHandler(
+            filters.Document.TXT | filters.Document.FileExtension("txt") | filters.Document.FileExtension("csv"),
+            self._traced("import", self.handle_document)
+        ))  # Массовый импорт из TXT/CSV
+        self.application.add_handler(CallbackQueryHandler(self._traced("callback", self.handle_callback)))
+
+    @staticmethod
+    def _traced(name: str, callback):
+        """Обработчик обновления в собственной трассе (update.<name>); ID трассы попадает в логи"""
+        async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            user = update.effective_user.id if update.effective_user else None
+            with tracing.start_trace(f"update.{name}", update_id=update.update_id, user=user):
+                return await callback(update, context)
+        return handler
+
+    async def _drop_duplicate_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Пропускает обновление, которое уже принималось этим процессом (повтор webhook или getUpdates)"""
+        if self.dedup.seen(f"update:{update.update_id}"):
+            calendar_logger.info(f"Duplicate update {update.update_id} dropped")
+            raise ApplicationHandlerStop
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -110,7 +212,7 @@ class TelegramBot:
             "Я автоматически определю, что вы хотите - создать событие в календаре или сохранить заметку.\n"
             "Используйте /help для получения дополнительной информации."
         )
-        await update.message.reply_text(welcome_message)
+        await self.sender.reply(update.message, welcome_message)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /help"""
@@ -126,7 +228,7 @@ class TelegramBot:
             "   📝 Текстовое сообщение или 🎤 Голосовое сообщение\n"
             "2️⃣ Проверьте детали события в предварительном просмотре\n"
             "3️⃣ Нажмите \"✅ Подтвердить\" для создания или \"❌ Отменить\"\n"
-            "4️⃣ Если что-то не так, нажмите \"✏️ Редактировать\"\n\n"
+            "4️⃣ Если что-то не так, нажмите \"✏️ Редактировать\" или просто напишите правку: «перенеси на 18:00»\n\n"
             "Вы можете указать:\n"
             "• Название события (обязательно)\n"
             "• Описание\n"
@@ -144,75 +246,369 @@ class TelegramBot:
             "• 'Запомни номер телефона: +7-123-456-78-90'\n\n"
             "🤖 **Автоматическое определение типа:**\n"
             "Бот сам определит, хотите ли вы создать событие в календаре (с указанием времени) или просто сохранить заметку.\n\n"
-            "🎤 Голосовые сообщения автоматически распознаются и обрабатываются как текст."
+            "🎤 Голосовые сообщения, аудиофайлы и видеосообщения автоматически распознаются и обрабатываются как текст."
+        )
+        await self.sender.reply(update.message, help_message)
+
+    async def queue_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /queue - метрики очередей"""
+        if not self._is_user_allowed(update):
+            await self._send_access_denied_message(update)
+            return
+
+        metrics = self.scheduler.get_metrics()
+        lines = [
+            "📊 Очереди",
+            f"Выполняется: {metrics['running']}, ожидает: {metrics['queued']}, пользователей: {metrics['users']}",
+            f"Ожидание: p50 {metrics['wait_p50']:.1f} с, p95 {metrics['wait_p95']:.1f} с, max {metrics['wait_max']:.1f} с",
+            f"Выполнено: {metrics['completed']}, ошибок: {metrics['failed']}, отклонено: {metrics['rejected']}",
+        ]
+        for name, stage in metrics['stages'].items():
+            lines.append(
+                f"{name}: {stage['active']}/{stage['limit']} активно, ждут {stage['waiting']}, p95 ожидания {stage['wait_p95']:.1f} с"
+            )
+        for name, component in self.warmup.get_status().items():
+            line = f"{name}: {component['state']}"
+            if component['ready_after'] is not None:
+                line += f", готов через {component['ready_after']:.1f} с"
+            if component['first_response_after'] is not None:
+                line += f", первый ответ через {component['first_response_after']:.1f} с"
+            lines.append(line)
+        voice = self.voice_admission.get_metrics()
+        lines.append(
+            f"Аудио: принято {voice['admitted']}, отклонено {voice['rejected']}, RTF "
+            + ", ".join(f"{name} {rtf:.2f} ({voice['samples'][name]} замеров)" for name, rtf in voice['rtf'].items())
         )
-        await update.message.reply_text(help_message)
+        if self.assistant_service.inference is not None:
+            cache = self.assistant_service.inference.result_cache.get_metrics()
+            lines.append(
+                f"Кэш запросов: {cache['size']}/{cache['max_size']}, попаданий {cache['hits']} "
+                f"({cache['hit_rate']:.0%}), промахов {cache['misses']}, вытеснено {cache['evictions']}"
+            )
+        confirm = [
+            f"{label} {len(values)}, p50 {sorted(values)[len(values) // 2] * 1000:.0f} мс"
+            for label, values in (("подготовлено", self.confirm_latencies['prepared']),
+                                  ("без подготовки", self.confirm_latencies['cold'])) if values
+        ]
+        if confirm:
+            lines.append("Подтверждение: " + ", ".join(confirm))
+        await self.sender.reply(update.message, "\n".join(lines))
+
+    async def _run_stage(self, stage: str, func, *args, timeout: float, priority: int = 0):
+        """
+        Выполняет блокирующий вызов в пуле с учетом лимита и приоритета этапа
+
+        timeout - дедлайн этапа вместе с ожиданием лимита. Он передается в поток (deadline.py):
+        вызовы LLM, распознавание и Google API укладываются в остаток или возвращают упрощенный
+        результат, пул ждет на deadline_grace дольше.
+        """
+        started = time.perf_counter()
+        with deadline.scope(timeout):
+            async with self.scheduler.stage(stage, priority) as slot:
+                tracing.record('stage.wait', started, stage=stage)
+                with tracing.span(f'stage.{stage}'):
+                    left = deadline.remaining()
+                    if left is not None:
+                        timeout = max(0.0, left) + self.deadline_grace
+                    try:
+                        return await self.executor.run(func, *args, timeout=timeout)
+                    except CallTimeoutError as e:
+                        # Брошенный вызов занимает слот этапа, пока поток не закончит
+                        if e.future is not None:
+                            slot.hold(e.future)
+                        raise
+
+    async def _wait_component(self, name: str, update: Optional[Update], processing_message=None) -> bool:
+        """Дожидается фоновой инициализации компонента; при ошибке сообщает пользователю"""
+        if not self.warmup.is_ready(name) and processing_message:
+            await self.sender.edit(processing_message, f"⏳ {COMPONENT_LABELS.get(name, name)}: идет запуск, подождите...")
+        try:
+            await self.warmup.wait(name, timeout=self.warmup_timeout)
+            return True
+        except (ComponentUnavailableError, asyncio.TimeoutError):
+            error_message = f"❌ {COMPONENT_LABELS.get(name, name)} сейчас недоступна. Попробуйте позже."
+            if processing_message:
+                await self.sender.edit(processing_message, error_message)
+            else:
+                await self.sender.reply(update.message, error_message)
+            return False
+
+    async def _enqueue(self, update: Update, name: str, status_text: str, job, priority: int = 0,
+                       status_note: str = ""):
+        """
+        Ставит обработку сообщения в очередь пользователя
+
+        Args:
+            update: обновление Telegram
+            name: имя задачи для логов и метрик
+            status_text: текст статуса, если задача начинается сразу
+            job: корутинная функция, принимающая сообщение статуса
+            priority: приоритет в планировщике (меньше - раньше)
+            status_note: строка, добавляемая к статусу в обоих случаях (например, ETA)
+        """
+        user_id = str(update.effective_user.id) if update.effective_user else str(update.effective_chat.id)
+        message_ready = asyncio.get_running_loop().create_future()
+        # Задача выполнится в задаче планировщика - трасса обновления продолжается в ней
+        continuation = tracing.Continuation()
+        queued = time.perf_counter()
+
+        async def run():
+            with continuation.resume(f"job.{name}"):
+                tracing.record('queue.wait', queued)
+                await job(await message_ready)
+
+        try:
+            position = self.scheduler.submit(user_id, run, name=name, priority=priority)
+        except QueueFullError as e:
+            continuation.cancel()
+            await self.sender.reply(
+                update.message,
+                f"⏳ Очередь заполнена: ваш запрос был бы {e.depth + 1}-м при лимите {self.scheduler.max_queue_per_user}.\n"
+                "Дождитесь ответа на предыдущие сообщения и повторите."
+            )
+            return
+
+        if position:
+            status_text = f"⏳ Запрос в очереди, позиция {position}"
+        status_text += status_note
+        try:
+            message_ready.set_result(await self.sender.reply(update.message, status_text))
+        except Exception as e:
+            message_ready.set_exception(e)
+
+    @staticmethod
+    def _audio_media(message) -> Tuple[Any, str]:
+        """Вложение с аудио и расширение файла для ffmpeg: голосовое, аудиофайл, видеосообщение или документ"""
+        if message.voice:
+            return message.voice, ".ogg"
+        if message.video_note:
+            return message.video_note, ".mp4"
+        media = message.audio or message.document
+        extension = os.path.splitext(getattr(media, 'file_name', None) or "")[1]
+        return media, extension or ".audio"
 
     async def handle_voice_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик голосовых сообщений"""
+        """Обработчик голосовых сообщений, аудиофайлов и видеосообщений"""
         # Проверка разрешенных пользователей
         if not self._is_user_allowed(update):
             await self._send_access_denied_message(update)
             return
-            
-        user_id = str(update.effective_user.id) if update.effective_user else None
-        username = update.effective_user.username if update.effective_user else None
+
+        # Допуск по метаданным Telegram - до скачивания и декодирования
+        media, _ = self._audio_media(update.message)
+        decision = self.voice_admission.admit(getattr(media, 'duration', None), media.file_size)
+        calendar_logger.info(
+            f"Voice admission: {decision.pipeline}, {decision.duration:.0f}s"
+            f"{' (estimated)' if decision.estimated else ''}, priority {decision.priority}, ETA {decision.eta:.1f}s"
+        )
+        if decision.rejected:
+            await self.sender.reply(update.message, f"❌ Запись не будет распознана: {decision.reason}.")
+            return
 
         # Показываем, что бот обрабатывает голосовое сообщение
-        processing_message = await update.message.reply_text("🎤 Обрабатываю голосовое сообщение...")
+        status_text = "🎤 Обрабатываю голосовое сообщение..." if update.message.voice else "🎧 Обрабатываю аудиозапись..."
+        status_note = ""
+        if decision.pipeline != PIPELINE_SHORT:
+            status_note = f"\n⏱ Распознавание займет около {max(1, round(decision.eta / 60))} мин"
+        await self._enqueue(
+            update, "voice", status_text,
+            lambda processing_message: self._process_voice_request(update, context, processing_message, decision),
+            priority=decision.priority, status_note=status_note
+        )
+
+    async def _process_voice_request(self, update: Update, context: ContextTypes.DEFAULT_TYPE, processing_message,
+                                     decision: AdmissionDecision):
+        """Распознавание голосового сообщения и обработка текста по выбранному при допуске конвейеру"""
+        user_id = str(update.effective_user.id) if update.effective_user else None
+        username = update.effective_user.username if update.effective_user else None
+        dedup_key = None
+        outcome = None
+        audio_path = None
 
         try:
             # Проверяем, загружена ли модель
+            if not await self._wait_component('asr', update, processing_message):
+                return
             if not self.voice_service.is_model_loaded():
-                await processing_message.edit_text("❌ Модель распознавания речи не загружена")
+                await self.sender.edit(processing_message, "❌ Модель распознавания речи не загружена")
+                return
+
+            # Получаем вложение с аудио
+            voice, extension = self._audio_media(update.message)
+
+            # Тот же файл (пересылка, повторная отправка) этим пользователем уже обработан -
+            # показываем его результат без скачивания, распознавания и LLM. Задачи пользователя
+            # идут по очереди, поэтому первая обработка к этому моменту завершена
+            dedup_key = f"voice:{user_id}:{voice.file_unique_id}"
+            cached_outcome = self.dedup.get(dedup_key)
+            if cached_outcome is not None:
+                calendar_logger.info(f"Voice {voice.file_unique_id} served from dedup cache")
+                _, result, event_id = cached_outcome
+                if result.get('action') in ('confirm', 'confirm_task') and event_id not in self.pending_events:
+                    # Превью уже подтверждено или отменено - второй раз не предлагаем
+                    await self.sender.edit(processing_message, "ℹ️ Это голосовое сообщение уже обработано.")
+                    return
+                await self._send_result(update, result, event_id, processing_message)
                 return
 
-            # Получаем голосовое сообщение
-            voice = update.message.voice
             voice_file = await context.bot.get_file(voice.file_id)
 
             # Обновляем статус
-            await processing_message.edit_text("🎤 Распознаю речь...")
+            await self.sender.edit(processing_message, "🎤 Распознаю речь...")
 
-            # Транскрибируем голосовое сообщение
-            transcription = await self.voice_service.transcribe_voice_message(voice_file)
+            # Короткая запись: скачивание в память и один проход. Длинная (и MP4 видеосообщений,
+            # который нельзя декодировать из pipe): файл на диске и потоковое декодирование окнами
+            with tracing.span('download', pipeline=decision.pipeline):
+                if decision.pipeline == PIPELINE_SHORT and extension in PIPE_FRIENDLY_EXTENSIONS:
+                    transcribe, source = self.voice_service.transcribe_audio_bytes, await voice_file.download_as_bytearray()
+                else:
+                    fd, audio_path = tempfile.mkstemp(prefix="voice_", suffix=extension)
+                    os.close(fd)
+                    await voice_file.download_to_drive(audio_path)
+                    transcribe, source = self.voice_service.transcribe_audio_file, audio_path
+            transcription = await self._run_stage(
+                'asr', self.voice_admission.measure, decision, transcribe, source,
+                timeout=max(self.asr_timeout, decision.eta * self.asr_timeout_factor), priority=decision.priority
+            )
 
             if not transcription:
-                await processing_message.edit_text("❌ Не удалось распознать речь. Попробуйте записать сообщение заново.")
+                await self.sender.edit(processing_message, "❌ Не удалось распознать речь. Попробуйте записать сообщение заново.")
                 return
+            self.warmup.mark_served('asr')
 
             # Логируем запрос пользователя
             calendar_logger.log_user_request(user_id, username, f"[VOICE] {transcription}")
 
             # Показываем распознанный текст пользователю
-            await processing_message.edit_text(f"🎤 Распознанный текст: *{transcription}*\n\nОбрабатываю запрос...", parse_mode='Markdown')
+            await self.sender.edit(processing_message, f"🎤 Распознанный текст: *{transcription}*\n\nОбрабатываю запрос...", parse_mode='Markdown')
 
             # Обрабатываем транскрибированный текст как обычное текстовое сообщение
-            await self._process_text_request(update, transcription, processing_message)
+            processed = await self._process_text_request(
+                update, transcription, processing_message, preview_header=f"🎤 {transcription}\n\n"
+            )
+            if processed is not None:
+                outcome = (transcription, *processed)
 
         except Exception as e:
-            calendar_logger.log_error(e, "telegram_bot.handle_voice_message")
+            calendar_logger.log_error(e, "telegram_bot._process_voice_request")
             error_message = f"❌ Произошла ошибка при обработке голосового сообщения: {str(e)}"
-            await processing_message.edit_text(error_message)
-
-    async def _process_text_request(self, update: Update, user_message: str, processing_message=None):
-        """Общий метод для обработки текстовых запросов"""
+            await self.sender.edit(processing_message, error_message)
+
+        finally:
+            if audio_path is not None:
+                try:
+                    os.remove(audio_path)
+                except OSError:
+                    pass
+            # Неудачная обработка не сохраняется - повтор выполнится заново
+            if dedup_key is not None and outcome is not None:
+                self.dedup.put(dedup_key, outcome)
+
+    async def _process_text_request(self, update: Update, user_message: str, processing_message=None,
+                                    preview_header: str = "") -> Optional[Tuple[Dict, str]]:
+        """
+        Общий метод для обработки текстовых запросов
+
+        Returns:
+            (результат ассистента, event_id) или None при ошибке - для кэша повторных доставок
+        """
         user_id = str(update.effective_user.id) if update.effective_user else None
 
-        try:
-            # Обрабатываем запрос через ассистент сервис
-            result = self.assistant_service.process_user_request(user_message)
+        if not await self._wait_component('llm', update, processing_message):
+            return None
+
+        preview = None
+        if processing_message and self.streaming_enabled:
+            preview = StreamingPreview(processing_message, header=preview_header, sender=self.sender)
 
+        try:
+            # Обрабатываем запрос через ассистент сервис, показывая черновик по мере генерации
+            try:
+                result = await self._run_stage(
+                    'llm', self.assistant_service.process_user_request, user_message,
+                    preview.push_threadsafe if preview else None, timeout=self.llm_timeout
+                )
+            finally:
+                if preview:
+                    await preview.close()
+
+            # Сохраняем событие или задачу для подтверждения
+            event_id = f"{user_id}_{update.message.message_id}"
             if result.get('success') and result.get('action') == 'confirm':
-                # Событие готово к подтверждению
-                event = result['event']
-                message = result['message']
-                
-                # Сохраняем событие для подтверждения
-                event_id = f"{user_id}_{update.message.message_id}"
-                self.pending_events[event_id] = {"type": "event", "payload": event}
-                
-                # Создаем клавиатуру с кнопками
+                self.pending_events.put(event_id, {"type": "event", "payload": result['event']})
+            elif result.get('success') and result.get('action') == 'confirm_task':
+                self.pending_events.put(event_id, {"type": "task", "payload": result['task']})
+            elif result.get('success') and result.get('action') == 'confirm_batch' and result['items']:
+                # Несколько запросов в одном сообщении - одно подтверждение, один пакетный вызов Google
+                self.pending_events.put(event_id, {"type": "batch", "payload": result['items']})
+
+            await self._send_result(update, result, event_id, processing_message)
+            self.warmup.mark_served('llm')
+            return result, event_id
+
+        except Exception as e:
+            calendar_logger.log_error(e, "telegram_bot._process_text_request")
+            error_message = f"❌ Произошла ошибка: {str(e)}"
+            if processing_message:
+                await self.sender.edit(processing_message, error_message)
+            else:
+                await self.sender.reply(update.message, error_message)
+            return None
+
+    async def _send_result(self, update: Update, result: Dict, event_id: str, processing_message=None):
+        """Показывает результат обработки: превью с кнопками подтверждения, заметку или ошибку"""
+        if result.get('success') and result.get('action') in ('confirm', 'confirm_task', 'confirm_batch'):
+            # Пока пользователь читает превью, запрос в Google собирается и соединение прогревается
+            self._prepare_confirmation(event_id)
+
+        if result.get('success') and result.get('action') == 'confirm':
+            # Событие готово к подтверждению
+            message = result['message']
+            
+            # Создаем клавиатуру с кнопками
+            keyboard = [
+                [
+                    InlineKeyboardButton("✅ Подтвердить", callback_data=f"confirm_{event_id}"),
+                    InlineKeyboardButton("❌ Отменить", callback_data=f"cancel_{event_id}")
+                ],
+                [
+                    InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_{event_id}")
+                ]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            
+            if processing_message:
+                await self.sender.edit(processing_message, message, reply_markup=reply_markup, parse_mode='Markdown')
+            else:
+                processing_message = await self.sender.reply(update.message, message, reply_markup=reply_markup, parse_mode='Markdown')
+            self._remember_preview(update.effective_chat.id, event_id, processing_message)
+            
+        elif result.get('success') and result.get('action') == 'confirm_batch':
+            # Несколько запросов: общее превью без правки, заметки уже в тексте
+            reply_markup = None
+            if result['items']:
+                reply_markup = InlineKeyboardMarkup([[
+                    InlineKeyboardButton(f"✅ Создать все ({len(result['items'])})", callback_data=f"confirm_{event_id}"),
+                    InlineKeyboardButton("❌ Отменить", callback_data=f"cancel_{event_id}")
+                ]])
+            if processing_message:
+                await self.sender.edit(processing_message, result['message'], reply_markup=reply_markup)
+            else:
+                await self.sender.reply(update.message, result['message'], reply_markup=reply_markup)
+
+        elif result.get('success') and result.get('action') == 'note':
+            # Заметка - отправляем её пользователю сразу
+            note_message = result['message']
+            
+            if processing_message:
+                await self.sender.edit(processing_message, note_message, parse_mode='Markdown')
+            else:
+                await self.sender.reply(update.message, note_message, parse_mode='Markdown')
+            
+        elif result.get('success'):
+            # Generic success (e.g., task confirm)
+            if result.get('action') == 'confirm_task':
+                # reuse keyboard
                 keyboard = [
                     [
                         InlineKeyboardButton("✅ Подтвердить", callback_data=f"confirm_{event_id}"),
@@ -223,68 +619,121 @@ class TelegramBot:
                     ]
                 ]
                 reply_markup = InlineKeyboardMarkup(keyboard)
-                
                 if processing_message:
-                    await processing_message.edit_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+                    await self.sender.edit(processing_message, result['message'], reply_markup=reply_markup, parse_mode='Markdown')
                 else:
-                    await update.message.reply_text(message, reply_markup=reply_markup, parse_mode='Markdown')
-                
-            elif result.get('success') and result.get('action') == 'note':
-                # Заметка - отправляем её пользователю сразу
-                note_message = result['message']
-                
-                if processing_message:
-                    await processing_message.edit_text(note_message, parse_mode='Markdown')
-                else:
-                    await update.message.reply_text(note_message, parse_mode='Markdown')
-                
-            elif result.get('success'):
-                # Generic success (e.g., task confirm)
-                # Если это подтверждение задачи — сохраним payload как задачу
-                if result.get('action') == 'confirm_task':
-                    task = result['task']
-                    event_id = f"{user_id}_{update.message.message_id}"
-                    self.pending_events[event_id] = {"type": "task", "payload": task}
-                    # reuse keyboard
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("✅ Подтвердить", callback_data=f"confirm_{event_id}"),
-                            InlineKeyboardButton("❌ Отменить", callback_data=f"cancel_{event_id}")
-                        ],
-                        [
-                            InlineKeyboardButton("✏️ Редактировать", callback_data=f"edit_{event_id}")
-                        ]
-                    ]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
-                    if processing_message:
-                        await processing_message.edit_text(result['message'], reply_markup=reply_markup, parse_mode='Markdown')
-                    else:
-                        await update.message.reply_text(result['message'], reply_markup=reply_markup, parse_mode='Markdown')
-                    return
+                    processing_message = await self.sender.reply(update.message, result['message'], reply_markup=reply_markup, parse_mode='Markdown')
+                self._remember_preview(update.effective_chat.id, event_id, processing_message)
+                return
 
-                response = f"✅ {result['message']}"
-                if result.get('event_link'):
-                    response += f"\n\n🔗 <a href=\"{result['event_link']}\">Ссылка на событие</a>"
-                
-                # Используем HTML parse_mode для корректной обработки ссылок
-                if processing_message:
-                    await processing_message.edit_text(response, parse_mode='HTML', disable_web_page_preview=True)
-                else:
-                    await update.message.reply_text(response, parse_mode='HTML', disable_web_page_preview=True)
+            response = f"✅ {result['message']}"
+            if result.get('event_link'):
+                response += f"\n\n🔗 <a href=\"{result['event_link']}\">Ссылка на событие</a>"
+            
+            # Используем HTML parse_mode для корректной обработки ссылок
+            if processing_message:
+                await self.sender.edit(processing_message, response, parse_mode='HTML', disable_web_page_preview=True)
             else:
-                response = f"❌ {result['message']}"
-                if processing_message:
-                    await processing_message.edit_text(response)
-                else:
-                    await update.message.reply_text(response)
-
-        except Exception as e:
-            calendar_logger.log_error(e, "telegram_bot._process_text_request")
-            error_message = f"❌ Произошла ошибка: {str(e)}"
+                await self.sender.reply(update.message, response, parse_mode='HTML', disable_web_page_preview=True)
+        else:
+            response = f"❌ {result['message']}"
             if processing_message:
-                await processing_message.edit_text(error_message)
+                await self.sender.edit(processing_message, response)
+            else:
+                await self.sender.reply(update.message, response)
+
+    def _prepare_confirmation(self, event_id: str):
+        """Запускает в фоне AssistantService.prepare_confirmation для ожидающего элемента"""
+        pending = self.pending_events.get(event_id)
+        if pending is None or not self.warmup.is_ready('google'):
+            return
+
+        async def prepare():
+            try:
+                await self.executor.run(
+                    self.assistant_service.prepare_confirmation, event_id, pending, timeout=self.google_timeout
+                )
+            except Exception as e:
+                calendar_logger.log_error(e, "telegram_bot._prepare_confirmation")
+
+        task = asyncio.create_task(prepare())
+        self._prepare_tasks.add(task)
+        task.add_done_callback(self._prepare_tasks.discard)
+
+    def _remember_preview(self, chat_id: int, event_id: str, preview_message):
+        """Запоминает превью, к которому будут применяться правки в этом чате"""
+        previous = self.active_previews.get(chat_id)
+        if previous and previous[0] != event_id:
+            self.edit_requests.discard(chat_id)
+        self.active_previews[chat_id] = (event_id, preview_message, time.monotonic())
+
+    def _forget_preview(self, chat_id: int, event_id: str):
+        """Снимает превью после подтверждения или отмены"""
+        if self.active_previews.get(chat_id, (None,))[0] == event_id:
+            del self.active_previews[chat_id]
+            self.edit_requests.discard(chat_id)
+
+    def _followup_target(self, update: Update, user_message: str) -> Optional[str]:
+        """
+        event_id ожидающего превью, если сообщение - правка к нему
+
+        Правка - ответ (reply) на превью, сообщение после "Редактировать" или реплика с явным глаголом
+        правки ("перенеси на 18:00"), пока превью не устарело (PREVIEW_EDIT_TTL_SECONDS).
+        """
+        chat_id = update.effective_chat.id
+        active = self.active_previews.get(chat_id)
+        if not active:
+            return None
+        event_id, preview_message, shown_at = active
+        reply_to = update.message.reply_to_message if update.message else None
+        is_reply = (reply_to is not None and preview_message is not None
+                    and reply_to.message_id == preview_message.message_id)
+        if not is_reply and chat_id not in self.edit_requests:
+            if time.monotonic() - shown_at > self.preview_edit_ttl:
+                self._forget_preview(chat_id, event_id)
+                return None
+            if not looks_like_edit(user_message):
+                return None
+        if event_id not in self.pending_events:
+            self._forget_preview(chat_id, event_id)
+            return None
+        return event_id
+
+    async def _process_followup_edit(self, update: Update, event_id: str, correction: str, processing_message):
+        """Применяет правку к ожидающему событию/задаче и показывает обновленное превью"""
+        chat_id = update.effective_chat.id
+        try:
+            pending = self.pending_events.get(event_id)
+            if pending is None:
+                # Превью уже подтвердили или отменили - обрабатываем как новый запрос
+                self._forget_preview(chat_id, event_id)
+                await self._process_text_request(update, correction, processing_message)
+                return
+            if not await self._wait_component('llm', update, processing_message):
+                return
+
+            result = await self._run_stage(
+                'llm', self.assistant_service.edit_pending_item, pending, correction, timeout=self.llm_timeout
+            )
+            if not result.get('success'):
+                await self.sender.edit(processing_message, f"❌ {result['message']}")
+                return
+
+            if result['action'] == 'confirm':
+                self.pending_events.put(event_id, {"type": "event", "payload": result['event']})
             else:
-                await update.message.reply_text(error_message)
+                self.pending_events.put(event_id, {"type": "task", "payload": result['task']})
+            self.edit_requests.discard(chat_id)
+
+            # Кнопки старого превью больше не актуальны - актуальная версия ниже
+            previous = self.active_previews.get(chat_id)
+            if previous and previous[1] is not None:
+                await self.sender.edit(previous[1], "✏️ Изменено — актуальная версия ниже.")
+            await self._send_result(update, result, event_id, processing_message)
+
+        except Exception as e:
+            calendar_logger.log_error(e, "telegram_bot._process_followup_edit")
+            await self.sender.edit(processing_message, f"❌ Произошла ошибка при изменении: {str(e)}")
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик текстовых сообщений"""
@@ -300,11 +749,79 @@ class TelegramBot:
         # Логируем запрос пользователя
         calendar_logger.log_user_request(user_id, username, user_message)
 
-        # Показываем, что бот обрабатывает запрос
-        processing_message = await update.message.reply_text("Обрабатываю ваш запрос...")
+        # Правка к последнему превью: меняем только изменившиеся поля, без повторной классификации
+        followup_id = self._followup_target(update, user_message)
+        if followup_id:
+            await self._enqueue(
+                update, "edit", "✏️ Вношу изменения...",
+                lambda processing_message: self._process_followup_edit(update, followup_id, user_message, processing_message)
+            )
+            return
 
-        # Используем общий метод для обработки
-        await self._process_text_request(update, user_message, processing_message)
+        # Показываем, что бот обрабатывает запрос, и ставим его в очередь пользователя
+        await self._enqueue(
+            update, "text", "Обрабатываю ваш запрос...",
+            lambda processing_message: self._process_text_request(update, user_message, processing_message)
+        )
+
+    async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик документов TXT/CSV - массовый импорт, один запрос на строку"""
+        if not self._is_user_allowed(update):
+            await self._send_access_denied_message(update)
+            return
+
+        await self._enqueue(
+            update, "import", "📦 Читаю файл...",
+            lambda processing_message: self._process_bulk_import(update, context, processing_message)
+        )
+
+    async def _process_bulk_import(self, update: Update, context: ContextTypes.DEFAULT_TYPE, processing_message):
+        """Разбор документа, пакетная обработка строк и общее превью"""
+        user_id = str(update.effective_user.id) if update.effective_user else None
+        username = update.effective_user.username if update.effective_user else None
+        document = update.message.document
+
+        try:
+            max_bytes = int(os.getenv('BULK_IMPORT_MAX_BYTES', str(1024 * 1024)))
+            if document.file_size and document.file_size > max_bytes:
+                await self.sender.edit(processing_message, f"❌ Файл слишком большой (максимум {max_bytes // 1024} КБ)")
+                return
+            if not await self._wait_component('llm', update, processing_message):
+                return
+
+            document_file = await context.bot.get_file(document.file_id)
+            with tracing.span('download'):
+                data = await document_file.download_as_bytearray()
+            lines = parse_import_document(bytes(data), document.file_name)
+            if not lines:
+                await self.sender.edit(processing_message, "❌ В файле нет строк с запросами")
+                return
+
+            calendar_logger.log_user_request(user_id, username, f"[IMPORT] {document.file_name}: {len(lines)} lines")
+            await self.sender.edit(processing_message, f"📦 Обрабатываю {len(lines)} строк...")
+
+            report = await self._run_stage(
+                'llm', run_bulk_import, self.assistant_service, lines, timeout=self.bulk_import_timeout
+            )
+            self.warmup.mark_served('llm')
+
+            reply_markup = None
+            if report.items:
+                event_id = f"{user_id}_{update.message.message_id}"
+                self.pending_events.put(event_id, {
+                    "type": "batch",
+                    "payload": [{"type": item["type"], "payload": item["payload"]} for item in report.items]
+                })
+                reply_markup = InlineKeyboardMarkup([[
+                    InlineKeyboardButton(f"✅ Создать все ({len(report.items)})", callback_data=f"confirm_{event_id}"),
+                    InlineKeyboardButton("❌ Отменить", callback_data=f"cancel_{event_id}")
+                ]])
+
+            await self.sender.edit(processing_message, format_bulk_preview(report), reply_markup=reply_markup)
+
+        except Exception as e:
+            calendar_logger.log_error(e, "telegram_bot._process_bulk_import")
+            await self.sender.edit(processing_message, f"❌ Произошла ошибка при импорте: {str(e)}")
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик нажатий на inline кнопки"""
@@ -325,23 +842,47 @@ class TelegramBot:
 
     async def _confirm_event(self, query, event_id: str):
         """Подтверждение создания события"""
-        if event_id not in self.pending_events:
-            await query.edit_message_text("❌ Событие не найдено или уже обработано.")
+        clicked = time.perf_counter()
+        # Забираем элемент сразу, чтобы повторное нажатие не создало дубликат
+        pending = self.pending_events.pop(event_id)
+        if pending is None:
+            await self.sender.edit(query.message, "❌ Событие не найдено или уже обработано.")
             return
-        pending = self.pending_events[event_id]
+        self._forget_preview(query.message.chat.id, event_id)
 
+        if not await self._wait_component('google', None, query.message):
+            self.pending_events.put(event_id, pending)
+            return
+
+        # Вызов Google начат: при ошибке дальше результат неизвестен, элемент не возвращаем
+        submitted = False
         try:
+            submitted = pending.get('type') in ('event', 'batch', 'task')
             if pending.get('type') == 'event':
                 event = pending.get('payload')
-                result = self.assistant_service.create_confirmed_event(event)
+                result = await self._run_stage(
+                    'google', self.assistant_service.create_confirmed_event, event, event_id, timeout=self.google_timeout
+                )
+            elif pending.get('type') == 'batch':
+                result = await self._run_stage(
+                    'google', self.assistant_service.create_confirmed_batch, pending.get('payload'),
+                    timeout=self.bulk_import_timeout
+                )
             elif pending.get('type') == 'task':
                 task = pending.get('payload')
-                result = self.assistant_service.create_confirmed_task(task)
+                result = await self._run_stage(
+                    'google', self.assistant_service.create_confirmed_task, task, event_id, timeout=self.google_timeout
+                )
             else:
-                await query.edit_message_text("❌ Неподдерживаемый тип для подтверждения.")
+                await self.sender.edit(query.message, "❌ Неподдерживаемый тип для подтверждения.")
                 return
 
+            latency = time.perf_counter() - clicked
+            kind = 'prepared' if result.get('prepared') else 'cold'
+            self.confirm_latencies[kind].append(latency)
+            calendar_logger.info(f"Confirm latency: {latency * 1000:.0f} ms ({pending.get('type')}, {kind})")
             if result.get('success'):
+                self.warmup.mark_served('google')
                 response = f"✅ {result['message']}"
                 if result.get('event_link'):
                     response += f"\n\n🔗 <a href=\"{result['event_link']}\">Ссылка на событие</a>"
@@ -350,55 +891,57 @@ class TelegramBot:
 
             # Используем HTML parse_mode для корректной обработки ссылок, но если в ответе есть неподдерживаемые теги — отправляем plain text
             try:
-                await query.edit_message_text(response, parse_mode='HTML', disable_web_page_preview=True)
+                await self.sender.edit(query.message, response, parse_mode='HTML', disable_web_page_preview=True)
             except Exception:
-                await query.edit_message_text(response)
-
-            # Удаляем элемент из ожидающих
-            del self.pending_events[event_id]
-
+                await self.sender.edit(query.message, response)
+
+        except CallTimeoutError as e:
+            # Вставка может завершиться в брошенном потоке - повторное подтверждение создало бы дубликат
+            calendar_logger.log_error(e, "telegram_bot._confirm_event - timeout")
+            await self.sender.edit(
+                query.message,
+                "⚠️ Google Calendar не ответил вовремя - неизвестно, создано ли событие. "
+                "Проверьте календарь и при необходимости отправьте запрос заново."
+            )
         except Exception as e:
             calendar_logger.log_error(e, "telegram_bot._confirm_event")
-            await query.edit_message_text(f"❌ Произошла ошибка при создании: {str(e)}")
+            if not submitted:
+                # Запрос не отправлялся - пользователь может повторить подтверждение
+                self.pending_events.put(event_id, pending)
+            await self.sender.edit(query.message, f"❌ Произошла ошибка при создании: {str(e)}")
 
     async def _cancel_event(self, query, event_id: str):
         """Отмена создания события"""
-        if event_id in self.pending_events:
-            del self.pending_events[event_id]
+        self.pending_events.pop(event_id)
+        self.assistant_service.discard_prepared(event_id)
+        self._forget_preview(query.message.chat.id, event_id)
         
-        await query.edit_message_text("❌ Создание события отменено.")
+        await self.sender.edit(query.message, "❌ Создание события отменено.")
 
     async def _edit_event(self, query, event_id: str):
-        """Редактирование события"""
-        if event_id not in self.pending_events:
-            await query.edit_message_text("❌ Событие не найдено или уже обработано.")
+        """Редактирование события: следующее сообщение в чате применяется как правка"""
+        pending = self.pending_events.get(event_id)
+        if pending is None or pending.get('type') not in ('event', 'task'):
+            await self.sender.edit(query.message, "❌ Событие не найдено или уже обработано.")
             return
 
-        event = self.pending_events[event_id]
-        
         # Формируем сообщение с данными для редактирования
-        edit_message = f"""✏️ **Редактирование события**
-
-Скопируйте, исправьте и отправьте данные в следующем формате:
-
-```
-Название: {event.title}
-Время: {event.start_time.strftime("%d.%m.%Y %H:%M")}"""
-
-        if event.duration_minutes:
-            edit_message += f"\nДлительность: {event.duration_minutes} минут"
-        elif event.end_time:
-            edit_message += f"\nОкончание: {event.end_time.strftime("%H:%M")}"
-
-        if event.description:
-            edit_message += f"\nОписание: {event.description}"
+        edit_message = (
+            "✏️ **Редактирование**\n\n"
+            "Напишите, что изменить: «перенеси на 18:00», «сделай на полчаса», «назови Планерка».\n"
+            "Или скопируйте, исправьте и отправьте данные:\n\n"
+            f"```\n{format_edit_template(pending['payload'])}\n```"
+        )
 
-        edit_message += "\n```\n\nИли напишите новый запрос заново."
+        reply_markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Подтвердить", callback_data=f"confirm_{event_id}"),
+            InlineKeyboardButton("❌ Отменить", callback_data=f"cancel_{event_id}")
+        ]])
+        await self.sender.edit(query.message, edit_message, reply_markup=reply_markup, parse_mode='Markdown')
 
-        await query.edit_message_text(edit_message, parse_mode='Markdown')
-        
-        # Удаляем текущее событие из ожидающих
-        del self.pending_events[event_id]
+        # Событие остается ожидающим, следующее сообщение в чате - правка к нему
+        self._remember_preview(query.message.chat.id, event_id, query.message)
+        self.edit_requests.add(query.message.chat.id)
 
     def run(self):
         """Запуск бота"""
@@ -411,11 +954,70 @@ class TelegramBot:
             users_count = len(self.allowed_users)
             print(f"🔒 Доступ ограничен для {users_count} пользователь(ей)")
         
-        # Проверяем статус модели распознавания речи
-        if self.voice_service.is_model_loaded():
-            print("✅ Модель распознавания речи загружена успешно")
-        else:
-            print("⚠️  Модель распознавания речи не загружена. Голосовые сообщения не будут обрабатываться.")
+        # Модели загружаются в фоне - готовность и время первого ответа видны в логах и /queue
+        print("⏳ В фоне запускаются: LLM, Google Calendar, распознавание речи")
         
-        self.application.run_polling()
+        webhook_url = os.getenv('TELEGRAM_WEBHOOK_URL', '').strip()
+        if webhook_url:
+            asyncio.run(self._run_webhook(webhook_url))
+        else:
+            self.application.run_polling()
+
+    async def _drain_jobs(self, application: Application):
+        """Дожидается обработки уже принятых запросов перед остановкой"""
+        await self.scheduler.drain(float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '30')))
+        self.voice_service.close()
+        self.pending_events.close()
+
+    async def _run_webhook(self, webhook_url: str):
+        """Запуск в режиме webhook со встроенным HTTP-сервером"""
+        secret_token = os.getenv('TELEGRAM_WEBHOOK_SECRET') or None
+        path = os.getenv('TELEGRAM_WEBHOOK_PATH', '/telegram')
+        host = os.getenv('TELEGRAM_WEBHOOK_HOST', '0.0.0.0')
+        port = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8080'))
+        drain_timeout = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '30'))
+
+        # HTTPS напрямую, если указан сертификат; иначе HTTP за обратным прокси
+        ssl_context = None
+        cert_path = os.getenv('TELEGRAM_WEBHOOK_CERT')
+        if cert_path:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_context.load_cert_chain(cert_path, os.getenv('TELEGRAM_WEBHOOK_KEY') or None)
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                pass  # Windows
+
+        async with self.application:
+            await self.application.start()
+            server = WebhookServer(
+                self.application, path=path, secret_token=secret_token,
+                host=host, port=port, ssl_context=ssl_context
+            )
+            await server.start()
+
+            certificate = open(cert_path, 'rb') if cert_path and os.getenv('TELEGRAM_WEBHOOK_SELF_SIGNED') else None
+            try:
+                await self.application.bot.set_webhook(
+                    url=webhook_url, secret_token=secret_token,
+                    allowed_updates=Update.ALL_TYPES, certificate=certificate
+                )
+            finally:
+                if certificate:
+                    certificate.close()
+            print(f"🌐 Webhook установлен: {webhook_url}")
+
+            try:
+                await stop_event.wait()
+            finally:
+                print("Остановка: дожидаемся обработки принятых обновлений...")
+                await server.stop(drain_timeout)
+                await self.scheduler.drain(drain_timeout)
+                await self.application.stop()
+                self.voice_service.close()
+                self.pending_events.close()
 
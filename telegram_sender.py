@@ -0,0 +1,222 @@
+"""
+Слой отправки сообщений Telegram: ограничение частоты и схлопывание редактирований
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from telegram import Bot, Message
+from telegram.error import BadRequest, RetryAfter
+
+import tracing
+from logger import calendar_logger
+
+
+# Сколько состояний чатов держать, прежде чем удалять простаивающие
+MAX_IDLE_CHATS = 1024
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Ждет и забирает один токен"""
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class _Operation:
+    kind: str  # "send" | "edit"
+    chat_id: int
+    message_id: Optional[int]
+    text: str
+    kwargs: Dict[str, Any]
+    futures: List[asyncio.Future] = field(default_factory=list)
+
+
+class _ChatState:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.queue: Deque[_Operation] = deque()
+        # Еще не отправленные редактирования по message_id - для схлопывания
+        self.pending_edits: Dict[int, _Operation] = {}
+        self.worker: Optional[asyncio.Task] = None
+
+
+class TelegramSender:
+    """Очередь исходящих сообщений между обработчиками и context.bot
+
+    - глобальное ведро токенов ограничивает общий поток запросов к Bot API;
+    - у каждого чата свое ведро и своя очередь, порядок операций в чате сохраняется;
+    - несколько редактирований одного сообщения, ожидающих отправки, схлопываются в одно
+      с последним текстом - все ожидающие получают результат финального редактирования;
+    - при 429 (RetryAfter) пауза выдерживается только в очереди этого чата.
+    """
+
+    def __init__(self, bot: Bot, global_rate: Optional[float] = None, chat_rate: Optional[float] = None,
+                 group_rate: Optional[float] = None):
+        """
+        Args:
+            bot: бот python-telegram-bot
+            global_rate: запросов в секунду на весь бот (TELEGRAM_GLOBAL_RATE, по умолчанию 25)
+            chat_rate: запросов в секунду в личный чат (TELEGRAM_CHAT_RATE, по умолчанию 1)
+            group_rate: запросов в секунду в группу (TELEGRAM_GROUP_RATE, по умолчанию 20 в минуту)
+        """
+        self.bot = bot
+        global_rate = global_rate or float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))
+        self.chat_rate = chat_rate or float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+        self.group_rate = group_rate or float(os.getenv('TELEGRAM_GROUP_RATE', str(20 / 60)))
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[int, _ChatState] = {}
+        self.coalesced = 0
+        self.retries = 0
+
+    def _chat(self, chat_id: int) -> _ChatState:
+        state = self._chats.get(chat_id)
+        if state is None:
+            if len(self._chats) >= MAX_IDLE_CHATS:
+                self._prune()
+            # Отрицательный chat_id - группа или канал, у них лимиты строже
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            state = _ChatState(TokenBucket(rate, 3))
+            self._chats[chat_id] = state
+        return state
+
+    def _prune(self):
+        """Удаляет чаты без очереди, чье ведро уже полностью восстановилось"""
+        for chat_id, state in list(self._chats.items()):
+            if not state.queue and state.bucket.full:
+                del self._chats[chat_id]
+
+    def _enqueue(self, operation: _Operation) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        state = self._chat(operation.chat_id)
+
+        if operation.kind == 'edit':
+            pending = state.pending_edits.get(operation.message_id)
+            if pending is not None:
+                # Предыдущий текст еще не отправлен - заменяем его последним
+                pending.text = operation.text
+                pending.kwargs = operation.kwargs
+                pending.futures.append(future)
+                self.coalesced += 1
+                return future
+            state.pending_edits[operation.message_id] = operation
+
+        operation.futures.append(future)
+        state.queue.append(operation)
+        if state.worker is None or state.worker.done():
+            state.worker = asyncio.create_task(self._drain(operation.chat_id, state))
+        return future
+
+    async def _drain(self, chat_id: int, state: _ChatState):
+        """Последовательно выполняет операции одного чата"""
+        # Состояние чата (с его ведром) остается после опустошения очереди,
+        # иначе лимит чата сбрасывался бы после каждой паузы
+        try:
+            while state.queue:
+                operation = state.queue[0]
+                await state.bucket.acquire()
+                await self._global.acquire()
+
+                # С этого момента новые редактирования не присоединяются к операции
+                if operation.kind == 'edit':
+                    state.pending_edits.pop(operation.message_id, None)
+                try:
+                    result = await self._execute(operation)
+                except RetryAfter as e:
+                    self.retries += 1
+                    retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                    calendar_logger.warning(f"TelegramSender: flood wait {retry_after}s in chat {chat_id}")
+                    if operation.kind == 'edit':
+                        newer = state.pending_edits.get(operation.message_id)
+                        if newer is not None:
+                            # Пока ждали, пришел более новый текст - повторять старый незачем
+                            state.queue.popleft()
+                            newer.futures.extend(operation.futures)
+                            self.coalesced += 1
+                        else:
+                            state.pending_edits[operation.message_id] = operation
+                    await asyncio.sleep(float(retry_after))
+                    continue
+                except Exception as e:
+                    state.queue.popleft()
+                    for future in operation.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                state.queue.popleft()
+                for future in operation.futures:
+                    if not future.done():
+                        future.set_result(result)
+        except asyncio.CancelledError:
+            for operation in state.queue:
+                for future in operation.futures:
+                    future.cancel()
+            raise
+
+    async def _execute(self, operation: _Operation):
+        if operation.kind == 'send':
+            return await self.bot.send_message(chat_id=operation.chat_id, text=operation.text, **operation.kwargs)
+
+        try:
+            return await self.bot.edit_message_text(
+                text=operation.text, chat_id=operation.chat_id, message_id=operation.message_id, **operation.kwargs
+            )
+        except BadRequest as e:
+            # Текст не изменился - для вызывающего это успешное редактирование
+            if 'not modified' in str(e).lower():
+                return None
+            raise
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> Message:
+        """Отправляет сообщение в чат через очередь"""
+        return await self._enqueue(_Operation('send', chat_id, None, text, kwargs))
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str, **kwargs) -> Optional[Message]:
+        """Редактирует сообщение через очередь, схлопывая неотправленные редактирования"""
+        return await self._enqueue(_Operation('edit', chat_id, message_id, text, kwargs))
+
+    async def reply(self, message: Message, text: str, **kwargs) -> Message:
+        """Отправляет ответ в чат сообщения"""
+        with tracing.span('telegram.reply'):
+            return await self.send_message(message.chat.id, text, **kwargs)
+
+    async def edit(self, message: Message, text: str, **kwargs) -> Optional[Message]:
+        """Редактирует текст сообщения"""
+        with tracing.span('telegram.edit'):
+            return await self.edit_message_text(message.chat.id, message.message_id, text, **kwargs)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Счетчики схлопнутых редактирований, повторов после 429 и длина очередей"""
+        return {
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'queued': sum(len(state.queue) for state in self._chats.values()),
+        }
@@ -0,0 +1,416 @@
+"""
+Разбор русских выражений даты, времени и длительности без модели
+
+"завтра в 17", "в понедельник в 10:00", "с 13 до 14", "через два часа", "на полтора часа",
+"каждый вторник в 19:00". Простые события ("Обед сегодня в 13:00-14:00") собираются целиком
+без LLM; для остальных найденное время передается обработчику событий готовыми значениями,
+и модели остается придумать название и описание.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from models import CalendarEvent
+from utils import get_default_end_time, parse_duration, parse_recurrence_rule
+
+
+UNITS = {
+    'ноль': 0, 'один': 1, 'одна': 1, 'одну': 1, 'одного': 1, 'два': 2, 'две': 2, 'двух': 2,
+    'три': 3, 'трех': 3, 'четыре': 4, 'четырех': 4, 'пять': 5, 'пяти': 5, 'шесть': 6, 'шести': 6,
+    'семь': 7, 'семи': 7, 'восемь': 8, 'восьми': 8, 'девять': 9, 'девяти': 9,
+    'десять': 10, 'десяти': 10, 'одиннадцать': 11, 'одиннадцати': 11, 'двенадцать': 12, 'двенадцати': 12,
+    'тринадцать': 13, 'четырнадцать': 14, 'пятнадцать': 15, 'пятнадцати': 15, 'шестнадцать': 16,
+    'семнадцать': 17, 'восемнадцать': 18, 'девятнадцать': 19,
+}
+TENS = {'двадцать': 20, 'двадцати': 20, 'тридцать': 30, 'тридцати': 30, 'сорок': 40, 'сорока': 40,
+        'пятьдесят': 50, 'пятидесяти': 50}
+
+WEEKDAYS = {
+    'понедельник': 0, 'вторник': 1, 'сред': 2, 'четверг': 3, 'пятниц': 4, 'суббот': 5, 'воскресень': 6,
+}
+RRULE_DAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+MONTHS = {
+    'январ': 1, 'феврал': 2, 'март': 3, 'апрел': 4, 'ма': 5, 'июн': 6, 'июл': 7, 'август': 8,
+    'сентябр': 9, 'октябр': 10, 'ноябр': 11, 'декабр': 12,
+}
+DAY_OFFSETS = {'сегодня': 0, 'завтра': 1, 'послезавтра': 2}
+
+_WEEKDAY = r'(понедельник|вторник|сред[уа]|четверг|пятниц[уа]|суббот[уа]|воскресенье)'
+_MONTH = r'(январ[ья]|феврал[ья]|марта?|апрел[ья]|ма[йя]|июн[ья]|июл[ья]|августа?|сентябр[ья]|октябр[ья]|ноябр[ья]|декабр[ья])'
+_PERIOD = r'(?:\s+(утра|дня|вечера|ночи))?'
+_CLOCK = r'(\d{1,2})(?:[:.](\d{2}))?'
+
+NUMBER_WORD_RE = re.compile(
+    r'\b(?:(' + '|'.join(TENS) + r')(?:\s+(' + '|'.join(k for k, v in UNITS.items() if 0 < v < 10) + r'))?|('
+    + '|'.join(sorted(UNITS, key=len, reverse=True)) + r'))\b'
+)
+RECURRENCE_RE = re.compile(
+    rf'\b(?:(?:кажд(?:ый|ую|ое)|по)\s+(?:{_WEEKDAY[1:-1]}|понедельникам|вторникам|средам|четвергам|пятницам|субботам|'
+    r'воскресеньям)|кажд(?:ый|ую|ое)\s+(?:будний\s+день|рабочий\s+день|день|неделю|месяц|год)|по\s+будн(?:ям|им\s+дням)|'
+    r'в\s+рабочие\s+дни|ежедневно|еженедельно|ежемесячно|ежегодно)\b'
+)
+IN_DELTA_RE = re.compile(r'\bчерез\s+(?:(\d+)\s*)?(полчаса|полтора\s+часа|минут[уы]?|мин|час(?:а|ов)?|дн(?:я|ей)|день|'
+                         r'недел[юи]|неделю)\b')
+DAY_WORD_RE = re.compile(r'\b(?:на\s+)?(сегодня|послезавтра|завтра)\b')
+WEEKDAY_RE = re.compile(rf'\b(?:(?:в|во|на)\s+)?(?:(?:эт[уот]+|следующ[а-я]+|ближайш[а-я]+)\s+)?{_WEEKDAY}\b')
+# "1.5 часа", "на 2.5", "в течение 1.5" - длительность, а не дата
+DATE_NUMERIC_RE = re.compile(r'(?<!на\s)(?<!течение\s)\b(\d{1,2})\.(\d{1,2})(?:\.(\d{2,4}))?\b'
+                             r'(?!\s*(?:утра|дня|вечера|ночи|час|ч\b|мин))')
+DATE_MONTH_RE = re.compile(rf'\b(\d{{1,2}})(?:-?го)?\s+{_MONTH}\b')
+DATE_DAY_RE = re.compile(r'\b(\d{1,2})(?:-?го)?\s+числа\b')
+RANGE_RE = re.compile(rf'(?:\bс\s+{_CLOCK}{_PERIOD}\s+до\s+{_CLOCK}{_PERIOD}\b|\b(\d{{1,2}})[:.](\d{{2}})\s*[-–—]\s*(\d{{1,2}})[:.](\d{{2}})\b)')
+CLOCK_RE = re.compile(rf'(?:\b(?:в|во|к|на)\s+)?\b(\d{{1,2}}):(\d{{2}})\b{_PERIOD}')
+# "в 10.30", "в двадцать один тридцать" - только после предлога, иначе это дата "15.03"
+CLOCK_DOT_RE = re.compile(rf'\b(?:в|во|к)\s+(\d{{1,2}})(?:\.|\s+)(\d{{2}})\b(?!\s*мин){_PERIOD}')
+HOUR_RE = re.compile(rf'\b(?:в|к)\s+(\d{{1,2}})(?:\s*(?:час(?:а|ов)?|ч)\b)?{_PERIOD}\b')
+NOON_RE = re.compile(r'\b(?:в\s+)?(полдень|полночь)\b')
+DURATION_RE = re.compile(r'\b(?:на|в\s+течение|длительностью|продолжительностью)\s+'
+                         r'(?:(\d+(?:[.,]\d+)?)\s*(минут[уы]?|мин|час(?:а|ов)?|ч)\b|(полчаса|полтора\s+часа|час)\b)')
+LEAD_VERB_RE = re.compile(r'^(?:поставь|запланируй|добавь|создай|запиши|внеси|назначь)(?:\s+(?:мне|меня))?\s+')
+# Несводимые к значениям слова о времени: такие запросы целиком отдаются модели
+UNRESOLVED_RE = re.compile(r'\b(?:утр[оа]м?|вечер(?:ом)?|ночью|дн[е]м|обед[а]?\s+времени|выходн[а-я]*|недел[а-я]*|'
+                           r'месяц[а-я]*|числ[а-я]*|час[а-я]*|минут[а-я]*|через|после|до|к|около|примерно|или|'
+                           r'пока|нибудь|когда|\d+)\b')
+# Первое слово после "поставь ..." - в именительный падеж для названия
+ACCUSATIVE_NOUNS = {'встречу': 'встреча', 'тренировку': 'тренировка', 'планерку': 'планерка', 'лекцию': 'лекция',
+                    'консультацию': 'консультация', 'конференцию': 'конференция', 'презентацию': 'презентация'}
+EDGE_WORDS = {'в', 'во', 'на', 'с', 'к', 'и', 'а', 'по', 'для', 'от'}
+# Предлог в начале остатка относится к названию ("завтра в 17 с Петей"), а не к разобранному времени
+LEADING_PREPOSITIONS = EDGE_WORDS - {'и', 'а'}
+AMBIGUOUS_HOURS = range(1, 8)  # "в 5" без "утра/вечера" - модель решит по смыслу
+MAX_TITLE_WORDS = 6
+
+
+def words_to_numbers(text: str) -> str:
+    """Числительные словами в цифры: "в пять вечера" -> "в 5 вечера", "двадцать три" -> "23" """
+    def replace(match):
+        if match.group(3):
+            return str(UNITS[match.group(3)])
+        return str(TENS[match.group(1)] + (UNITS[match.group(2)] if match.group(2) else 0))
+    return NUMBER_WORD_RE.sub(replace, text)
+
+
+def _apply_period(hour: int, period: Optional[str]) -> int:
+    if period in ('дня', 'вечера') and hour < 12:
+        return hour + 12
+    if period in ('утра', 'ночи') and hour == 12:
+        return 0
+    return hour
+
+
+def _weekday_index(word: str) -> int:
+    return next(index for stem, index in WEEKDAYS.items() if word.startswith(stem))
+
+
+def _month_index(word: str) -> int:
+    return next(index for stem, index in MONTHS.items() if word.startswith(stem))
+
+
+@dataclass
+class TemporalSlots:
+    """Найденные в запросе дата, время, длительность и повторение"""
+    day: Optional[date] = None
+    start_clock: Optional[time] = None
+    end_clock: Optional[time] = None
+    duration_minutes: Optional[int] = None
+    recurrence: Optional[str] = None  # RRULE
+    explicit_day: bool = False  # дата названа ("завтра", "в пятницу", "3 марта"), а не подставлена
+    ambiguous: bool = False  # час без "утра/вечера" из AMBIGUOUS_HOURS - время не фиксируется
+    title: str = ''  # текст без выражений времени
+    fragment: bool = False  # название начинается с предлога - существительное события не названо
+    spans: List[str] = field(default_factory=list)
+
+    @property
+    def start(self) -> Optional[datetime]:
+        if self.day is None or self.start_clock is None or self.ambiguous:
+            return None
+        return datetime.combine(self.day, self.start_clock)
+
+    @property
+    def end(self) -> Optional[datetime]:
+        start = self.start
+        if start is None or self.end_clock is None:
+            return None
+        end = datetime.combine(self.day, self.end_clock)
+        # "с 23 до 1" - окончание на следующий день
+        return end if end > start else end + timedelta(days=1)
+
+    @property
+    def resolved(self) -> bool:
+        """Время начала определено - его можно передать модели готовым"""
+        return self.start is not None
+
+    @property
+    def complete(self) -> bool:
+        """Время определено, и в остатке нет неразобранных чисел и слов о времени - значения надежны"""
+        return self.resolved and not UNRESOLVED_RE.search(self.title.lower())
+
+    @property
+    def is_simple(self) -> bool:
+        """Событие собирается без модели: время определено, остаток - короткое название без других указаний времени"""
+        words = self.title.split()
+        return self.complete and not self.fragment and 0 < len(words) <= MAX_TITLE_WORDS
+
+    def to_event(self) -> CalendarEvent:
+        """Событие по правилам промпта CalendarEventHandler: окончание или длительность, иначе 60 минут"""
+        end = self.end
+        return CalendarEvent(
+            title=self.title,
+            start_time=self.start,
+            end_time=end,
+            duration_minutes=None if end else (self.duration_minutes or 60),
+            recurrence=self.recurrence,
+        )
+
+    def end_or_default(self) -> Optional[datetime]:
+        """Время окончания с учетом длительности (час по умолчанию)"""
+        if self.start is None:
+            return None
+        return self.end or get_default_end_time(self.start, self.duration_minutes)
+
+    def prompt_lines(self) -> str:
+        """Уже вычисленные значения для сообщения модели"""
+        lines = []
+        if self.start is not None:
+            lines.append(f"- start_time: {self.start.isoformat()}")
+        elif self.day is not None and self.explicit_day:
+            lines.append(f"- date: {self.day.isoformat()}")
+        if self.end is not None:
+            lines.append(f"- end_time: {self.end.isoformat()}")
+        elif self.duration_minutes:
+            lines.append(f"- duration_minutes: {self.duration_minutes}")
+        if self.recurrence:
+            lines.append(f"- recurrence: {self.recurrence}")
+        if not lines:
+            return ""
+        if not self.complete:
+            # В тексте остались неразобранные указания времени - значения только подсказка
+            return "## Time candidates (parsed by rules, verify against the message)\n" + "\n".join(lines)
+        return "## Resolved time (already computed, copy these values as is)\n" + "\n".join(lines)
+
+
+def _next_weekday(now: datetime, weekday: int, clock: Optional[time]) -> date:
+    days = (weekday - now.weekday()) % 7
+    if days == 0 and clock is not None and clock <= now.time():
+        days = 7
+    return (now + timedelta(days=days)).date()
+
+
+def _restore_case(remainder: str, original: str) -> str:
+    """Возвращает словам остатка написание из исходного текста"""
+    originals = {}
+    for token in re.findall(r'[\w\-«»"]+', original):
+        originals.setdefault(token.lower().replace('ё', 'е'), token)
+    words = [originals.get(word, word) for word in remainder.split()]
+    return ' '.join(words)
+
+
+def parse_temporal(text: str, now: Optional[datetime] = None) -> TemporalSlots:
+    """
+    Разбирает выражения времени в тексте запроса
+
+    Args:
+        text: запрос пользователя
+        now: текущее время (по умолчанию datetime.now())
+
+    Returns:
+        TemporalSlots; title - текст запроса без разобранных выражений
+    """
+    now = now or datetime.now()
+    slots = TemporalSlots()
+    t = words_to_numbers(text.lower().replace('ё', 'е'))
+
+    def consume(match) -> str:
+        slots.spans.append(match.group(0).strip())
+        return t[:match.start()] + ' ' + t[match.end():]
+
+    match = RECURRENCE_RE.search(t)
+    if match:
+        phrase = match.group(0)
+        weekday = re.search(r'(понедельник|вторник|сред|четверг|пятниц|суббот|воскресень)', phrase)
+        if weekday and not re.search(r'будн|рабоч', phrase):
+            slots.recurrence = f"RRULE:FREQ=WEEKLY;BYDAY={RRULE_DAYS[_weekday_index(weekday.group(1))]}"
+        else:
+            slots.recurrence = parse_recurrence_rule(phrase.replace('будний день', 'по будням')
+                                                     .replace('по будним дням', 'по будням')
+                                                     .replace('рабочий день', 'рабочие дни'))
+        t = consume(match)
+
+    match = IN_DELTA_RE.search(t)
+    if match:
+        amount, unit = int(match.group(1) or 1), ' '.join(match.group(2).split())
+        if unit == 'полчаса':
+            delta = timedelta(minutes=30)
+        elif unit == 'полтора часа':
+            delta = timedelta(minutes=90)
+        elif unit.startswith('мин'):
+            delta = timedelta(minutes=amount)
+        elif unit.startswith('час'):
+            delta = timedelta(hours=amount)
+        elif unit.startswith('нед'):
+            delta = timedelta(weeks=amount)
+        else:
+            delta = timedelta(days=amount)
+        moment = now + delta
+        slots.day, slots.explicit_day = moment.date(), True
+        if delta < timedelta(days=1):
+            slots.start_clock = moment.replace(second=0, microsecond=0).time()
+        t = consume(match)
+
+    # Диапазон и время - до даты, чтобы "10.30" не принималось за 10 октября
+    match = RANGE_RE.search(t)
+    if match:
+        if match.group(1) is not None:
+            start_hour = _apply_period(int(match.group(1)), match.group(3))
+            end_hour = _apply_period(int(match.group(4)), match.group(6))
+            start_minute, end_minute = int(match.group(2) or 0), int(match.group(5) or 0)
+            if match.group(6) and not match.group(3) and start_hour + 12 < end_hour:
+                # "с 3 до 5 вечера"
+                start_hour += 12
+            if not match.group(3) and not match.group(6) and start_hour in AMBIGUOUS_HOURS:
+                slots.ambiguous = True
+        else:
+            start_hour, start_minute = int(match.group(7)), int(match.group(8))
+            end_hour, end_minute = int(match.group(9)), int(match.group(10))
+        if start_hour < 24 and end_hour < 24 and start_minute < 60 and end_minute < 60:
+            slots.start_clock = time(start_hour, start_minute)
+            slots.end_clock = time(end_hour, end_minute)
+            if slots.end_clock <= slots.start_clock and end_hour < 12 and end_hour + 12 > start_hour:
+                slots.end_clock = time(end_hour + 12, end_minute)
+            t = consume(match)
+
+    if slots.start_clock is None:
+        match = CLOCK_RE.search(t) or CLOCK_DOT_RE.search(t)
+        if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+            slots.start_clock = time(_apply_period(int(match.group(1)), match.group(3)), int(match.group(2)))
+            t = consume(match)
+        else:
+            match = HOUR_RE.search(t)
+            if match and int(match.group(1)) < 24:
+                hour = int(match.group(1))
+                if match.group(2) is None and hour in AMBIGUOUS_HOURS:
+                    slots.ambiguous = True
+                slots.start_clock = time(_apply_period(hour, match.group(2)), 0)
+                t = consume(match)
+            else:
+                match = NOON_RE.search(t)
+                if match:
+                    slots.start_clock = time(12 if match.group(1) == 'полдень' else 0, 0)
+                    t = consume(match)
+
+    if slots.day is None:
+        match = DAY_WORD_RE.search(t)
+        if match:
+            slots.day = (now + timedelta(days=DAY_OFFSETS[match.group(1)])).date()
+            slots.explicit_day = True
+            t = consume(match)
+    if slots.day is None:
+        match = DATE_NUMERIC_RE.search(t)
+        if match:
+            day, month = int(match.group(1)), int(match.group(2))
+            year = int(match.group(3)) if match.group(3) else now.year
+            year = year + 2000 if year < 100 else year
+            try:
+                candidate = date(year, month, day)
+                if not match.group(3) and candidate < now.date():
+                    candidate = candidate.replace(year=year + 1)
+                slots.day, slots.explicit_day = candidate, True
+                t = consume(match)
+            except ValueError:
+                pass
+    if slots.day is None:
+        match = DATE_MONTH_RE.search(t)
+        if match:
+            try:
+                candidate = date(now.year, _month_index(match.group(2)), int(match.group(1)))
+                if candidate < now.date():
+                    candidate = candidate.replace(year=now.year + 1)
+                slots.day, slots.explicit_day = candidate, True
+                t = consume(match)
+            except ValueError:
+                pass
+    if slots.day is None:
+        match = DATE_DAY_RE.search(t)
+        if match:
+            day = int(match.group(1))
+            year, month = now.year, now.month
+            if day < now.day:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            try:
+                slots.day, slots.explicit_day = date(year, month, day), True
+                t = consume(match)
+            except ValueError:
+                pass
+    if slots.day is None:
+        match = WEEKDAY_RE.search(t)
+        if match:
+            slots.day = _next_weekday(now, _weekday_index(match.group(1)), slots.start_clock)
+            slots.explicit_day = True
+            t = consume(match)
+    byday = re.search(r'BYDAY=([A-Z,]+)', slots.recurrence or '')
+    if slots.day is None and byday:
+        # Первое повторение - ближайший из дней правила, иначе Google добавит лишний экземпляр
+        slots.day = min(_next_weekday(now, RRULE_DAYS.index(code), slots.start_clock)
+                        for code in byday.group(1).split(','))
+        slots.explicit_day = True
+    if slots.day is None and slots.start_clock is not None:
+        # Без даты - ближайшее такое время: сегодня или завтра
+        slots.day = now.date() if slots.start_clock > now.time() else (now + timedelta(days=1)).date()
+
+    if slots.end_clock is None:
+        match = DURATION_RE.search(t)
+        if match:
+            if match.group(3):
+                word = ' '.join(match.group(3).split())
+                slots.duration_minutes = {'полчаса': 30, 'час': 60}.get(word, 90)
+            else:
+                slots.duration_minutes = parse_duration(f"{match.group(1)} {match.group(2)}")
+            t = consume(match)
+
+    remainder = re.sub(r'[,;]+', ' ', t).strip()
+    stripped = LEAD_VERB_RE.sub('', remainder)
+    words = stripped.split()
+    if stripped != remainder and words:
+        words[0] = ACCUSATIVE_NOUNS.get(words[0], words[0])
+    while words and words[-1] in EDGE_WORDS:
+        words.pop()
+    while words and words[0] in EDGE_WORDS - LEADING_PREPOSITIONS:
+        words.pop(0)
+    if len(words) > 1 and words[0] in LEADING_PREPOSITIONS:
+        slots.fragment = True
+    elif words and words[0] in LEADING_PREPOSITIONS:
+        words.pop(0)
+    title = _restore_case(' '.join(words).strip(' .!-—'), text)
+    slots.title = title[:1].upper() + title[1:]
+    return slots
+
+
+def day_phrase(text: str) -> Optional[str]:
+    """Выражение даты из текста ("завтра", "в пятницу", "3 марта") или None"""
+    t = words_to_numbers(text.lower().replace('ё', 'е'))
+    for pattern in (DAY_WORD_RE, DATE_NUMERIC_RE, DATE_MONTH_RE, DATE_DAY_RE, WEEKDAY_RE):
+        match = pattern.search(t)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+def count_clock_times(text: str) -> int:
+    """Сколько отдельных указаний времени суток в тексте (диапазон "с 13 до 14" - одно)"""
+    t = RANGE_RE.sub(' @ ', words_to_numbers(text.lower().replace('ё', 'е')))
+    t = CLOCK_RE.sub(' @ ', t)
+    return t.count('@') + len(HOUR_RE.findall(t))
+
+
+FAST_PATH_FULL = 'full'  # простые события без модели, для остальных - готовые значения времени
+FAST_PATH_SLOTS = 'slots'  # только готовые значения времени, название всегда от модели
+FAST_PATH_OFF = 'off'
+
+
+def temporal_fast_path_mode() -> str:
+    """Режим из TEMPORAL_FAST_PATH (full, slots или off; по умолчанию full)"""
+    mode = os.getenv('TEMPORAL_FAST_PATH', FAST_PATH_FULL).lower()
+    return mode if mode in (FAST_PATH_FULL, FAST_PATH_SLOTS, FAST_PATH_OFF) else FAST_PATH_FULL
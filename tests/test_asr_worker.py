@@ -0,0 +1,65 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import deadline
+from asr_worker import ASRWorkerPool
+
+
+class FakeService:
+    """Вместо GigaAM: первый сэмпл задает задержку в секундах, -1 - падение процесса"""
+
+    def transcribe_pcm(self, samples):
+        if samples[0] < 0:
+            os._exit(1)
+        time.sleep(float(samples[0]))
+        return f"len={len(samples)}"
+
+
+def fake_factory():
+    # Вызывается в дочернем процессе spawn - функция должна импортироваться по имени модуля
+    return FakeService()
+
+
+def pcm(n: int, delay: float = 0.0) -> np.ndarray:
+    samples = np.zeros(n, dtype=np.float32)
+    samples[0] = delay
+    return samples
+
+
+@pytest.fixture
+def pool():
+    pool = ASRWorkerPool(size=1, timeout=5, load_timeout=60, factory=fake_factory)
+    assert pool.wait_ready()
+    yield pool
+    pool.close()
+
+
+def test_transcribe(pool):
+    assert pool.transcribe(pcm(100)) == "len=100"
+    assert pool.restarts == 0
+
+
+def test_timed_out_reply_is_not_read_by_next_call(pool):
+    with deadline.scope(0.2):
+        assert pool.transcribe(pcm(111, delay=1.0)) is None
+    # Воркер с непрочитанным ответом перезапущен - следующий вызов получает свой результат
+    assert pool.transcribe(pcm(200)) == "len=200"
+    assert pool.restarts == 1
+
+
+def test_expired_deadline_does_not_send_job(pool):
+    with deadline.scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(deadline.DeadlineExceeded):
+            pool.transcribe(pcm(50))
+    assert pool.transcribe(pcm(300)) == "len=300"
+    assert pool.restarts == 0
+
+
+def test_crashed_worker_is_restarted(pool):
+    assert pool.transcribe(pcm(10, delay=-1.0)) is None
+    assert pool.restarts == 1
+    assert pool.transcribe(pcm(20)) == "len=20"
@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import pytest
+
+from async_executor import AsyncExecutor, CallTimeoutError
+from job_scheduler import JobScheduler
+
+
+async def _stage_call(scheduler, executor, seconds, timeout):
+    """Как TelegramBot._run_stage: брошенный по таймауту вызов удерживает слот этапа"""
+    async with scheduler.stage('llm') as slot:
+        try:
+            return await executor.run(time.sleep, seconds, timeout=timeout)
+        except CallTimeoutError as e:
+            slot.hold(e.future)
+            raise
+
+
+def test_timed_out_call_keeps_stage_slot():
+    async def scenario():
+        executor = AsyncExecutor(max_workers=4)
+        scheduler = JobScheduler(stage_limits={'llm': 1})
+        try:
+            with pytest.raises(CallTimeoutError):
+                await _stage_call(scheduler, executor, 0.5, 0.05)
+            # Поток еще работает - слот и счетчик заняты
+            assert scheduler.get_metrics()['stages']['llm']['active'] == 1
+            assert executor.in_flight == 1
+
+            started = time.monotonic()
+            await _stage_call(scheduler, executor, 0, 5)
+            assert time.monotonic() - started >= 0.3
+
+            assert scheduler.get_metrics()['stages']['llm']['active'] == 0
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_result_within_deadline():
+    async def scenario():
+        executor = AsyncExecutor(max_workers=1)
+        try:
+            assert await executor.run(sum, [1, 2, 3], timeout=5) == 6
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from event_edits import looks_like_edit, parse_edit_locally
+from models import CalendarEvent
+
+NOW = datetime(2026, 10, 17, 11, 0)
+EVENT = CalendarEvent(title="Встреча", start_time=datetime(2026, 10, 18, 10, 0), duration_minutes=60)
+
+
+@pytest.mark.parametrize("text", ["перенеси на 18:00", "продли на полчаса", "назови Планерка", "нет, в 19"])
+def test_edit_cues(text):
+    assert looks_like_edit(text)
+
+
+@pytest.mark.parametrize("text", ["поставь встречу завтра в 10", "сделай презентацию к пятнице", "встречу с Петей в 15"])
+def test_new_requests_are_not_edits(text):
+    assert not looks_like_edit(text)
+
+
+def test_local_edit():
+    assert parse_edit_locally("перенеси на 18:00", EVENT, NOW) == {'start_time': datetime(2026, 10, 18, 18, 0)}
+    assert parse_edit_locally("на полчаса", EVENT, NOW) == {'duration_minutes': 30}
+
+
+def test_extend_and_shorten_change_duration():
+    assert parse_edit_locally("продли на полчаса", EVENT, NOW) == {'duration_minutes': 90}
+    assert parse_edit_locally("укороти на 15 минут", EVENT, NOW) == {'duration_minutes': 45}
+    ranged = EVENT.model_copy(update={'duration_minutes': None, 'end_time': datetime(2026, 10, 18, 12, 0)})
+    assert parse_edit_locally("продли на час", ranged, NOW) == {'duration_minutes': 180}
+    assert parse_edit_locally("укороти на 2 часа", EVENT, NOW) is None
+
+
+def test_out_of_range_time_goes_to_model():
+    assert parse_edit_locally("перенеси на 25:70", EVENT, NOW) is None
+    assert parse_edit_locally("перенеси в 25", EVENT, NOW) is None
+
+
+def test_creation_phrase_is_not_parsed_as_edit():
+    assert parse_edit_locally("поставь встречу завтра в 10", EVENT, NOW) is None
+
+
+class _Bot:
+    """Состояние TelegramBot, нужное _followup_target"""
+
+    def __init__(self, shown_at: float):
+        self.preview = SimpleNamespace(message_id=42)
+        self.active_previews = {1: ("event-1", self.preview, shown_at)}
+        self.edit_requests = set()
+        self.pending_events = {"event-1"}
+        self.preview_edit_ttl = 600
+
+    def _forget_preview(self, chat_id, event_id):
+        del self.active_previews[chat_id]
+
+
+def _update(text: str, reply_to=None):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=1),
+                           message=SimpleNamespace(text=text, reply_to_message=reply_to))
+
+
+@pytest.fixture
+def followup_target():
+    telegram_bot = pytest.importorskip("telegram_bot")
+    return telegram_bot.TelegramBot._followup_target
+
+
+def test_followup_requires_cue_or_reply(followup_target):
+    bot = _Bot(time.monotonic())
+    assert followup_target(bot, _update("поставь встречу завтра в 10"), "поставь встречу завтра в 10") is None
+    assert followup_target(bot, _update("перенеси на 18:00"), "перенеси на 18:00") == "event-1"
+    reply = _update("сделай на полчаса", reply_to=SimpleNamespace(message_id=42))
+    assert followup_target(bot, reply, "сделай на полчаса") == "event-1"
+
+
+def test_stale_preview_is_forgotten(followup_target):
+    bot = _Bot(time.monotonic() - 3600)
+    assert followup_target(bot, _update("перенеси на 18:00"), "перенеси на 18:00") is None
+    assert bot.active_previews == {}
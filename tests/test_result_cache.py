@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from models import CalendarEvent
+from result_cache import ResultCache
+
+
+def lunch(start: datetime) -> CalendarEvent:
+    return CalendarEvent(title="Обед", start_time=start, duration_minutes=30)
+
+
+def test_relative_day_is_reanchored():
+    cache = ResultCache(max_size=8)
+    cache.put("завтра обед в 13:00", lunch(datetime(2026, 10, 18, 13, 0)), datetime(2026, 10, 17, 9, 0))
+    hit = cache.get("Завтра обед в 13.00", datetime(2026, 10, 20, 9, 0))
+    assert hit.start_time == datetime(2026, 10, 21, 13, 0)
+
+
+def test_clock_only_after_time_passed_is_not_replayed_next_morning():
+    cache = ResultCache(max_size=8)
+    # После 13:00 модель перенесла обед на завтра
+    cache.put("обед в 13:00", lunch(datetime(2026, 10, 18, 13, 0)), datetime(2026, 10, 17, 14, 0))
+    assert cache.get("обед в 13:00", datetime(2026, 10, 18, 9, 0)) is None
+    hit = cache.get("обед в 13:00", datetime(2026, 10, 18, 15, 0))
+    assert hit.start_time == datetime(2026, 10, 19, 13, 0)
+
+
+def test_clock_only_before_time_stays_today():
+    cache = ResultCache(max_size=8)
+    cache.put("обед в 13:00", lunch(datetime(2026, 10, 17, 13, 0)), datetime(2026, 10, 17, 9, 0))
+    hit = cache.get("обед в 13:00", datetime(2026, 10, 19, 10, 0))
+    assert hit.start_time == datetime(2026, 10, 19, 13, 0)
+
+
+def test_weekday_depends_on_current_weekday():
+    cache = ResultCache(max_size=8)
+    monday = CalendarEvent(title="Спортзал", start_time=datetime(2026, 10, 19, 18, 0))
+    cache.put("спортзал в понедельник в 18:00", monday, datetime(2026, 10, 17, 9, 0))
+    assert cache.get("спортзал в понедельник в 18:00", datetime(2026, 10, 18, 9, 0)) is None
+    hit = cache.get("спортзал в понедельник в 18:00", datetime(2026, 10, 24, 9, 0))
+    assert hit.start_time == datetime(2026, 10, 26, 18, 0)
+
+
+def test_now_relative_is_uncacheable():
+    cache = ResultCache(max_size=8)
+    now = datetime(2026, 10, 17, 9, 0)
+    cache.put("через 2 часа звонок", lunch(datetime(2026, 10, 17, 11, 0)), now)
+    assert cache.get("через 2 часа звонок", now) is None
+    assert cache.get_metrics()['size'] == 0
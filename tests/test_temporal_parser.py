@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from request_handlers.calendar_event_handler import CalendarEventHandler
+from temporal_parser import parse_temporal
+
+# Суббота
+NOW = datetime(2026, 10, 17, 11, 0)
+
+
+@pytest.mark.parametrize("text, start, title", [
+    ("завтра в 17 созвон", datetime(2026, 10, 18, 17, 0), "Созвон"),
+    ("встреча 15.03 в 10:00", datetime(2027, 3, 15, 10, 0), "Встреча"),
+    ("встреча в понедельник в 10:00", datetime(2026, 10, 19, 10, 0), "Встреча"),
+    ("через 2 часа звонок", datetime(2026, 10, 17, 13, 0), "Звонок"),
+])
+def test_simple_events(text, start, title):
+    slots = parse_temporal(text, NOW)
+    assert slots.start == start
+    assert slots.title == title
+    assert slots.is_simple
+
+
+def test_range():
+    slots = parse_temporal("созвон с 13 до 14", NOW)
+    assert (slots.start, slots.end) == (datetime(2026, 10, 17, 13, 0), datetime(2026, 10, 17, 14, 0))
+
+
+def test_recurrence():
+    slots = parse_temporal("каждый понедельник в 9:00 планерка", NOW)
+    assert slots.start == datetime(2026, 10, 19, 9, 0)
+    assert slots.recurrence == "RRULE:FREQ=WEEKLY;BYDAY=MO"
+
+
+@pytest.mark.parametrize("text, start, minutes", [
+    ("тренировка в 18:00 на 1.5 часа", datetime(2026, 10, 17, 18, 0), 90),
+    ("звонок в 10:00 в течение 2.5 часов", datetime(2026, 10, 18, 10, 0), 150),
+    ("обед в 13:00 на 30 минут", datetime(2026, 10, 17, 13, 0), 30),
+])
+def test_decimal_duration_is_not_a_date(text, start, minutes):
+    slots = parse_temporal(text, NOW)
+    assert slots.start == start
+    assert slots.duration_minutes == minutes
+    assert slots.title in ("Тренировка", "Звонок", "Обед")
+
+
+def test_title_preposition_is_kept():
+    slots = parse_temporal("завтра в 17 с Петей", NOW)
+    assert slots.start == datetime(2026, 10, 18, 17, 0)
+    assert slots.title == "С Петей"
+    assert not slots.is_simple
+
+
+def test_ambiguous_hour_is_not_resolved():
+    slots = parse_temporal("встреча в 7", NOW)
+    assert slots.ambiguous
+    assert not slots.resolved
+
+
+def test_partial_parse_does_not_override_model():
+    slots = parse_temporal("встреча завтра в 10:00 или в 15:00", NOW)
+    assert slots.resolved and not slots.complete
+    assert "verify" in slots.prompt_lines()
+
+    handler = CalendarEventHandler.__new__(CalendarEventHandler)
+    response = '{"type": "calendar_event", "data": {"title": "Встреча", "start_time": "2026-10-18T15:00:00"}}'
+    event = handler.parse_response(response, slots=slots)
+    assert event.start_time == datetime(2026, 10, 18, 15, 0)
+
+
+def test_complete_parse_overrides_model():
+    slots = parse_temporal("тренировка в 18:00 на 1.5 часа", NOW)
+    handler = CalendarEventHandler.__new__(CalendarEventHandler)
+    response = '{"type": "calendar_event", "data": {"title": "Тренировка", "start_time": "2027-05-01T18:00:00"}}'
+    event = handler.parse_response(response, slots=slots)
+    assert event.start_time == datetime(2026, 10, 17, 18, 0)
+    assert event.duration_minutes == 90
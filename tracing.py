@@ -0,0 +1,242 @@
+"""
+Трассировка обработки сообщения: trace ID на обновление Telegram и вложенные интервалы (spans)
+
+Обработчик обновления открывает трассу (start_trace), этапы - вложенные span(): скачивание,
+декодирование, окна речи, энкодер и декодирование ASR, классификация, извлечение, вызовы LLM
+и разбор JSON, Google API, отправка и правка сообщений. Текущий span хранится в contextvars,
+поэтому вложенность сохраняется в asyncio-задачах и в потоках, запущенных через submit() или
+AsyncExecutor. Трасса пишется одной строкой JSONL (TRACE_FILE), когда завершены обработчик и
+все отложенные продолжения (задача в очереди пользователя). Отчет по этапам -
+scripts/trace_report.py.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import calendar_logger, trace_id_var
+
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('trace_span', default=None)
+_export_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    return os.getenv('TRACING_ENABLED', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+class Span:
+    """Интервал этапа внутри трассы"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'started', 'duration', 'attrs', 'error', 'thread')
+
+    def __init__(self, trace: 'Trace', span_id: int, parent_id: Optional[int], name: str,
+                 started: float, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.started = started
+        self.duration: Optional[float] = None
+        self.attrs = attrs
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    def finish(self, ended: Optional[float] = None):
+        self.duration = (ended if ended is not None else time.perf_counter()) - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        item = {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.started - self.trace.started) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'thread': self.thread,
+        }
+        if self.attrs:
+            item['attrs'] = self.attrs
+        if self.error:
+            item['error'] = self.error
+        return item
+
+
+class Trace:
+    """Трасса одного обновления; экспортируется, когда отпущены все удержания (hold/release)"""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.wall_start = datetime.now()
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._holds = 0
+        self._exported = False
+        self.root = self.new_span(name, None, attrs)
+
+    def new_span(self, name: str, parent_id: Optional[int], attrs: Dict[str, Any],
+                 started: Optional[float] = None) -> Span:
+        with self._lock:
+            span = Span(self, len(self.spans) + 1, parent_id, name,
+                        started if started is not None else time.perf_counter(), attrs)
+            if not self._exported:
+                self.spans.append(span)
+            return span
+
+    def hold(self):
+        """Откладывает экспорт до release() - работа по трассе продолжится позже"""
+        with self._lock:
+            self._holds += 1
+
+    def release(self):
+        with self._lock:
+            self._holds -= 1
+            if self._holds > 0 or self._exported:
+                return
+            self._exported = True
+        _export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        ends = [span['start_ms'] + span['duration_ms'] for span in spans if span['duration_ms'] is not None]
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'start': self.wall_start.isoformat(),
+            'duration_ms': round(max(ends, default=0.0), 3),
+            'spans': spans,
+        }
+
+
+def _export(trace: Trace):
+    path = os.getenv('TRACE_FILE', 'traces.jsonl')
+    try:
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with _export_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+    except Exception as e:
+        calendar_logger.log_error(e, "tracing.export")
+
+
+@contextmanager
+def start_trace(name: str, **attrs):
+    """Новая трасса с корневым span; без TRACING_ENABLED ничего не записывает"""
+    if not tracing_enabled():
+        yield None
+        return
+    trace = Trace(name, attrs)
+    trace.hold()
+    span_token = _current_span.set(trace.root)
+    id_token = trace_id_var.set(trace.trace_id)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = type(e).__name__
+        raise
+    finally:
+        trace.root.finish()
+        _current_span.reset(span_token)
+        trace_id_var.reset(id_token)
+        trace.release()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Вложенный интервал текущей трассы; вне трассы - пустой контекст"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = parent.trace.new_span(name, parent.span_id, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Декоратор: вызов функции - span с этим именем"""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name: str, started: float, **attrs):
+    """Завершенный интервал от started (time.perf_counter()) до текущего момента - например, ожидание в очереди"""
+    parent = _current_span.get()
+    if parent is not None:
+        parent.trace.new_span(name, parent.span_id, attrs, started=started).finish()
+
+
+def set_attribute(key: str, value: Any):
+    """Атрибут текущего span"""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs[key] = value
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
+
+
+class Continuation:
+    """Продолжение трассы в задаче, которая выполнится позже (очередь пользователя)"""
+
+    def __init__(self):
+        parent = _current_span.get()
+        self.trace = parent.trace if parent is not None else None
+        self.parent_id = parent.span_id if parent is not None else None
+        if self.trace is not None:
+            self.trace.hold()
+
+    @contextmanager
+    def resume(self, name: str, **attrs):
+        """Span продолжения под исходным родителем; по выходе трасса может быть экспортирована"""
+        if self.trace is None:
+            yield None
+            return
+        current = self.trace.new_span(name, self.parent_id, attrs)
+        span_token = _current_span.set(current)
+        id_token = trace_id_var.set(self.trace.trace_id)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = type(e).__name__
+            raise
+        finally:
+            current.finish()
+            _current_span.reset(span_token)
+            trace_id_var.reset(id_token)
+            self.cancel()
+
+    def cancel(self):
+        """Продолжения не будет (задача не попала в очередь)"""
+        if self.trace is not None:
+            trace, self.trace = self.trace, None
+            trace.release()
+
+
+def submit(pool, func: Callable, *args, **kwargs):
+    """pool.submit с копией контекста - span'ы из потока попадают в текущую трассу"""
+    context = contextvars.copy_context()
+    return pool.submit(context.run, func, *args, **kwargs)
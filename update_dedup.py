@@ -0,0 +1,68 @@
+"""
+Кэш для идемпотентной обработки повторно доставленных обновлений Telegram
+
+Кэш живет в памяти процесса: он отсекает повторы webhook и getUpdates, пока бот работает.
+После рестарта он пуст, и обновления, доставленные заново до подтверждения offset, обрабатываются еще раз.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from logger import calendar_logger
+
+
+class DedupCache:
+    """Ограниченный LRU-кэш ключей (update_id, file_unique_id) с результатами обработки
+
+    seen() отмечает ключи обновлений. Для голосовых put() сохраняет результат успешной
+    обработки, get() возвращает его повторной отправке того же файла. Задачи одного
+    пользователя выполняются по очереди, поэтому повтор видит уже завершенную обработку;
+    неудачная обработка ничего не сохраняет, и повтор выполняется заново.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_size: максимум ключей (DEDUP_CACHE_SIZE, по умолчанию 2048)
+            ttl_seconds: время жизни ключа (DEDUP_TTL_SECONDS, по умолчанию час)
+        """
+        self.max_size = max_size or int(os.getenv('DEDUP_CACHE_SIZE', '2048'))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('DEDUP_TTL_SECONDS', '3600'))
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def seen(self, key: str) -> bool:
+        """Отмечает ключ; возвращает True, если он уже встречался"""
+        if self._lookup(key) is not None:
+            self.hits += 1
+            return True
+        self.put(key, True)
+        return False
+
+    def get(self, key: str) -> Optional[Any]:
+        """Сохраненный результат для ключа или None"""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        calendar_logger.info(f"DedupCache: duplicate {key}")
+        return entry[0]
+
+    def put(self, key: str, value: Any):
+        """Сохраняет результат под ключом, вытесняя самые старые ключи"""
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
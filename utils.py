@@ -4,25 +4,26 @@ import re
 
 
 def parse_duration(duration_text: str) -> Optional[int]:
-    """Парсит текстовое описание длительности в минуты"""
+    """Парсит текстовое описание длительности в минуты ("1.5 часа", "2,5 ч" - дробные тоже)"""
     duration_text = duration_text.lower()
 
     # Паттерны для разных форматов времени
+    number = r'(\d+(?:[.,]\d+)?)'
     patterns = [
-        (r'(\d+)\s*ч(?:ас)?(?:а|ов)?', 60),  # часы
-        (r'(\d+)\s*м(?:ин)?(?:ут)?(?:ы)?', 1),  # минуты
-        (r'(\d+)\s*hour?s?', 60),  # hours
-        (r'(\d+)\s*min(?:ute)?s?', 1),  # minutes
+        (number + r'\s*ч(?:ас)?(?:а|ов)?', 60),  # часы
+        (number + r'\s*м(?:ин)?(?:ут)?(?:ы)?', 1),  # минуты
+        (number + r'\s*hour?s?', 60),  # hours
+        (number + r'\s*min(?:ute)?s?', 1),  # minutes
     ]
 
-    total_minutes = 0
+    total_minutes = 0.0
 
     for pattern, multiplier in patterns:
         matches = re.findall(pattern, duration_text)
         for match in matches:
-            total_minutes += int(match) * multiplier
+            total_minutes += float(match.replace(',', '.')) * multiplier
 
-    return total_minutes if total_minutes > 0 else None
+    return round(total_minutes) if total_minutes > 0 else None
 
 
 def get_default_end_time(start_time: datetime, duration_minutes: Optional[int] = None) -> datetime:
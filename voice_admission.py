@@ -0,0 +1,124 @@
+"""
+Допуск аудио к распознаванию по метаданным Telegram, до скачивания файла
+
+По duration и file_size вложения выбирается конвейер (короткая запись - один проход из памяти,
+длинная - потоковое декодирование окнами с диска) или запись отклоняется, назначается приоритет
+в очереди и оценивается время ответа по измеренному real-time factor (RTF = время распознавания /
+длительность записи).
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+
+PIPELINE_SHORT = 'short'
+PIPELINE_LONG = 'long'
+PIPELINE_REJECT = 'reject'
+
+# Приоритеты планировщика: меньше - раньше
+PRIORITY_SHORT = 0
+PRIORITY_LONG = 1
+
+# Лимит скачивания файлов Bot API
+TELEGRAM_DOWNLOAD_LIMIT = 20 * 1024 * 1024
+
+
+@dataclass
+class AdmissionDecision:
+    """Решение о допуске записи"""
+    pipeline: str
+    duration: float  # секунды; оценка по размеру файла, если Telegram не прислал duration
+    priority: int = PRIORITY_SHORT
+    eta: float = 0.0  # ожидаемое время распознавания, с
+    estimated: bool = False  # длительность оценена по размеру файла
+    reason: Optional[str] = None  # причина отказа для пользователя
+
+    @property
+    def rejected(self) -> bool:
+        return self.pipeline == PIPELINE_REJECT
+
+
+class VoiceAdmission:
+    """Выбор конвейера, приоритета и ETA для аудио; RTF уточняется по фактическим замерам"""
+
+    def __init__(self, short_max_seconds: Optional[float] = None, max_duration: Optional[float] = None,
+                 max_file_size: Optional[int] = None, default_rtf: Optional[float] = None,
+                 bytes_per_second: Optional[int] = None):
+        """
+        Args:
+            short_max_seconds: граница короткой записи (VOICE_SHORT_MAX_SECONDS, по умолчанию 25 -
+                порог однопроходного transcribe GigaAM)
+            max_duration: записи длиннее отклоняются (VOICE_MAX_DURATION, по умолчанию 1800)
+            max_file_size: файлы больше отклоняются (VOICE_MAX_FILE_SIZE, по умолчанию лимит Bot API 20 МБ)
+            default_rtf: RTF до первых замеров (ASR_RTF_DEFAULT, по умолчанию 0.3)
+            bytes_per_second: битрейт для оценки длительности без duration (VOICE_BYTES_PER_SECOND, 16000 = 128 кбит/с)
+        """
+        self.short_max_seconds = short_max_seconds or float(os.getenv('VOICE_SHORT_MAX_SECONDS', '25'))
+        self.max_duration = max_duration or float(os.getenv('VOICE_MAX_DURATION', '1800'))
+        self.max_file_size = max_file_size or int(os.getenv('VOICE_MAX_FILE_SIZE', str(TELEGRAM_DOWNLOAD_LIMIT)))
+        self.bytes_per_second = bytes_per_second or int(os.getenv('VOICE_BYTES_PER_SECOND', '16000'))
+        default_rtf = default_rtf or float(os.getenv('ASR_RTF_DEFAULT', '0.3'))
+        self._rtf: Dict[str, float] = {PIPELINE_SHORT: default_rtf, PIPELINE_LONG: default_rtf}
+        self._samples: Dict[str, int] = {PIPELINE_SHORT: 0, PIPELINE_LONG: 0}
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def admit(self, duration: Optional[float], file_size: Optional[int]) -> AdmissionDecision:
+        """Решение по метаданным вложения (voice.duration, file_size)"""
+        estimated = not duration
+        if estimated:
+            duration = (file_size or 0) / self.bytes_per_second
+
+        if file_size and file_size > self.max_file_size:
+            self.rejected += 1
+            return AdmissionDecision(
+                PIPELINE_REJECT, duration, estimated=estimated,
+                reason=f"файл больше {self.max_file_size // (1024 * 1024)} МБ"
+            )
+        if duration > self.max_duration:
+            self.rejected += 1
+            return AdmissionDecision(
+                PIPELINE_REJECT, duration, estimated=estimated,
+                reason=f"запись длиннее {self.max_duration / 60:g} мин"
+            )
+
+        self.admitted += 1
+        if duration <= self.short_max_seconds and not estimated:
+            pipeline, priority = PIPELINE_SHORT, PRIORITY_SHORT
+        else:
+            pipeline, priority = PIPELINE_LONG, PRIORITY_LONG
+        return AdmissionDecision(pipeline, duration, priority=priority,
+                                 eta=duration * self._rtf[pipeline], estimated=estimated)
+
+    def record(self, pipeline: str, duration: float, elapsed: float, alpha: float = 0.2):
+        """Учитывает фактическое время распознавания (скользящее среднее RTF)"""
+        if duration <= 0 or pipeline not in self._rtf:
+            return
+        rtf = elapsed / duration
+        with self._lock:
+            if self._samples[pipeline] == 0:
+                self._rtf[pipeline] = rtf
+            else:
+                self._rtf[pipeline] += alpha * (rtf - self._rtf[pipeline])
+            self._samples[pipeline] += 1
+
+    def measure(self, decision: AdmissionDecision, func: Callable, *args):
+        """Выполняет распознавание и записывает его RTF (вызывается в пуле потоков)"""
+        started = time.monotonic()
+        result = func(*args)
+        if result and not decision.estimated:
+            self.record(decision.pipeline, decision.duration, time.monotonic() - started)
+        return result
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return {
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'rtf': dict(self._rtf),
+                'samples': dict(self._samples),
+            }
@@ -1,9 +1,10 @@
 import io
+import numpy as np
 import torch
 import os
 from typing import Union, Optional
+import shutil
 import time
-from telegram import File
 
 # Импортируем GigaAM из локальной папки
 import sys
@@ -13,122 +14,204 @@ if gigaam_path not in sys.path:
 import gigaam
 
 
+import deadline
+import tracing
+from audio_stream import SAMPLE_RATE, ffmpeg_available, iter_pcm_chunks, iter_audio_windows
 from logger import calendar_logger
 
 
 class VoiceService:
     """Сервис для обработки голосовых сообщений"""
     
-    def __init__(self, device: str = "cpu"):
+    def __init__(self, device: str = "cpu", lazy: bool = False, workers: Optional[int] = None):
         """
         Инициализация сервиса обработки голоса
         
         Args:
             device: устройство для инференса ("cpu" или "cuda")
+            lazy: не загружать модель сразу - вызывающий загрузит ее через load_model()
+            workers: число отдельных процессов распознавания (ASR_WORKERS, 0 - в этом процессе)
         """
         self.device = device
         self.model = None
-        self._load_model()
+        self.workers = workers if workers is not None else int(os.getenv('ASR_WORKERS', '0'))
+        self.worker_pool = None
+        if not lazy:
+            self.load_model()
     
-    def _load_model(self):
-        """Загружает модель GigaAM для распознавания речи"""
+    def load_model(self) -> bool:
+        """Загружает модель GigaAM для распознавания речи; возвращает True при успехе"""
+        if self.workers > 0:
+            # Модель загружается в каждом процессе пула, в этом процессе только декодирование
+            from asr_worker import ASRWorkerPool
+            self.worker_pool = ASRWorkerPool(self.workers, device=self.device)
+            return self.worker_pool.wait_ready()
+
         try:
             self.model = gigaam.load_model(
                 "v2_ctc",  # GigaAM-V2 CTC model
                 device=self.device
             )
+            self._trace_model_stages()
             calendar_logger.info("Модель GigaAM успешно загружена")
         except Exception as e:
-            calendar_logger.log_error(e, "voice_service._load_model")
+            calendar_logger.log_error(e, "voice_service.load_model")
             print(f"Ошибка загрузки модели GigaAM: {str(e)}")
             self.model = None
+        return self.model is not None
     
-    async def transcribe_voice_message(self, voice_file: File) -> Optional[str]:
+    def _trace_model_stages(self):
+        """Span'ы asr.encoder и asr.decoding вокруг этапов модели (если у модели такие части есть)"""
+        encoder = getattr(self.model, 'encoder', None)
+        if encoder is not None and hasattr(encoder, 'forward'):
+            encoder.forward = tracing.traced('asr.encoder')(encoder.forward)
+        decoding = getattr(self.model, 'decoding', None)
+        if decoding is not None and hasattr(decoding, 'decode'):
+            decoding.decode = tracing.traced('asr.decoding')(decoding.decode)
+
+    def transcribe_audio_bytes(self, file_bytes: bytearray) -> Optional[str]:
         """
-        Транскрибирует голосовое сообщение в текст
-        
+        Синхронно транскрибирует скачанный аудиофайл (OGG/Opus, MP3 и т.п.) в текст
+
         Args:
-            voice_file: объект файла голосового сообщения из Telegram
-            
+            file_bytes: байты аудиофайла
+
         Returns:
             str: транскрибированный текст или None в случае ошибки
         """
-        try:
-            # Скачиваем файл в память
-            file_bytes = await voice_file.download_as_bytearray()
+        return self._transcribe_source(bytes(file_bytes))
 
-            # Конвертируем в аудио формат, который понимает модель
-            audio_data = self._convert_ogg_to_wav(file_bytes)
+    def transcribe_audio_file(self, path: str) -> Optional[str]:
+        """
+        Синхронно транскрибирует аудио/видеофайл на диске (голосовые, аудиофайлы, видеосообщения)
 
-            # Короткая речь (<=25с) — однопроходный transcribe, иначе longform
-            LONGFORM_THRESHOLD_SAMPLES = 25 * 16000
-            use_shortform = int(audio_data.numel()) <= LONGFORM_THRESHOLD_SAMPLES
+        Returns:
+            str: транскрибированный текст или None в случае ошибки
+        """
+        return self._transcribe_source(path)
 
-            if use_shortform:
-                result = self.model.transcribe(audio_data, sample_rate=16000)
-            else:
-                result = self.model.transcribe_longform(audio_data, sample_rate=16000)
-
-            # GigaAM.transcribe_longform возвращает список сегментов
-            if isinstance(result, list):
-                segments = []
-                for seg in result:
-                    if isinstance(seg, dict):
-                        text = seg.get("transcription")
-                        if isinstance(text, str) and text.strip():
-                            segments.append(text.strip())
-                    elif isinstance(seg, str) and seg.strip():
-                        segments.append(seg.strip())
-                transcription = " ".join(segments).strip()
-            elif isinstance(result, str):
-                transcription = result.strip()
-            else:
-                transcription = str(result).strip() if result is not None else ""
+    def _iter_windows(self, source: Union[str, bytes]):
+        """Окна PCM для распознавания: потоковое декодирование ffmpeg или torchaudio, если ffmpeg нет"""
+        if ffmpeg_available():
+            return iter_audio_windows(iter_pcm_chunks(source))
 
-            calendar_logger.info(
-                f"Голосовое сообщение транскрибировано: {transcription if len(transcription) < 256 else transcription[:253] + '...'}"
-            )
+        calendar_logger.warning("ffmpeg не найден, аудио декодируется целиком через torchaudio")
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = f.read()
+        return iter_audio_windows([self._convert_ogg_to_wav(source).numpy()])
 
-            # Если пустая транскрипция — пробуем fallback (shortform)
-            if not transcription and not use_shortform:
-                try:
-                    fallback = self.model.transcribe(audio_data, sample_rate=16000)
-                    if isinstance(fallback, str) and fallback.strip():
-                        return fallback.strip()
-                except Exception as fb_err:
-                    calendar_logger.log_error(fb_err, "voice_service.transcribe_voice_message.fallback")
+    def _transcribe_source(self, source: Union[str, bytes]) -> Optional[str]:
+        """Распознает запись окно за окном по мере декодирования и склеивает текст"""
+        try:
+            segments = []
+            windows = 0
+            iterator = iter(self._iter_windows(source))
+            while True:
+                # Ожидание следующего окна - декодирование ffmpeg и поиск паузы для разреза
+                with tracing.span('audio.decode'):
+                    window = next(iterator, None)
+                if window is None:
+                    break
+                # Обработчик уже ответил по таймауту - остальные окна не распознаем
+                deadline.check('asr')
+                windows += 1
+                with tracing.span('asr.window', seconds=round(len(window) / SAMPLE_RATE, 2)):
+                    if self.worker_pool is not None:
+                        text = self.worker_pool.transcribe(window)
+                        if text is None:
+                            return None
+                    else:
+                        text = self.transcribe_pcm(window)
+                if text:
+                    segments.append(text.strip())
+
+            transcription = " ".join(segments).strip()
+            calendar_logger.info(f"Запись распознана по окнам: {windows} окон, {len(transcription)} символов")
 
-            # Если всё равно пусто — сохраняем вход для отладки
+            # Если пусто — сохраняем вход для отладки
             if not transcription:
-                try:
-                    dbg_dir = os.path.join(os.path.dirname(__file__), "debug_audio")
-                    os.makedirs(dbg_dir, exist_ok=True)
-                    ts = int(time.time())
-                    raw_path = os.path.join(dbg_dir, f"input_{ts}.ogg")
-                    wav_path = os.path.join(dbg_dir, f"waveform_{ts}.pt")
-                    with open(raw_path, "wb") as f:
-                        f.write(file_bytes)
-                    torch.save(audio_data, wav_path)
-                except Exception as save_err:
-                    calendar_logger.log_error(save_err, "voice_service.transcribe_voice_message.save_debug")
+                self._save_debug_input(source, "input")
 
             return transcription if transcription else None
 
+        except deadline.DeadlineExceeded:
+            calendar_logger.warning(f"Распознавание остановлено по дедлайну после {windows} окон")
+            return None
+
         except Exception as e:
-            calendar_logger.log_error(e, "voice_service.transcribe_voice_message")
+            calendar_logger.log_error(e, "voice_service.transcribe_audio")
             # Пытаемся сохранить входные данные на случай ошибки
-            try:
-                if 'file_bytes' in locals():
-                    dbg_dir = os.path.join(os.path.dirname(__file__), "debug_audio")
-                    os.makedirs(dbg_dir, exist_ok=True)
-                    ts = int(time.time())
-                    raw_path = os.path.join(dbg_dir, f"error_input_{ts}.ogg")
-                    with open(raw_path, "wb") as f:
-                        f.write(file_bytes)
-            except Exception as save_err:
-                calendar_logger.log_error(save_err, "voice_service.transcribe_voice_message.save_error_input")
+            self._save_debug_input(source, "error_input")
             return None
-    
+
+    def _save_debug_input(self, source: Union[str, bytes], prefix: str):
+        """Копия исходного файла в debug_audio/ для разбора нераспознанных записей"""
+        try:
+            if not source:
+                return
+            dbg_dir = os.path.join(os.path.dirname(__file__), "debug_audio")
+            os.makedirs(dbg_dir, exist_ok=True)
+            ts = int(time.time())
+            if isinstance(source, str):
+                shutil.copyfile(source, os.path.join(dbg_dir, f"{prefix}_{ts}{os.path.splitext(source)[1]}"))
+            else:
+                with open(os.path.join(dbg_dir, f"{prefix}_{ts}.ogg"), "wb") as f:
+                    f.write(source)
+        except Exception as save_err:
+            calendar_logger.log_error(save_err, "voice_service.save_debug_input")
+
+    def transcribe_waveform(self, audio_data: torch.Tensor) -> str:
+        """
+        Распознает моно-аудио 16 кГц загруженной моделью
+
+        Returns:
+            str: транскрибированный текст (пустая строка, если речь не найдена)
+        """
+        # Короткая речь (<=25с) — однопроходный transcribe, иначе longform
+        LONGFORM_THRESHOLD_SAMPLES = 25 * 16000
+        use_shortform = int(audio_data.numel()) <= LONGFORM_THRESHOLD_SAMPLES
+
+        if use_shortform:
+            result = self.model.transcribe(audio_data, sample_rate=16000)
+        else:
+            result = self.model.transcribe_longform(audio_data, sample_rate=16000)
+
+        # GigaAM.transcribe_longform возвращает список сегментов
+        if isinstance(result, list):
+            segments = []
+            for seg in result:
+                if isinstance(seg, dict):
+                    text = seg.get("transcription")
+                    if isinstance(text, str) and text.strip():
+                        segments.append(text.strip())
+                elif isinstance(seg, str) and seg.strip():
+                    segments.append(seg.strip())
+            transcription = " ".join(segments).strip()
+        elif isinstance(result, str):
+            transcription = result.strip()
+        else:
+            transcription = str(result).strip() if result is not None else ""
+
+        calendar_logger.info(
+            f"Голосовое сообщение транскрибировано: {transcription if len(transcription) < 256 else transcription[:253] + '...'}"
+        )
+
+        # Если пустая транскрипция — пробуем fallback (shortform)
+        if not transcription and not use_shortform:
+            try:
+                fallback = self.model.transcribe(audio_data, sample_rate=16000)
+                if isinstance(fallback, str) and fallback.strip():
+                    return fallback.strip()
+            except Exception as fb_err:
+                calendar_logger.log_error(fb_err, "voice_service.transcribe_waveform.fallback")
+
+        return transcription
+
+    def transcribe_pcm(self, samples: np.ndarray) -> str:
+        """Распознает PCM float32 (используется воркером с общей памятью, без копирования)"""
+        return self.transcribe_waveform(torch.from_numpy(samples))
+
     def _convert_ogg_to_wav(self, ogg_bytes: bytearray) -> torch.Tensor:
         """
         Конвертирует OGG аудио в WAV формат и возвращает torch.Tensor
@@ -173,6 +256,13 @@ class VoiceService:
             raise
 
     
+    def close(self):
+        """Останавливает процессы распознавания, если они запущены"""
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
     def is_model_loaded(self) -> bool:
         """Проверяет, загружена ли модель"""
+        if self.worker_pool is not None:
+            return self.worker_pool.is_ready()
         return self.model is not None
@@ -0,0 +1,94 @@
+"""
+Фоновая инициализация тяжелых компонентов (модели, клиенты API) при старте бота
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from logger import calendar_logger
+
+
+class ComponentUnavailableError(Exception):
+    """Компонент не удалось инициализировать"""
+
+
+class Warmup:
+    """Запускает инициализацию компонентов в отдельных потоках и хранит future готовности
+
+    Обработчики ждут только нужный им компонент (wait), поэтому бот начинает принимать
+    обновления сразу, а текстовые запросы обслуживаются, как только готов путь LLM.
+    Для каждого компонента фиксируется время готовности и время первого ответа с начала старта.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self._futures: Dict[str, Future] = {}
+        self._ready_after: Dict[str, float] = {}
+        self._first_response_after: Dict[str, float] = {}
+
+    def start(self, name: str, factory: Callable[[], Any]) -> Future:
+        """Запускает factory() в фоновом потоке; результат доступен через wait(name)"""
+        future: Future = Future()
+        self._futures[name] = future
+
+        def run():
+            try:
+                result = factory()
+            except Exception as e:
+                calendar_logger.log_error(e, f"warmup.{name}")
+                self._ready_after[name] = time.monotonic() - self.started_at
+                future.set_exception(ComponentUnavailableError(f"Компонент {name} недоступен: {e}"))
+                return
+            self._ready_after[name] = time.monotonic() - self.started_at
+            calendar_logger.info(f"Warmup: {name} ready in {self._ready_after[name]:.2f}s")
+            future.set_result(result)
+
+        threading.Thread(target=run, name=f'warmup-{name}', daemon=True).start()
+        return future
+
+    def is_ready(self, name: str) -> bool:
+        """Компонент инициализирован успешно"""
+        future = self._futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    async def wait(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Ждет готовности компонента
+
+        Raises:
+            ComponentUnavailableError: инициализация завершилась ошибкой
+            asyncio.TimeoutError: компонент не успел подготовиться
+        """
+        future = self._futures.get(name)
+        if future is None:
+            return None
+        if future.done():
+            return future.result()
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+    def mark_served(self, name: str):
+        """Отмечает первый ответ пользователю, для которого понадобился компонент"""
+        if name in self._first_response_after:
+            return
+        self._first_response_after[name] = time.monotonic() - self.started_at
+        calendar_logger.info(
+            f"Warmup: first response using {name} after {self._first_response_after[name]:.2f}s since start"
+        )
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние компонентов: ready/failed/loading, время готовности и первого ответа"""
+        status = {}
+        for name, future in self._futures.items():
+            if not future.done():
+                state = 'loading'
+            else:
+                state = 'failed' if future.exception() is not None else 'ready'
+            status[name] = {
+                'state': state,
+                'ready_after': self._ready_after.get(name),
+                'first_response_after': self._first_response_after.get(name),
+            }
+        return status
@@ -0,0 +1,170 @@
+"""
+Встроенный асинхронный HTTP-сервер для приема обновлений Telegram через webhook
+"""
+
+import asyncio
+import hmac
+import json
+import ssl
+from http import HTTPStatus
+from typing import Dict, Optional, Set, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+
+from logger import calendar_logger
+
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+MAX_BODY_SIZE = 1024 * 1024
+
+
+async def read_http_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """
+    Читает один HTTP/1.1 запрос из потока
+
+    Returns:
+        (метод, путь, заголовки в нижнем регистре, тело) или None, если соединение закрыто
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').strip().split()
+    if len(parts) < 2:
+        raise ValueError(f"Malformed request line: {request_line!r}")
+    method, path = parts[0].upper(), parts[1]
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', '0') or 0)
+    if length > MAX_BODY_SIZE:
+        raise ValueError(f"Request body too large: {length}")
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def write_http_response(writer: asyncio.StreamWriter, status: int, body: bytes = b'',
+                        content_type: str = 'text/plain; charset=utf-8', keep_alive: bool = True):
+    """Записывает HTTP/1.1 ответ в поток"""
+    reason = HTTPStatus(status).phrase
+    head = (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+
+
+class WebhookServer:
+    """Прием обновлений Telegram по HTTP(S) и передача их в обработчики Application
+
+    Telegram повторяет доставку, пока не получит 2xx, поэтому сервер отвечает сразу
+    после постановки обновления в обработку. При остановке сервер перестает принимать
+    соединения и дожидается уже принятых обновлений.
+    """
+
+    def __init__(self, application: Application, path: str = '/telegram', secret_token: Optional[str] = None,
+                 host: str = '0.0.0.0', port: int = 8080, ssl_context: Optional[ssl.SSLContext] = None):
+        """
+        Args:
+            application: приложение python-telegram-bot с настроенными обработчиками
+            path: путь, на который Telegram присылает обновления
+            secret_token: значение заголовка X-Telegram-Bot-Api-Secret-Token
+            host: адрес для прослушивания
+            port: порт для прослушивания
+            ssl_context: контекст TLS; None - обычный HTTP (например, за обратным прокси)
+        """
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self._accepting = False
+
+    async def start(self):
+        """Запускает прослушивание порта"""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, ssl=self.ssl_context
+        )
+        # При port=0 система выбирает свободный порт
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._accepting = True
+        scheme = 'https' if self.ssl_context else 'http'
+        calendar_logger.info(f"Webhook server listening on {scheme}://{self.host}:{self.port}{self.path}")
+
+    async def stop(self, drain_timeout: float = 30.0):
+        """Перестает принимать обновления и дожидается переданных в обработку"""
+        self._accepting = False
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        if self._dispatches:
+            calendar_logger.info(f"Webhook server draining {len(self._dispatches)} update(s)")
+            _, pending = await asyncio.wait(self._dispatches, timeout=drain_timeout)
+            if pending:
+                calendar_logger.warning(f"Webhook server: {len(pending)} update(s) not finished before shutdown")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Обслуживает одно keep-alive соединение"""
+        try:
+            while True:
+                try:
+                    request = await read_http_request(reader)
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    calendar_logger.warning(f"Webhook server: bad request: {e}")
+                    write_http_response(writer, 400, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                status = self._accept(*request)
+                keep_alive = request[2].get('connection', '').lower() != 'close' and self._accepting
+                write_http_response(writer, status, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            calendar_logger.log_error(e, "WebhookServer._handle_connection")
+        finally:
+            writer.close()
+
+    def _accept(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> int:
+        """Проверяет запрос и передает обновление в обработку. Возвращает HTTP-статус"""
+        if path.split('?', 1)[0] != self.path:
+            return 404
+        if method != 'POST':
+            return 405
+        # Заголовки декодированы latin-1 и переводятся обратно в байты: compare_digest на str
+        # с не-ASCII символами бросает TypeError
+        if self.secret_token and not hmac.compare_digest(headers.get(SECRET_HEADER, '').encode('latin-1'),
+                                                         self.secret_token.encode()):
+            calendar_logger.warning("Webhook server: invalid secret token")
+            return 403
+        if not self._accepting:
+            # Telegram повторит доставку после перезапуска
+            return 503
+
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except Exception as e:
+            calendar_logger.warning(f"Webhook server: cannot parse update: {e}")
+            return 400
+
+        task = asyncio.create_task(self.application.process_update(update))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+        return 200